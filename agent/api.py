@@ -7,8 +7,9 @@ import binascii
 import json
 import os
 import tempfile
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request, status, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Any
 import httpx
@@ -16,11 +17,23 @@ from openai import AsyncOpenAI
 
 from agents.exceptions import InputGuardrailTripwireTriggered
 
+from core.backtest_jobs import TERMINAL_STATUSES, get_job_manager
+from core.http_client import close_http_client
 from core.polygon_agent import run_analysis
 from core.sift_router import router as sift_router
 from instrumentation import setup_telemetry
 
-app = FastAPI(title="Polygon Market Analysis API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Shutdown: stop queued/running backtest jobs, then release the pooled
+    # connections shared by the data fetchers.
+    await get_job_manager().shutdown()
+    await close_http_client()
+
+
+app = FastAPI(title="Polygon Market Analysis API", version="1.0.0", lifespan=lifespan)
 setup_telemetry(app)
 app.include_router(sift_router)
 
@@ -82,6 +95,39 @@ async def data_earnings(ticker: str, limit: int = 8) -> dict[str, Any]:
         return {"available": False, "error": str(exc)[:300]}
 
 
+@app.get("/data/ranked-options/stream")
+async def data_ranked_options_stream(
+    ticker: str,
+    metric: str,
+    k: int = 10,
+    contract_type: str | None = None,
+    deadline_s: float | None = None,
+) -> StreamingResponse:
+    """SSE stream of the top-``k`` contracts: a ``partial`` event per chain page, then ``complete``."""
+    from core.polygon_agent import parse_ranking_metrics, stream_ranked_options
+
+    try:
+        parse_ranking_metrics(metric)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    async def event_stream():
+        try:
+            async for ranking in stream_ranked_options(
+                ticker, metric, max(1, min(k, 100)), contract_type, deadline_s,
+            ):
+                event = "complete" if ranking["complete"] or ranking["timed_out"] else "partial"
+                yield f"event: {event}\ndata: {json.dumps(ranking, default=str)}\n\n"
+        except Exception as exc:
+            yield f"event: error\ndata: {json.dumps({'error': str(exc)[:300]})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 class AnalysisRequest(BaseModel):
     query: str
     session_name: str | None = None
@@ -657,6 +703,17 @@ async def chat_completions(request: Request) -> JSONResponse:
 # ── Backtest executor endpoint ────────────────────────────────────────────────
 
 from core.backtest_executor import BacktestRequest, BacktestResponse, execute_backtest  # noqa: E402
+from core.backtest_sweep import BacktestSweepRequest, BacktestSweepResponse, execute_backtest_sweep  # noqa: E402
+from core.backtest_portfolio import (  # noqa: E402
+    BacktestPortfolioRequest,
+    BacktestPortfolioResponse,
+    execute_backtest_portfolio,
+)
+from core.backtest_walkforward import (  # noqa: E402
+    BacktestWalkForwardRequest,
+    BacktestWalkForwardResponse,
+    execute_backtest_walkforward,
+)
 
 
 @app.post("/backtest", response_model=BacktestResponse, status_code=status.HTTP_200_OK)
@@ -669,3 +726,94 @@ async def run_backtest(request: BacktestRequest) -> BacktestResponse:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Backtest execution failed: {exc}",
         )
+
+
+# Long backtests run as background jobs: submit returns a job id, progress is
+# streamed over Server-Sent Events, and the result stays fetchable until its TTL.
+
+@app.post("/backtest/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_backtest_job(request: BacktestRequest) -> dict[str, Any]:
+    """Queue a backtest and return its job record (``jobId``, ``status``)."""
+    return await get_job_manager().submit("backtest", lambda: execute_backtest(request))
+
+
+@app.get("/backtest/jobs/{job_id}", status_code=status.HTTP_200_OK)
+async def get_backtest_job(job_id: str) -> dict[str, Any]:
+    """Job status, latest progress, and the result once it has succeeded."""
+    record = await get_job_manager().get(job_id)
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job: {job_id}")
+    return record
+
+
+@app.get("/backtest/jobs/{job_id}/events")
+async def stream_backtest_job(job_id: str) -> StreamingResponse:
+    """SSE stream: a ``progress`` event per update, then one final status event."""
+    manager = get_job_manager()
+    if await manager.get(job_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job: {job_id}")
+
+    async def event_stream():
+        async for record in manager.events(job_id):
+            if record is None:
+                yield ": keepalive\n\n"
+                continue
+            event = record["status"] if record["status"] in TERMINAL_STATUSES else "progress"
+            yield f"event: {event}\ndata: {json.dumps(record, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/backtest/jobs/{job_id}", status_code=status.HTTP_200_OK)
+async def cancel_backtest_job(job_id: str) -> dict[str, Any]:
+    """Cancel a queued or running job; finished jobs are returned unchanged."""
+    record = await get_job_manager().cancel(job_id)
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job: {job_id}")
+    return record
+
+
+@app.post("/backtest/sweep", response_model=BacktestSweepResponse, status_code=status.HTTP_200_OK)
+async def run_backtest_sweep(request: BacktestSweepRequest) -> BacktestSweepResponse:
+    """Run one strategy across a parameter grid and return combinations ranked by `rank_by`."""
+    try:
+        return await execute_backtest_sweep(request)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Backtest sweep failed: {exc}",
+        )
+
+
+@app.post("/backtest/portfolio", response_model=BacktestPortfolioResponse, status_code=status.HTTP_200_OK)
+async def run_backtest_portfolio(request: BacktestPortfolioRequest) -> BacktestPortfolioResponse:
+    """Run one strategy across `symbols` with shared capital and a combined equity curve."""
+    try:
+        return await execute_backtest_portfolio(request)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Portfolio backtest failed: {exc}",
+        )
+
+
+@app.post("/backtest/walkforward", response_model=BacktestWalkForwardResponse, status_code=status.HTTP_200_OK)
+async def run_backtest_walkforward(request: BacktestWalkForwardRequest) -> BacktestWalkForwardResponse:
+    """Optimise on rolling train windows and report stitched out-of-sample results."""
+    try:
+        return await execute_backtest_walkforward(request)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Walk-forward backtest failed: {exc}",
+        )
@@ -1,98 +1,194 @@
-import heapq
-from dataclasses import dataclass, field
-from typing import Dict, List, Tuple, Any, Optional
-from decimal import Decimal
+import bisect
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
 
-@dataclass(order=False)
-class MarketEntry:
+import numpy as np
+import pandas as pd
+
+Metadata = Union[Sequence[dict], Callable[[int], dict], None]
+
+
+def _top_k(values: np.ndarray, symbols: np.ndarray, k: int) -> np.ndarray:
     """
-    Wrapper for min-heap comparison logic.
-    adapted from DrugEntry for generic market data.
+    Indices of the k best rows, best first.
+    Primary: larger value. Secondary: alphabetical tie-breaker (keep 'A' over 'Z').
     """
-    sort_val: float  # Using float as Polygon API returns floats
-    symbol: str
-    metadata: dict = field(default_factory=dict, compare=False)
-    
-    def __lt__(self, other):
-        # Primary: sort_val (worst = smallest in our min-heap)
-        # We want to keep the LARGEST values, so the min-heap should pop the SMALLEST.
-        if self.sort_val != other.sort_val:
-            return self.sort_val < other.sort_val
-        # Secondary: Alphabetical tie-breaker (Evict 'Z' before 'A')
-        return self.symbol > other.symbol
-    
-    def __gt__(self, other):
-        return not self.__lt__(other) and self != other
+    n = len(values)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if n > k:
+        # k-th largest value; everything above it is in, ties at it are decided by symbol.
+        cutoff = values[np.argpartition(-values, k - 1)[k - 1]]
+        better = np.flatnonzero(values > cutoff)
+        tied = np.flatnonzero(values == cutoff)
+        if len(better) + len(tied) > k:
+            tied = tied[np.argsort(symbols[tied].astype(str), kind="stable")][: k - len(better)]
+        chosen = np.concatenate([better, tied])
+    else:
+        chosen = np.arange(n)
+    return chosen[np.lexsort((symbols[chosen].astype(str), -values[chosen]))]
+
 
 class MarketLeaderboard:
     """
-    Maintains the Top K market items using a min-heap.
-    Great for streaming data or finding the top performers in a large list 
+    Maintains the Top K market items.
+    Great for streaming data or finding the top performers in a large list
     based on custom calculated metrics.
+
+    The board is held as arrays. ``add_many`` merges a whole batch of
+    (symbol, value) arrays with one ``np.argpartition``; single ``add`` calls
+    are buffered and merged the same way. A symbol already on the board keeps
+    its value (repeats only bump its count in ``entries``); a symbol that
+    isn't on the board, including one that fell off it, can still enter.
+    Batches that repeat symbols are merged row by row to keep that exact.
     """
-    
+
+    _FLUSH_AT = 4096
+
     def __init__(self, k: int, is_increase: bool = True):
         self.k = k
         self.is_increase = is_increase
-        self.entries: Dict[str, int] = {}  # {symbol: count}
-        self.heap: List[MarketEntry] = []
-    
+        self.entries: Dict[str, int] = {}  # {symbol: count} for symbols on the board
+        # If is_increase=True (Find Highest): sort_val = value.
+        # If is_increase=False (Find Lowest): sort_val = -value, so "best" is always largest.
+        self._symbols = np.empty(0, dtype=object)
+        self._sort_vals = np.empty(0, dtype=np.float64)
+        self._metadata: List[dict] = []
+        self._pending: List[Tuple[str, float, Optional[dict]]] = []
+
     def add(self, symbol: str, value: float, metadata: dict = None):
-        if symbol in self.entries:
-            self.entries[symbol] += 1
+        self._pending.append((symbol, value, metadata))
+        if len(self._pending) >= self._FLUSH_AT:
+            self._flush()
+
+    def add_many(
+        self,
+        symbols: Union[Sequence[str], np.ndarray],
+        values: Union[Sequence[float], np.ndarray],
+        metadata: Metadata = None,
+        index: Optional[pd.Index] = None,
+    ):
+        """
+        Merge a batch into the board. ``metadata`` is a sequence aligned with
+        ``symbols`` or a callable ``i -> dict``; it is only consulted for rows
+        that make the board. NaN values are skipped. ``index`` (a ``pd.Index``
+        over ``symbols``) can be shared across boards fed the same batch.
+        """
+        self._flush()
+        self._merge(np.asarray(symbols, dtype=object), np.asarray(values, dtype=np.float64), metadata, index)
+
+    def _flush(self):
+        if not self._pending:
             return
-        
-        # Determine sort value
-        # If we want "Top Highest Values" (is_increase=True):
-        #   Heap should store the Top K. 
-        #   The "worst" of the Top K is the smallest value.
-        #   Min-heap pops smallest value.
-        #   So sort_val = value directly.
-        #   We pop if new item > min-heap root.
-        
-        # If we want "Top Lowest Values" (is_increase=False, e.g. biggest losers):
-        #   We want to keep the Smallest values (Change = -10%, -9%...).
-        #   The "worst" of the "smallest values" is the largest value (e.g. -2%).
-        #   So we invert the value for the heap? 
-        #   Actually, let's keep it simple: 
-        #   If is_increase=True (Find Highest): sort_val = value. (Pop smallest)
-        #   If is_increase=False (Find Lowest): sort_val = -value. (Pop largest negative -> pop 'least negative')
-        
-        sort_val = value if self.is_increase else -value
-        
-        item = MarketEntry(float(sort_val), symbol, metadata or {})
-        
-        if len(self.heap) < self.k:
-            heapq.heappush(self.heap, item)
-            self.entries[symbol] = 1
-        elif item > self.heap[0]:
-            # This item is "better" (larger sort_val) than the worst in our heap.
-            # Replace the worst.
-            worst = heapq.heapreplace(self.heap, item)
-            if worst.symbol in self.entries:
-                del self.entries[worst.symbol]
+        pending, self._pending = self._pending, []
+        symbols, values, metadata = zip(*pending)
+        self._merge(
+            np.array(symbols, dtype=object),
+            np.array(values, dtype=np.float64),
+            [m or {} for m in metadata],
+            None,
+        )
+
+    def _merge(self, symbols: np.ndarray, values: np.ndarray, metadata: Metadata, index: Optional[pd.Index]):
+        if len(symbols) != len(values):
+            raise ValueError("symbols and values must have the same length.")
+        if not len(symbols):
+            return
+        sort_vals = values if self.is_increase else -values
+        index = index if index is not None else pd.Index(symbols)
+
+        # A batch that repeats a symbol, or one already on the board, is merged
+        # row by row: a copy is a repeat only while its symbol is on the board,
+        # so the outcome depends on arrival order.
+        if not index.is_unique or (len(self._symbols) and index.isin(self._symbols).any()):
+            self._merge_in_order(symbols, sort_vals, metadata)
+            return
+
+        # Only the batch's own top k can make the board.
+        usable = np.flatnonzero(~np.isnan(sort_vals))
+        usable = usable[_top_k(sort_vals[usable], symbols[usable], self.k)]
+
+        n_board = len(self._symbols)
+        cand_symbols = np.concatenate([self._symbols, symbols[usable]])
+        cand_vals = np.concatenate([self._sort_vals, sort_vals[usable]])
+        top = _top_k(cand_vals, cand_symbols, self.k)
+
+        board_meta: List[dict] = []
+        for j in top.tolist():
+            if j < n_board:
+                board_meta.append(self._metadata[j])
+            else:
+                board_meta.append(self._row_metadata(metadata, int(usable[j - n_board])))
+
+        self._symbols = cand_symbols[top]
+        self._sort_vals = cand_vals[top]
+        self._metadata = board_meta
+        self.entries = {s: self.entries.get(s, 1) for s in self._symbols.tolist()}
+
+    @staticmethod
+    def _row_metadata(metadata: Metadata, row: int) -> dict:
+        if metadata is None:
+            return {}
+        return (metadata(row) if callable(metadata) else metadata[row]) or {}
+
+    def _merge_in_order(self, symbols: np.ndarray, sort_vals: np.ndarray, metadata: Metadata):
+        """One-at-a-time semantics: a symbol on the board keeps its value and
+        counts repeats; one that isn't (or fell off) can enter."""
+        board = [(-v, str(s), s, m) for s, v, m in zip(self._symbols.tolist(), self._sort_vals.tolist(), self._metadata)]
+        for row, (symbol, value) in enumerate(zip(symbols.tolist(), sort_vals.tolist())):
+            if symbol in self.entries:
+                self.entries[symbol] += 1
+                continue
+            if value != value:
+                continue
+            item = (-value, str(symbol))
+            if len(board) >= self.k:
+                if self.k <= 0 or item >= board[-1][:2]:
+                    continue
+                del self.entries[board.pop()[2]]
+            bisect.insort(board, (*item, symbol, self._row_metadata(metadata, row)), key=lambda e: e[:2])
             self.entries[symbol] = 1
+        self._symbols = np.array([e[2] for e in board], dtype=object)
+        self._sort_vals = np.array([-e[0] for e in board], dtype=np.float64)
+        self._metadata = [e[3] for e in board]
 
     def get_results(self) -> List[Dict[str, Any]]:
-        # Return sorted results (best first)
+        # Return sorted results (best first); the board is kept in rank order.
+        self._flush()
         rank_multiplier = 1 if self.is_increase else -1
-        
-        # Sorted from smallest sort_val to largest.
-        # if is_increase=True: small to large. Reverse for "Rank 1 = Largest".
-        # if is_increase=False: small to large (-large_neg to -small_neg). 
-        #    Wait. If is_increase=False:
-        #    Value -10. sort_val = 10.
-        #    Value -2. sort_val = 2.
-        #    Heap has [2, 10]. Sorted: 2, 10.
-        #    Reverse: 10, 2.
-        #    Unpack: -10, -2.
-        #    Correct.
-        
-        sorted_heap = sorted(self.heap, key=lambda x: x.sort_val, reverse=True)
-        
         return [{
-            "symbol": r.symbol,
-            "value": r.sort_val * rank_multiplier,
-            "metadata": r.metadata,
+            "symbol": symbol,
+            "value": float(sort_val) * rank_multiplier,
+            "metadata": meta,
             "rank": idx + 1
-        } for idx, r in enumerate(sorted_heap)]
+        } for idx, (symbol, sort_val, meta) in enumerate(
+            zip(self._symbols.tolist(), self._sort_vals.tolist(), self._metadata)
+        )]
+
+
+class MultiMetricLeaderboard:
+    """
+    One Top K board per metric, all fed from the same batch of symbols.
+    The symbol index (repeat detection) is built once per batch and shared.
+    """
+
+    def __init__(self, k: int, metrics: Sequence[str], is_increase: bool = True):
+        self.boards: Dict[str, MarketLeaderboard] = {m: MarketLeaderboard(k, is_increase) for m in metrics}
+
+    def add_many(
+        self,
+        symbols: Union[Sequence[str], np.ndarray],
+        values: Mapping[str, np.ndarray],
+        metadata: Optional[Callable[[str, int], dict]] = None,
+    ):
+        """
+        ``values`` maps metrics to arrays aligned with ``symbols`` (metrics left
+        out are not updated); ``metadata(metric, i)``.
+        """
+        symbols = np.asarray(symbols, dtype=object)
+        index = pd.Index(symbols)
+        for metric, metric_values in values.items():
+            meta = (lambda i, m=metric: metadata(m, i)) if metadata is not None else None
+            self.boards[metric].add_many(symbols, metric_values, meta, index=index)
+
+    def get_results(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {metric: board.get_results() for metric, board in self.boards.items()}
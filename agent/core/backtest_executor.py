@@ -2,18 +2,21 @@
 Level 2 backtest executor — supports equities, options, and futures.
 
 Uses real Polygon.io data for equities/options and Databento for futures.
-Indicators computed with pandas_ta.
+Indicators are computed by the NumPy kernels in core.indicators; pandas_ta is
+only imported for indicators those kernels don't provide.
 """
 from __future__ import annotations
 
+import asyncio
 import os
 import math
-from datetime import datetime, timedelta
-from typing import Any
+import re
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Callable
 
 import numpy as np
 import pandas as pd
-import pandas_ta as ta  # noqa: F401 — enables df.ta accessor
 from pydantic import BaseModel
 
 from core.polygon_agent import (
@@ -21,6 +24,19 @@ from core.polygon_agent import (
     FuturesDataFetcher,
     _get_polygon_fetcher as _get_default_fetcher,
 )
+from core.http_client import get_http_client
+from core.backtest_jobs import progress_reporter, report_progress
+from core.bar_cache import bar_array_to_frame, bars_to_array, get_bar_cache
+from core import indicators as kernels
+from core.indicator_cache import get_indicator_cache
+from core.monte_carlo import MonteCarloOptions, simulate as simulate_monte_carlo
+from core.option_pricing import bs_greeks, bs_price, implied_vol
+from core.option_chain_store import (
+    OPTION_CHAIN_STRIKE_WINDOW_PCT,
+    ChainWindow,
+    HistoricalChain,
+    get_option_chain_store,
+)
 
 # Prefer MASSIVE_API_KEY (which has aggregates access) over POLYGON_API_KEY
 _backtest_fetcher: PolygonDataFetcher | None = None
@@ -52,8 +68,6 @@ async def _fetch_bars_via_server(
     """Fetch bars through the server's /api/market/aggs endpoint which has
     MongoDB caching, rate-limit handling, WebSocket fallback, and retry logic.
     This avoids hitting Polygon/Massive API directly."""
-    import httpx
-
     # Calculate window size from date range (trading days ≈ calendar days * 5/7)
     try:
         from datetime import datetime as _dt
@@ -70,25 +84,161 @@ async def _fetch_bars_via_server(
         "multiplier": multiplier,
         "timespan": timespan,
         "window": window,
+        "from": start_date[:10],
+        "to": end_date[:10],
     }
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        results = data.get("results", [])
-        # Normalize server bar format to match Polygon format
-        normalized = []
-        for bar in results:
-            if isinstance(bar, dict):
-                normalized.append({
-                    "t": bar.get("t") or bar.get("timestamp"),
-                    "o": bar.get("o") or bar.get("open"),
-                    "h": bar.get("h") or bar.get("high"),
-                    "l": bar.get("l") or bar.get("low"),
-                    "c": bar.get("c") or bar.get("close"),
-                    "v": bar.get("v") or bar.get("volume", 0),
-                })
-        return normalized
+    response = await get_http_client().get(url, params=params, timeout=30.0)
+    response.raise_for_status()
+    data = response.json()
+    results = data.get("results", [])
+    # Normalize server bar format to match Polygon format
+    normalized = []
+    for bar in results:
+        if isinstance(bar, dict):
+            normalized.append({
+                "t": bar.get("t") or bar.get("timestamp"),
+                "o": bar.get("o") or bar.get("open"),
+                "h": bar.get("h") or bar.get("high"),
+                "l": bar.get("l") or bar.get("low"),
+                "c": bar.get("c") or bar.get("close"),
+                "v": bar.get("v") or bar.get("volume", 0),
+            })
+    return normalized
+
+# Polygon's per-request row cap for /v2/aggs; a full page means the range was cut short.
+AGGS_FETCH_LIMIT = 50000
+# Bar loops publish job progress (and yield to the event loop) this often.
+PROGRESS_EVERY_BARS = 250
+# Concurrent page requests when an intraday range is split to fit AGGS_FETCH_LIMIT.
+BAR_FETCH_CONCURRENCY = max(1, int(os.getenv("BAR_FETCH_CONCURRENCY", "4")))
+# Bars of history loaded ahead of start_date on intraday runs, so indicators
+# are already warm on the first session instead of restarting from NaN.
+INTRADAY_WARMUP_BARS = int(os.getenv("INTRADAY_WARMUP_BARS", "100"))
+
+# Backtest timeframes as (multiplier, timespan) aggregate parameters.
+TIMEFRAMES: dict[str, tuple[int, str]] = {
+    "day": (1, "day"),
+    "1min": (1, "minute"),
+    "5min": (5, "minute"),
+    "15min": (15, "minute"),
+}
+_TIMEFRAME_ALIASES = {"1d": "day", "daily": "day", "1m": "1min", "5m": "5min", "15m": "15min"}
+_SESSION_MINUTES = 390  # 9:30-16:00 ET
+_EXTENDED_DAY_MINUTES = 960  # 4:00-20:00 ET, what minute aggregates cover
+
+
+def _parse_timeframe(timeframe: str) -> tuple[int, str]:
+    key = _TIMEFRAME_ALIASES.get(timeframe.lower(), timeframe.lower())
+    if key not in TIMEFRAMES:
+        raise ValueError(f"timeframe must be one of {sorted(TIMEFRAMES)}.")
+    return TIMEFRAMES[key]
+
+
+def _bars_per_session(multiplier: int, timespan: str) -> int:
+    if timespan == "minute":
+        return max(1, _SESSION_MINUTES // multiplier)
+    return 1
+
+
+async def _fetch_bar_chunk(
+    fetcher: PolygonDataFetcher,
+    ticker: str,
+    multiplier: int,
+    timespan: str,
+    start_date: str,
+    end_date: str,
+) -> tuple[list[dict[str, Any]], bool]:
+    """Fetch one date range: server first, direct API if the server can't serve it.
+
+    Returns ``(bars, truncated)``. The server trims its answer to a bar window,
+    so a reply that starts well after ``start_date`` is treated as incomplete.
+    """
+    try:
+        bars = await _fetch_bars_via_server(ticker, multiplier, timespan, start_date, end_date)
+        arr = bars_to_array(bars)
+        head_limit = pd.Timestamp(start_date[:10], tz="America/New_York") + pd.Timedelta(days=5)
+        if len(arr) and arr["t"][0] <= head_limit.value // 1_000_000:
+            return bars, False
+    except Exception:
+        pass
+    raw = await fetcher.get_intraday_aggregates(ticker, multiplier, timespan, start_date, end_date, AGGS_FETCH_LIMIT)
+    bars = raw.get("results", [])
+    return bars, len(bars) >= AGGS_FETCH_LIMIT
+
+
+async def _fetch_bar_range(
+    fetcher: PolygonDataFetcher,
+    ticker: str,
+    multiplier: int,
+    timespan: str,
+    start_date: str,
+    end_date: str,
+) -> tuple[np.ndarray, bool]:
+    """Fetch a date range as a ``BAR_DTYPE`` array; returns ``(bars, truncated)``.
+
+    Minute ranges are split into pages of few enough days to stay under
+    AGGS_FETCH_LIMIT and fetched concurrently. A page that still comes back
+    full is continued from its last (possibly partial) session.
+    """
+    if timespan != "minute":
+        bars, truncated = await _fetch_bar_chunk(fetcher, ticker, multiplier, timespan, start_date, end_date)
+        return bars_to_array(bars), truncated
+
+    start = datetime.strptime(start_date[:10], "%Y-%m-%d").date()
+    end = datetime.strptime(end_date[:10], "%Y-%m-%d").date()
+    page_days = max(1, int(AGGS_FETCH_LIMIT * 0.9 * multiplier / _EXTENDED_DAY_MINUTES))
+    pages: list[tuple[date, date]] = []
+    cursor = start
+    while cursor <= end:
+        pages.append((cursor, min(cursor + timedelta(days=page_days - 1), end)))
+        cursor += timedelta(days=page_days)
+    slots = asyncio.Semaphore(BAR_FETCH_CONCURRENCY)
+
+    async def fetch_page(lo: date, hi: date) -> tuple[list[np.ndarray], bool]:
+        parts: list[np.ndarray] = []
+        while True:
+            async with slots:
+                bars, truncated = await _fetch_bar_chunk(
+                    fetcher, ticker, multiplier, timespan, lo.isoformat(), hi.isoformat(),
+                )
+            arr = bars_to_array(bars)
+            parts.append(arr)
+            if not truncated or not len(arr):
+                return parts, False
+            last_day = pd.Timestamp(int(arr["t"][-1]), unit="ms", tz="America/New_York").date()
+            if last_day <= lo:
+                return parts, True  # one session alone exceeds the cap
+            lo = last_day
+
+    results = await asyncio.gather(*(fetch_page(lo, hi) for lo, hi in pages))
+    merged = bars_to_array(np.concatenate([part for parts, _ in results for part in parts]))
+    return merged, any(truncated for _, truncated in results)
+
+
+async def _load_bars(
+    fetcher: PolygonDataFetcher,
+    ticker: str,
+    multiplier: int,
+    timespan: str,
+    start_date: str,
+    end_date: str,
+    dtype: np.dtype | type = np.float64,
+) -> pd.DataFrame:
+    """Bars for a date range as an OHLCV DataFrame, served from the on-disk cache.
+
+    Only date gaps missing from the cache hit the network; raises if a needed
+    range can't be fetched from either the server or the direct API.
+    """
+    async def fetch(start: str, end: str) -> tuple[np.ndarray, bool]:
+        return await _fetch_bar_range(fetcher, ticker, multiplier, timespan, start, end)
+
+    cache = get_bar_cache()
+    if cache is None:
+        arr, _ = await fetch(start_date[:10], end_date[:10])
+    else:
+        arr, _ = await cache.get_range(ticker.upper(), multiplier, timespan, start_date, end_date, fetch)
+    return bar_array_to_frame(arr, dtype)
+
 
 # ── Pydantic models ──────────────────────────────────────────────────────────
 
@@ -101,6 +251,12 @@ class BacktestRequest(BaseModel):
     initial_capital: float = 100_000
     slippage_bps: float = 5
     commission: float = 1.0
+    # Bar size: day | 1min | 5min | 15min. Intraday runs use regular-hours bars.
+    timeframe: str = "day"
+    # Restart indicators every session instead of carrying them across days.
+    reset_indicators_daily: bool = False
+    # Resample the trade returns into this many paths for risk distributions.
+    monte_carlo: MonteCarloOptions | None = None
 
 
 class BacktestResponse(BaseModel):
@@ -111,6 +267,7 @@ class BacktestResponse(BaseModel):
     sharpeRatio: float | None = None
     maxDrawdownPct: float | None = None
     equityCurve: list[dict[str, Any]] = []
+    monteCarlo: dict[str, Any] | None = None
     diagnostics: dict[str, Any] = {}
 
 
@@ -137,21 +294,114 @@ FUTURES_TICK_VALUE: dict[str, dict[str, float]] = {
 
 # ── Indicator computation ─────────────────────────────────────────────────────
 
-def compute_indicators(df: pd.DataFrame, required: list[str]) -> pd.DataFrame:
-    """Add indicator columns to a DataFrame with OHLCV columns."""
+def _vwap_columns(df: pd.DataFrame) -> dict[str, Any]:
+    sessions = kernels.session_days(df.index)
+    if sessions is None:
+        return {"VWAP": None}
+    return {"VWAP": kernels.vwap(
+        df["high"].to_numpy(np.float64), df["low"].to_numpy(np.float64),
+        df["close"].to_numpy(np.float64), df["volume"].to_numpy(np.float64), sessions,
+    )}
+
+
+def _macd_columns(df: pd.DataFrame) -> dict[str, Any]:
+    line, signal = kernels.macd(df["close"].to_numpy(np.float64), fast=9, slow=20, signal=9)
+    return {"MACD": line, "SIGNAL": signal}
+
+
+# Indicator group -> the columns it adds. MACD and SIGNAL come from one call,
+# so they are computed (and cached) together. Changing what a group returns
+# needs a bump of INDICATOR_CACHE_VERSION (core.indicator_cache).
+_INDICATOR_GROUPS: dict[str, Any] = {
+    "RSI_14": lambda df: {"RSI": kernels.rsi(df["close"].to_numpy(np.float64), 14)},
+    "EMA_9": lambda df: {"EMA_9": kernels.ema(df["close"].to_numpy(np.float64), 9)},
+    "EMA_20": lambda df: {"EMA_20": kernels.ema(df["close"].to_numpy(np.float64), 20)},
+    "VWAP": _vwap_columns,
+    "MACD_9_20_9": _macd_columns,
+}
+
+# Other "<NAME>_<length>" fields (e.g. SMA_50, ATR_14) go to the pandas_ta
+# function of that name, which is imported on first use.
+_PANDAS_TA_FIELD = re.compile(r"^([A-Z][A-Z0-9]*)_(\d+)$")
+_PANDAS_TA_PREFIX = "pandas_ta:"
+
+
+def _pandas_ta_columns(df: pd.DataFrame, field: str) -> dict[str, Any]:
+    try:
+        import pandas_ta  # noqa: F401 — registers the df.ta accessor
+    except ImportError:
+        return {}
+    match = _PANDAS_TA_FIELD.match(field)
+    func = getattr(df.ta, match.group(1).lower(), None) if match else None
+    if func is None:
+        return {}
+    result = func(length=int(match.group(2)))
+    # The accessor hands back the frame itself when there are too few bars.
+    if not isinstance(result, pd.Series):
+        return {field: None}
+    return {field: result}
+
+
+def _required_indicator_groups(df: pd.DataFrame, required: list[str]) -> list[str]:
+    groups: list[str] = []
     if "RSI" in required:
-        df["RSI"] = df.ta.rsi(length=14)
+        groups.append("RSI_14")
     if "EMA_9" in required:
-        df["EMA_9"] = df.ta.ema(length=9)
+        groups.append("EMA_9")
     if "EMA_20" in required:
-        df["EMA_20"] = df.ta.ema(length=20)
+        groups.append("EMA_20")
     if "VWAP" in required and "volume" in df.columns:
-        df["VWAP"] = df.ta.vwap()
+        groups.append("VWAP")
     if "MACD" in required or "SIGNAL" in required:
-        macd_df = df.ta.macd(fast=9, slow=20, signal=9)
-        if macd_df is not None and len(macd_df.columns) >= 3:
-            df["MACD"] = macd_df.iloc[:, 0]
-            df["SIGNAL"] = macd_df.iloc[:, 2]
+        groups.append("MACD_9_20_9")
+    for field in required:
+        if field not in _INDICATOR_GROUPS and field not in df.columns and _PANDAS_TA_FIELD.match(field):
+            groups.append(_PANDAS_TA_PREFIX + field)
+    return groups
+
+
+def compute_session_indicators(df: pd.DataFrame, required: list[str], reset_daily: bool = False) -> pd.DataFrame:
+    """``compute_indicators`` that optionally restarts every indicator each session.
+
+    By default indicators run continuously across sessions (VWAP is
+    session-anchored either way); ``reset_daily`` computes each day on its own.
+    """
+    if not reset_daily:
+        return compute_indicators(df, required)
+    bounds = _session_bounds(df.index).tolist()
+    if len(bounds) <= 2:
+        return compute_indicators(df, required)
+    parts = [compute_indicators(df.iloc[lo:hi].copy(), required) for lo, hi in zip(bounds[:-1], bounds[1:])]
+    return pd.concat(parts)
+
+
+def compute_indicators(df: pd.DataFrame, required: list[str]) -> pd.DataFrame:
+    """Add indicator columns to a DataFrame with OHLCV columns.
+
+    Results are memoized per bar-data fingerprint, so re-running over the same
+    bars only computes indicator groups that haven't been computed before.
+    """
+    def compute(group: str) -> dict[str, np.ndarray]:
+        if group.startswith(_PANDAS_TA_PREFIX):
+            columns = _pandas_ta_columns(df, group[len(_PANDAS_TA_PREFIX):])
+        else:
+            columns = _INDICATOR_GROUPS[group](df)
+        # None means too few bars for the lookback.
+        return {
+            name: np.full(len(df), np.nan) if values is None else np.asarray(values, dtype=np.float64)
+            for name, values in columns.items()
+        }
+
+    groups = _required_indicator_groups(df, required)
+    cache = get_indicator_cache()
+    if cache is None:
+        columns = {name: values for group in groups for name, values in compute(group).items()}
+    else:
+        columns = cache.get_or_compute(df, groups, compute)
+    # Indicator columns follow the bar precision (float32 on intraday frames).
+    dtype = df["close"].dtype if df["close"].dtype.kind == "f" else np.float64
+    for name, values in columns.items():
+        df[name] = values.astype(dtype, copy=True)
     df["PRICE"] = df["close"]
     return df
 
@@ -211,21 +461,75 @@ def evaluate_rules(
     return True
 
 
-# ── Analytics helpers ─────────────────────────────────────────────────────────
+def _field_array(df: pd.DataFrame, field: str) -> np.ndarray | None:
+    if field not in df.columns:
+        return None
+    return pd.to_numeric(df[field], errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _compare_arrays(op: str, left: np.ndarray, right: np.ndarray, prev_left: np.ndarray) -> np.ndarray:
+    """Array form of _compare. NaN operands compare False, like a missing prev value."""
+    with np.errstate(invalid="ignore"):
+        if op == "lt":
+            return left < right
+        if op == "lte":
+            return left <= right
+        if op == "gt":
+            return left > right
+        if op == "gte":
+            return left >= right
+        if op == "eq":
+            return np.abs(left - right) < 1e-6
+        if op == "touches":
+            denom = np.maximum(np.abs(right), 1.0)
+            return np.abs(left - right) / denom <= 0.0025
+        if op == "crosses_above":
+            return (prev_left <= right) & (left > right)
+        if op == "crosses_below":
+            return (prev_left >= right) & (left < right)
+    return np.zeros(np.shape(left), dtype=bool)
+
+
+def compile_rules(rules: list[dict[str, Any]], df: pd.DataFrame) -> np.ndarray:
+    """Evaluate AND-ed rules over every bar in one pass.
+
+    Returns a boolean mask where ``mask[i]`` equals
+    ``evaluate_rules(rules, row_i, row_{i-1})``.
+    """
+    n = len(df)
+    mask = np.ones(n, dtype=bool)
+    for rule in rules:
+        left = _field_array(df, rule["field"])
+        if left is None:
+            return np.zeros(n, dtype=bool)
+
+        target = rule.get("value")
+        if isinstance(target, str):
+            right = _field_array(df, target)
+            if right is None:
+                return np.zeros(n, dtype=bool)
+        elif target is None:
+            return np.zeros(n, dtype=bool)
+        else:
+            right = np.full(n, float(target))
+
+        prev_left = np.empty(n, dtype=np.float64)
+        if n:
+            prev_left[0] = np.nan
+            prev_left[1:] = left[:-1]
+
+        mask &= _compare_arrays(rule["operator"], left, right, prev_left)
+        mask &= ~np.isnan(left) & ~np.isnan(right)
+    return mask
 
-def _compute_analytics(
-    trades: list[dict[str, Any]], initial_capital: float
-) -> tuple[float | None, float | None, list[dict[str, Any]]]:
-    """Returns (sharpe_ratio, max_drawdown_pct, equity_curve)."""
-    if not trades:
-        return None, None, []
 
+# ── Analytics helpers ─────────────────────────────────────────────────────────
+
+def _trade_returns(trades: list[dict[str, Any]], initial_capital: float) -> tuple[list[float], list[float]]:
+    """Per-trade returns (fraction of pre-trade equity) and equity after each trade."""
     equity = initial_capital
-    curve: list[dict[str, Any]] = [{"timestamp": trades[0]["entryTime"], "equity": equity}]
     returns: list[float] = []
-    peak = equity
-
-    max_dd = 0.0
+    equities: list[float] = []
     for t in trades:
         # For credit spreads: risk a fixed % of account per trade (default 2%)
         # Dollar P&L = (pnl% of maxLoss) * number_of_contracts
@@ -238,6 +542,23 @@ def _compute_analytics(
             pnl_dollar = t["pnl"] / 100.0 * equity
         equity += pnl_dollar
         returns.append(pnl_dollar / max(equity - pnl_dollar, 1))  # return as fraction of pre-trade equity
+        equities.append(equity)
+    return returns, equities
+
+
+def _compute_analytics(
+    trades: list[dict[str, Any]], initial_capital: float
+) -> tuple[float | None, float | None, list[dict[str, Any]]]:
+    """Returns (sharpe_ratio, max_drawdown_pct, equity_curve)."""
+    if not trades:
+        return None, None, []
+
+    returns, equities = _trade_returns(trades, initial_capital)
+    curve: list[dict[str, Any]] = [{"timestamp": trades[0]["entryTime"], "equity": initial_capital}]
+    peak = initial_capital
+
+    max_dd = 0.0
+    for t, equity in zip(trades, equities):
         curve.append({"timestamp": t["exitTime"], "equity": round(equity, 2)})
         if equity > peak:
             peak = equity
@@ -343,6 +664,35 @@ def _mid_price(contract: dict[str, Any]) -> float | None:
 
 # ── Main execution paths ─────────────────────────────────────────────────────
 
+async def _load_equity_frame(
+    fetcher: PolygonDataFetcher,
+    ticker: str,
+    start_date: str,
+    end_date: str,
+    timeframe: str = "day",
+) -> pd.DataFrame | None:
+    """Fetch equity bars as a DataFrame (None if no bars).
+
+    Intraday frames are float32, trimmed to regular trading hours and start
+    with enough earlier sessions to warm up indicators; use
+    ``_session_start_row`` to find where ``start_date`` begins.
+    """
+    multiplier, timespan = _parse_timeframe(timeframe)
+    if timespan == "day":
+        df = await _load_bars(fetcher, ticker, multiplier, timespan, start_date, end_date)
+        return None if df.empty else df
+
+    sessions = -(-INTRADAY_WARMUP_BARS // _bars_per_session(multiplier, timespan))
+    # Calendar days covering that many sessions, with room for weekends and holidays.
+    lead_days = sessions * 7 // 5 + 4 if INTRADAY_WARMUP_BARS > 0 else 0
+    warm_start = (datetime.strptime(start_date[:10], "%Y-%m-%d") - timedelta(days=lead_days)).strftime("%Y-%m-%d")
+    df = await _load_bars(fetcher, ticker, multiplier, timespan, warm_start, end_date, dtype=np.float32)
+    if df.empty:
+        return None
+    df = _filter_market_hours(df)
+    return None if df.empty else df
+
+
 async def _run_equities(
     fetcher: PolygonDataFetcher,
     spec: dict[str, Any],
@@ -350,26 +700,26 @@ async def _run_equities(
     start_date: str,
     end_date: str,
     slippage_pct: float,
+    timeframe: str = "day",
+    reset_indicators_daily: bool = False,
 ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
     """Equity backtest: bar-by-bar on stock prices."""
-    try:
-        bars = await _fetch_bars_via_server(ticker, 1, "day", start_date, end_date)
-    except Exception:
-        raw = await fetcher.get_intraday_aggregates(ticker, 1, "day", start_date, end_date, 5000)
-        bars = raw.get("results", [])
-    if not bars:
+    df = await _load_equity_frame(fetcher, ticker, start_date, end_date, timeframe)
+    if df is None:
         return [], {"provider": "server", "barsLoaded": 0, "usedFallbackData": False}
-
-    df = _bars_to_dataframe(bars)
-    df = _filter_market_hours(df)
-    if len(df) < 21:
-        return [], {"provider": "polygon", "barsLoaded": len(df), "usedFallbackData": False}
+    first = _session_start_row(df, start_date)
+    if len(df) - first < 21:
+        return [], {"provider": "polygon", "barsLoaded": len(df) - first, "usedFallbackData": False}
+    await report_progress(0, len(df), 0)
 
     indicators = spec.get("indicators", [])
-    df = compute_indicators(df, indicators)
+    df = compute_session_indicators(df, indicators, reset_indicators_daily)
+    await report_progress(first, len(df), 0)
 
-    trades = _walk_bars(df, spec, slippage_pct)
-    return trades, {"provider": "polygon", "barsLoaded": len(df), "usedFallbackData": False}
+    trades = await asyncio.to_thread(
+        _walk_bars, df, spec, slippage_pct, warmup=max(20, first), progress=progress_reporter(),
+    )
+    return trades, {"provider": "polygon", "barsLoaded": len(df) - first, "warmupBars": first, "usedFallbackData": False}
 
 
 async def _run_options(
@@ -379,6 +729,8 @@ async def _run_options(
     start_date: str,
     end_date: str,
     slippage_pct: float,
+    timeframe: str = "day",
+    reset_indicators_daily: bool = False,
 ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
     """Options backtest: signals from underlying, trades on option contracts."""
     opts = cs.get("options", cs)
@@ -390,22 +742,18 @@ async def _run_options(
     dte_min = int(opts.get("dteMin", opts.get("dte_min", 7)))
     dte_max = int(opts.get("dteMax", opts.get("dte_max", 45)))
 
-    # Fetch underlying bars via server (cached) for indicator signals
-    try:
-        bars = await _fetch_bars_via_server(underlying, 1, "day", start_date, end_date)
-    except Exception:
-        raw = await fetcher.get_intraday_aggregates(underlying, 1, "day", start_date, end_date, 5000)
-        bars = raw.get("results", [])
-    if not bars:
+    # Fetch underlying bars (disk cache, then server/direct API) for indicator signals
+    df = await _load_equity_frame(fetcher, underlying, start_date, end_date, timeframe)
+    if df is None:
         return [], {"provider": "server", "barsLoaded": 0, "usedFallbackData": False}
 
-    df = _bars_to_dataframe(bars)
-    df = _filter_market_hours(df)
-    if len(df) < 21:
-        return [], {"provider": "polygon", "barsLoaded": len(df), "usedFallbackData": False}
+    first = _session_start_row(df, start_date)
+    if len(df) - first < 21:
+        return [], {"provider": "polygon", "barsLoaded": len(df) - first, "usedFallbackData": False}
 
     indicators = spec.get("indicators", [])
-    df = compute_indicators(df, indicators)
+    df = compute_session_indicators(df, indicators, reset_indicators_daily)
+    bars_per_session = _bars_per_session(*_parse_timeframe(timeframe))
 
     entry_rules = spec.get("rules", {}).get("entry", [])
     exit_rules = spec.get("rules", {}).get("exit", [])
@@ -416,6 +764,9 @@ async def _run_options(
     action = spec.get("execution", {}).get("action", "BUY")
     direction = 1 if action in ("BUY",) else -1
 
+    entry_mask = compile_rules(entry_rules, df)
+    exit_mask = compile_rules(exit_rules, df)
+
     trades: list[dict[str, Any]] = []
     in_trade = False
     entry_idx = 0
@@ -423,12 +774,12 @@ async def _run_options(
     entry_contract = ""
     entry_dte = 0
 
-    rows = list(df.iterrows())
+    rows = _bar_rows(df)
     for i, (idx, row) in enumerate(rows):
-        prev_row = rows[i - 1][1] if i > 0 else None
-
+        if i % PROGRESS_EVERY_BARS == 0:
+            await report_progress(i, len(rows), len(trades))
         if not in_trade:
-            if evaluate_rules(entry_rules, row, prev_row):
+            if i >= first and entry_mask[i]:
                 # Select contract from options chain
                 try:
                     chain = await fetcher.get_options_snapshot(
@@ -458,7 +809,7 @@ async def _run_options(
             # Use a simple model: premium moves proportionally
             est_premium = entry_premium * (1 + direction * underlying_return * 3)  # leverage factor ~3x
             # Decay: lose ~1/dte of premium per day (rough)
-            day_fraction = bars_held / 390  # 390 min per trading day
+            day_fraction = bars_held / bars_per_session
             decay = entry_premium * (day_fraction / max(entry_dte, 1))
             est_premium = max(est_premium - decay, 0.01)
 
@@ -468,7 +819,7 @@ async def _run_options(
             reason = ""
             should_exit = False
 
-            if evaluate_rules(exit_rules, row, prev_row):
+            if exit_mask[i]:
                 reason = "rule_exit"
                 should_exit = True
             elif pnl_pct >= tp_pct * 100:
@@ -480,7 +831,7 @@ async def _run_options(
             elif bars_held >= max_bars:
                 reason = "max_bars"
                 should_exit = True
-            elif entry_dte - (bars_held // 390) <= 0:
+            elif entry_dte - (bars_held // bars_per_session) <= 0:
                 reason = "expiration"
                 should_exit = True
 
@@ -505,22 +856,15 @@ async def _run_options(
                 })
                 in_trade = False
 
-    return trades, {"provider": "polygon", "barsLoaded": len(df), "usedFallbackData": False}
+    return trades, {"provider": "polygon", "barsLoaded": len(df) - first, "warmupBars": first, "usedFallbackData": False}
 
 
-async def _run_futures(
-    spec: dict[str, Any],
-    cs: dict[str, Any],
+async def _load_futures_frame(
+    symbol: str,
     start_date: str,
     end_date: str,
-    slippage_pct: float,
-) -> tuple[list[dict[str, Any]], dict[str, Any]]:
-    """Futures backtest: daily bars with tick-value P&L."""
-    fut_cs = cs.get("futures", cs)
-    symbol = fut_cs.get("symbol", "ES").upper()
-    spec_info = FUTURES_TICK_VALUE.get(symbol, FUTURES_TICK_VALUE["ES"])
-    multiplier = spec_info["multiplier"]
-
+) -> tuple[pd.DataFrame | None, str, bool]:
+    """Fetch daily futures bars. Returns (df or None if no bars, provider, usedFallbackData)."""
     fetcher = FuturesDataFetcher(
         databento_api_key=os.getenv("DATABENTO_API_KEY"),
         quandl_api_key=os.getenv("QUANDL_API_KEY"),
@@ -531,9 +875,12 @@ async def _run_futures(
     fallback = raw.get("fallback", False)
 
     if not bars:
-        return [], {"provider": provider, "barsLoaded": 0, "usedFallbackData": fallback}
+        return None, provider, fallback
 
-    df = pd.DataFrame(bars)
+    # Futures providers emit Polygon-style short keys (o/h/l/c/v).
+    df = pd.DataFrame(bars).rename(
+        columns={"o": "open", "h": "high", "l": "low", "c": "close", "v": "volume"}
+    )
     for col in ("open", "high", "low", "close", "volume"):
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce")
@@ -543,26 +890,104 @@ async def _run_futures(
     elif "timestamp" in df.columns:
         df.index = pd.to_datetime(df["timestamp"])
 
+    return df, provider, fallback
+
+
+async def _run_futures(
+    spec: dict[str, Any],
+    cs: dict[str, Any],
+    start_date: str,
+    end_date: str,
+    slippage_pct: float,
+) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """Futures backtest: daily bars with tick-value P&L."""
+    fut_cs = cs.get("futures", cs)
+    symbol = fut_cs.get("symbol", "ES").upper()
+    spec_info = FUTURES_TICK_VALUE.get(symbol, FUTURES_TICK_VALUE["ES"])
+    multiplier = spec_info["multiplier"]
+
+    df, provider, fallback = await _load_futures_frame(symbol, start_date, end_date)
+    if df is None:
+        return [], {"provider": provider, "barsLoaded": 0, "usedFallbackData": fallback}
+
     if len(df) < 21:
         return [], {"provider": provider, "barsLoaded": len(df), "usedFallbackData": fallback}
+    await report_progress(0, len(df), 0)
 
     indicators = spec.get("indicators", [])
     df = compute_indicators(df, indicators)
+    await report_progress(0, len(df), 0)
 
-    trades = _walk_bars(df, spec, slippage_pct, futures_multiplier=multiplier, contract_spec=f"{symbol} continuous")
+    trades = await asyncio.to_thread(
+        _walk_bars, df, spec, slippage_pct,
+        futures_multiplier=multiplier, contract_spec=f"{symbol} continuous", progress=progress_reporter(),
+    )
     return trades, {"provider": provider, "barsLoaded": len(df), "usedFallbackData": fallback}
 
 
 # ── Shared bar-walking engine (equities + futures) ────────────────────────────
 
+def _scan_exit(
+    close: list[float],
+    exit_mask: list[bool],
+    entry_idx: int,
+    entry_price: float,
+    direction: int,
+    slippage_pct: float,
+    sl_pct: float,
+    tp_pct: float,
+    max_bars: int,
+    futures_multiplier: float | None,
+) -> tuple[int, str, float, float]:
+    """Find the exit bar for a position opened at ``entry_idx``.
+
+    Runs on plain lists (no per-row pandas access) and applies the exit checks
+    in the same priority order as the rule evaluation. Returns
+    (exit_idx, reason, exit_price, pnl_pct).
+    """
+    last = len(close) - 1
+    exit_factor = 1 - slippage_pct * direction
+    tp_level = tp_pct * 100
+    sl_level = -sl_pct * 100
+    for i in range(entry_idx + 1, last + 1):
+        exit_price = close[i] * exit_factor
+        if futures_multiplier:
+            ret = (exit_price - entry_price) * direction * futures_multiplier
+            pnl_pct = ret / (entry_price * futures_multiplier) * 100
+        else:
+            ret = (exit_price - entry_price) / entry_price * direction
+            pnl_pct = ret * 100
+
+        if exit_mask[i]:
+            return i, "rule_exit", exit_price, pnl_pct
+        if pnl_pct >= tp_level:
+            return i, "take_profit", exit_price, pnl_pct
+        if pnl_pct <= sl_level:
+            return i, "stop_loss", exit_price, pnl_pct
+        if i - entry_idx >= max_bars:
+            return i, "max_bars", exit_price, pnl_pct
+        if i == last:
+            return i, "end_of_test", exit_price, pnl_pct
+    raise ValueError("position opened on the final bar has no exit")
+
+
 def _walk_bars(
     df: pd.DataFrame,
     spec: dict[str, Any],
     slippage_pct: float,
     futures_multiplier: float | None = None,
     contract_spec: str | None = None,
+    warmup: int = 20,
+    progress: Callable[[int, int, int], None] | None = None,
 ) -> list[dict[str, Any]]:
-    """Walk through bars evaluating entry/exit rules. Used for equities and futures."""
+    """Walk through bars evaluating entry/exit rules. Used for equities and futures.
+
+    Rules are compiled to boolean masks up front; the position state machine
+    then jumps between entry candidates and exit bars instead of visiting
+    every row. No entries are taken in the first ``warmup`` bars.
+    ``progress(bars_processed, bars_total, trades)`` is called about every
+    ``PROGRESS_EVERY_BARS`` bars (see ``progress_reporter``).
+    """
     entry_rules = spec.get("rules", {}).get("entry", [])
     exit_rules = spec.get("rules", {}).get("exit", [])
     risk = spec.get("riskManagement", {})
@@ -572,100 +997,60 @@ def _walk_bars(
     action = spec.get("execution", {}).get("action", "BUY")
     direction = 1 if action in ("BUY",) else -1
 
+    n = len(df)
+    if n <= warmup + 1:
+        return []
+
+    close = df["close"].to_numpy(dtype=np.float64).tolist()
+    exit_mask = compile_rules(exit_rules, df).tolist()
+    # next_entry[i] = first bar >= i whose entry rules fire (n when none left).
+    entry_bars = np.append(np.where(compile_rules(entry_rules, df), np.arange(n), n), n)
+    entry_bars[:warmup] = n
+    next_entry = np.minimum.accumulate(entry_bars[::-1])[::-1].tolist()
+
+    fills: list[tuple[int, int, float, float, float, str]] = []
+    entry_idx = next_entry[warmup]
+    reported = 0
+    # A position opened on the final bar never exits and is not recorded.
+    while entry_idx < n - 1:
+        entry_price = close[entry_idx] * (1 + slippage_pct * direction)
+        exit_idx, reason, exit_price, pnl_pct = _scan_exit(
+            close, exit_mask, entry_idx, entry_price, direction,
+            slippage_pct, sl_pct, tp_pct, max_bars, futures_multiplier,
+        )
+        fills.append((entry_idx, exit_idx, entry_price, exit_price, pnl_pct, reason))
+        if progress is not None and exit_idx - reported >= PROGRESS_EVERY_BARS:
+            reported = exit_idx
+            progress(exit_idx + 1, n, len(fills))
+        entry_idx = next_entry[exit_idx + 1]
+    if progress is not None:
+        progress(n, n, len(fills))
+
+    # Box timestamps once for all fills rather than indexing df.index per trade.
+    stamps = [str(ts) for ts in df.index[[idx for fill in fills for idx in fill[:2]]]]
     trades: list[dict[str, Any]] = []
-    in_trade = False
-    entry_idx = 0
-    entry_price = 0.0
-
-    rows = list(df.iterrows())
-    for i, (idx, row) in enumerate(rows):
-        if i < 20:  # indicator warm-up
-            continue
-        prev_row = rows[i - 1][1] if i > 0 else None
-
-        if not in_trade:
-            if evaluate_rules(entry_rules, row, prev_row):
-                entry_price = float(row["close"]) * (1 + slippage_pct * direction)
-                entry_idx = i
-                in_trade = True
-                continue
-        else:
-            bars_held = i - entry_idx
-            exit_price = float(row["close"]) * (1 - slippage_pct * direction)
-
-            if futures_multiplier:
-                ret = (exit_price - entry_price) * direction * futures_multiplier
-                pnl_pct = ret / (entry_price * futures_multiplier) * 100
-            else:
-                ret = (exit_price - entry_price) / entry_price * direction
-                pnl_pct = ret * 100
-
-            reason = ""
-            should_exit = False
-
-            if evaluate_rules(exit_rules, row, prev_row):
-                reason = "rule_exit"
-                should_exit = True
-            elif pnl_pct >= tp_pct * 100:
-                reason = "take_profit"
-                should_exit = True
-            elif pnl_pct <= -sl_pct * 100:
-                reason = "stop_loss"
-                should_exit = True
-            elif bars_held >= max_bars:
-                reason = "max_bars"
-                should_exit = True
-
-            if should_exit or i == len(rows) - 1:
-                if not reason:
-                    reason = "end_of_test"
-                trade: dict[str, Any] = {
-                    "entryTime": str(rows[entry_idx][0]),
-                    "exitTime": str(idx),
-                    "side": "long" if direction == 1 else "short",
-                    "entryAction": action,
-                    "exitAction": "EXIT",
-                    "entryPrice": round(entry_price, 4),
-                    "exitPrice": round(exit_price, 4),
-                    "pnl": round(pnl_pct, 2),
-                    "barsHeld": bars_held,
-                    "reason": reason,
-                }
-                if contract_spec:
-                    trade["contractSpec"] = contract_spec
-                trades.append(trade)
-                in_trade = False
+    for k, (entry_idx, exit_idx, entry_price, exit_price, pnl_pct, reason) in enumerate(fills):
+        trade: dict[str, Any] = {
+            "entryTime": stamps[2 * k],
+            "exitTime": stamps[2 * k + 1],
+            "side": "long" if direction == 1 else "short",
+            "entryAction": action,
+            "exitAction": "EXIT",
+            "entryPrice": round(entry_price, 4),
+            "exitPrice": round(exit_price, 4),
+            "pnl": round(pnl_pct, 2),
+            "barsHeld": exit_idx - entry_idx,
+            "reason": reason,
+        }
+        if contract_spec:
+            trade["contractSpec"] = contract_spec
+        trades.append(trade)
 
     return trades
 
 
 # ── DataFrame helpers ─────────────────────────────────────────────────────────
 
-def _bars_to_dataframe(bars: list[dict[str, Any]]) -> pd.DataFrame:
-    """Convert Polygon aggregates to a pandas DataFrame."""
-    records = []
-    for bar in bars:
-        ts = bar.get("t")
-        if ts is None:
-            continue
-        records.append({
-            "timestamp": pd.Timestamp(ts, unit="ms", tz="America/New_York"),
-            "open": bar.get("o"),
-            "high": bar.get("h"),
-            "low": bar.get("l"),
-            "close": bar.get("c"),
-            "volume": bar.get("v", 0),
-        })
-    df = pd.DataFrame(records)
-    if df.empty:
-        return df
-    df = df.set_index("timestamp").sort_index()
-    for col in ("open", "high", "low", "close", "volume"):
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    df = df.dropna(subset=["open", "high", "low", "close"])
-    return df
-
-
 def _filter_market_hours(df: pd.DataFrame) -> pd.DataFrame:
     """Keep only regular trading hours: 9:30 AM - 4:00 PM ET."""
     if df.empty:
@@ -675,9 +1060,89 @@ def _filter_market_hours(df: pd.DataFrame) -> pd.DataFrame:
     return df[mask]
 
 
+def _session_start_row(df: pd.DataFrame, start_date: str) -> int:
+    """Row of the first bar on or after ``start_date``; earlier rows are warm-up."""
+    return int(df.index.searchsorted(pd.Timestamp(start_date[:10], tz="America/New_York")))
+
+
+def _session_bounds(index: pd.Index) -> np.ndarray:
+    """Start row of every session plus ``len(index)``."""
+    days = kernels.session_days(index)
+    if days is None:
+        return np.array([0, len(index)])
+    return np.append(np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1]))), len(index))
+
+
+def _bar_rows(df: pd.DataFrame) -> list[tuple[Any, dict[str, Any]]]:
+    """(timestamp, column dict) per bar; much cheaper than ``iterrows`` on long intraday frames."""
+    return list(zip(df.index, df.to_dict("records")))
+
+
 # ── Regime classification ─────────────────────────────────────────────────────
 
-_regime_cache: dict[str, str] = {}
+# Bounded LRU of "<date>-<tickers>" -> regime, shared across backtests.
+REGIME_CACHE_MAX_ENTRIES = int(os.getenv("REGIME_CACHE_MAX_ENTRIES", "4096"))
+_regime_cache: OrderedDict[str, str] = OrderedDict()
+
+
+def _regime_cache_key(day: str, risk_on_tickers: list[str], risk_off_tickers: list[str]) -> str:
+    return f"{day}-{','.join(sorted(risk_on_tickers + risk_off_tickers))}"
+
+
+def _remember_regime(key: str, regime: str) -> None:
+    _regime_cache[key] = regime
+    _regime_cache.move_to_end(key)
+    while len(_regime_cache) > REGIME_CACHE_MAX_ENTRIES:
+        _regime_cache.popitem(last=False)
+
+
+async def _classify_regimes(
+    fetcher: PolygonDataFetcher,
+    risk_on_tickers: list[str],
+    risk_off_tickers: list[str],
+    start_date: str,
+    end_date: str,
+) -> dict[str, str]:
+    """Regime for every session in a date range, from one bar load per ticker.
+
+    Each sampled ETF's daily bars for the whole range are loaded concurrently;
+    regimes then come from comparing the two sides' average open-to-close
+    returns for all dates at once. A ticker with no bar on a date counts as a
+    flat day, as it did when dates were classified one at a time.
+    """
+    # Only check 2 tickers per side to reduce API calls (most representative)
+    on_sample = risk_on_tickers[:2] if risk_on_tickers else ["XLK"]
+    off_sample = risk_off_tickers[:2] if risk_off_tickers else ["XLP"]
+    tickers = list(dict.fromkeys(on_sample + off_sample))
+    frames = await asyncio.gather(
+        *(_load_bars(fetcher, t, 1, "day", start_date, end_date) for t in tickers),
+        return_exceptions=True,
+    )
+
+    day_returns: dict[str, pd.Series] = {}
+    for ticker, df in zip(tickers, frames):
+        if isinstance(df, BaseException) or df.empty:
+            continue
+        opens = df["open"].to_numpy(np.float64)
+        closes = df["close"].to_numpy(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret = np.where(opens != 0, (closes - opens) / opens, 0.0)
+        day_returns[ticker] = pd.Series(ret, index=df.index.strftime("%Y-%m-%d")).groupby(level=0).last()
+    if not day_returns:
+        return {}
+
+    returns = pd.DataFrame(day_returns).reindex(columns=tickers).fillna(0.0)
+    risk_on_ret = returns[on_sample].to_numpy().mean(axis=1)
+    risk_off_ret = returns[off_sample].to_numpy().mean(axis=1)
+    regimes = np.where(
+        risk_on_ret > risk_off_ret + 0.001, "risk_on",
+        np.where(risk_off_ret > risk_on_ret + 0.001, "risk_off", "mixed"),
+    )
+
+    result = dict(zip(returns.index.tolist(), regimes.tolist()))
+    for day, regime in result.items():
+        _remember_regime(_regime_cache_key(day, risk_on_tickers, risk_off_tickers), regime)
+    return result
 
 
 async def _classify_regime(
@@ -686,36 +1151,19 @@ async def _classify_regime(
     risk_off_tickers: list[str],
     date: str,
 ) -> str:
-    """Classify the market regime on a given date by comparing sector ETF performance."""
-    cache_key = f"{date}-{','.join(sorted(risk_on_tickers + risk_off_tickers))}"
+    """Classify the market regime on a given date by comparing sector ETF performance.
+
+    Backtests should call ``_classify_regimes`` once for their whole range;
+    this single-date form is answered from the same cache.
+    """
+    cache_key = _regime_cache_key(date, risk_on_tickers, risk_off_tickers)
     if cache_key in _regime_cache:
+        _regime_cache.move_to_end(cache_key)
         return _regime_cache[cache_key]
 
-    import asyncio
-
-    async def _day_return(ticker: str) -> float:
-        try:
-            bars = await _fetch_bars_via_server(ticker, 1, "day", date, date)
-            if bars and bars[-1].get("o") and bars[-1].get("c"):
-                return (bars[-1]["c"] - bars[-1]["o"]) / bars[-1]["o"]
-        except Exception:
-            pass
-        return 0.0
-
-    # Only check 2 tickers per side to reduce API calls (most representative)
-    on_sample = risk_on_tickers[:2] if risk_on_tickers else ["XLK"]
-    off_sample = risk_off_tickers[:2] if risk_off_tickers else ["XLP"]
-    risk_on_ret = sum([await _day_return(t) for t in on_sample]) / len(on_sample)
-    risk_off_ret = sum([await _day_return(t) for t in off_sample]) / len(off_sample)
-
-    if risk_on_ret > risk_off_ret + 0.001:
-        regime = "risk_on"
-    elif risk_off_ret > risk_on_ret + 0.001:
-        regime = "risk_off"
-    else:
-        regime = "mixed"
-
-    _regime_cache[cache_key] = regime
+    regimes = await _classify_regimes(fetcher, risk_on_tickers, risk_off_tickers, date, date)
+    regime = regimes.get(date[:10], "mixed")
+    _remember_regime(cache_key, regime)
     return regime
 
 
@@ -777,6 +1225,250 @@ def _select_spread_legs(
     return short_leg, long_leg
 
 
+def _years_to_expiry(days_to_expiry: float, minutes_to_close: float) -> float:
+    """Trading-time years until an expiration's 16:00 close; zero once it has passed."""
+    return max(days_to_expiry * 390 + minutes_to_close, 0.0) / (252 * 390)
+
+
+def _select_spread_legs_from_history(
+    chain: HistoricalChain,
+    underlying_price: float,
+    contract_type: str,
+    delta_target: float,
+    spread_width: float,
+    dte_min: int,
+    dte_max: int,
+    iv: float,
+    minutes_to_close: float,
+) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+    """Same legs as ``_select_spread_legs``, picked from a replayed historical chain.
+
+    Historical chains carry no greeks, so each contract's vol is backed out of
+    its mid (``iv`` where the mid admits none) and delta comes from
+    Black-Scholes with the time left from the entry bar to the expiration's close.
+    """
+    is_put = contract_type.lower() == "put"
+    best: tuple[float, np.ndarray, int, int, np.ndarray, np.ndarray] | None = None
+    for expiration in chain.expirations(contract_type):
+        dte = (expiration - chain.session).days
+        if dte < dte_min or dte > dte_max:
+            continue
+        rows = chain.contracts(contract_type, expiration)
+        mid = HistoricalChain.mid(rows)
+        priced = np.flatnonzero(mid > 0)
+        if not len(priced):
+            continue
+        t_years = _years_to_expiry(dte, max(minutes_to_close, 1.0))
+        strikes = rows["strike"][priced].astype(np.float64)
+        leg_iv = np.full(len(rows), iv)
+        solved = implied_vol(mid[priced], underlying_price, strikes, t_years, is_put)
+        leg_iv[priced] = np.where(np.isfinite(solved), solved, iv)
+        leg_delta = np.full(len(rows), np.nan)
+        leg_delta[priced] = np.abs(bs_greeks(underlying_price, strikes, t_years, leg_iv[priced], is_put)["delta"])
+        j = int(priced[np.argmin(np.abs(leg_delta[priced] - delta_target))])
+        score = abs(float(leg_delta[j]) - delta_target)
+        if best is None or score < best[0]:
+            best = (score, rows, j, dte, leg_iv, leg_delta)
+    if best is None:
+        return None, None
+
+    _, rows, short_i, dte, leg_iv, leg_delta = best
+    mid = HistoricalChain.mid(rows)
+    expiration = chain.session + timedelta(days=dte)
+
+    def leg(i: int) -> dict[str, Any]:
+        return {
+            "symbol": str(rows["ticker"][i]),
+            "strike": float(rows["strike"][i]),
+            "dte": dte,
+            "mid": float(mid[i]),
+            "delta": float(leg_delta[i]),
+            "greeks": {"delta": float(leg_delta[i]), "iv": round(float(leg_iv[i]), 4)},
+            "expiration": expiration.isoformat(),
+        }
+
+    short_leg = leg(short_i)
+    if is_put:
+        long_strike_target = short_leg["strike"] - spread_width
+    else:
+        long_strike_target = short_leg["strike"] + spread_width
+    priced = np.flatnonzero((mid > 0) & (np.arange(len(rows)) != short_i))
+    if not len(priced):
+        return short_leg, None
+    long_i = int(priced[np.argmin(np.abs(rows["strike"][priced] - long_strike_target))])
+    return short_leg, leg(long_i)
+
+
+def _synthetic_spread_legs(
+    underlying: str,
+    underlying_price: float,
+    contract_type: str,
+    delta_target: float,
+    spread_width: float,
+    iv: float,
+    session: date,
+    dte: int,
+    minutes_to_close: float,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Black-Scholes-priced legs on a $1 strike ladder, for days without a chain.
+
+    The short strike is the rung whose delta is closest to ``delta_target``;
+    the long strike sits ``spread_width`` further out of the money. Mids are
+    rounded to the cent with a one-tick floor.
+    """
+    is_put = contract_type.lower() == "put"
+    t_years = _years_to_expiry(dte, max(minutes_to_close, 1.0))
+    reach = math.ceil(underlying_price * iv * math.sqrt(t_years) * 4 + spread_width)
+    center = round(underlying_price)
+    strikes = np.arange(max(center - reach, 1), center + reach + 1, dtype=np.float64)
+    ladder = bs_greeks(underlying_price, strikes, t_years, iv, is_put)
+    short_strike = float(strikes[np.argmin(np.abs(np.abs(ladder["delta"]) - delta_target))])
+    long_strike = short_strike - spread_width if is_put else short_strike + spread_width
+    quoted = bs_greeks(underlying_price, np.array([short_strike, long_strike]), t_years, iv, is_put)
+    expiration = (session + timedelta(days=dte)).isoformat()
+
+    def leg(k: int, strike: float) -> dict[str, Any]:
+        delta = abs(float(quoted["delta"][k]))
+        return {
+            "symbol": f"O:{underlying}{contract_type[0].upper()}{int(strike)}",
+            "strike": strike,
+            "dte": dte,
+            "mid": max(round(float(quoted["price"][k]), 2), 0.01),
+            "delta": delta,
+            "greeks": {"delta": delta, "iv": round(iv, 4)},
+            "expiration": expiration,
+        }
+
+    return leg(0, short_strike), leg(1, long_strike)
+
+
+def _spread_value(
+    short_leg: dict[str, Any],
+    long_leg: dict[str, Any],
+    spot: float,
+    t_years: float,
+    contract_type: str,
+) -> float:
+    """Cost to close a short spread (dollars per contract), each leg at its own entry vol."""
+    legs = [short_leg] + ([long_leg] if long_leg else [])
+    marks = bs_price(
+        spot,
+        np.array([leg["strike"] for leg in legs], dtype=np.float64),
+        t_years,
+        np.array([leg["greeks"]["iv"] for leg in legs], dtype=np.float64),
+        contract_type.lower() == "put",
+    )
+    value = float(marks[0] - (marks[1] if len(marks) > 1 else 0.0))
+    return max(value, 0.0) * 100
+
+
+def _session_context(df: pd.DataFrame) -> tuple[np.ndarray, ...]:
+    """Per-bar (session id, session open, high so far, low so far, close three sessions back).
+
+    Lets intraday bars be classified on the day's move so far rather than on a
+    single minute bar.
+    """
+    bounds = _session_bounds(df.index)
+    session_id = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+    close = df["close"].to_numpy(dtype=np.float64)
+    grouped = df[["high", "low"]].astype(np.float64).groupby(session_id)
+    session_open = df["open"].to_numpy(dtype=np.float64)[bounds[:-1]][session_id]
+    session_high = grouped["high"].cummax().to_numpy()
+    session_low = grouped["low"].cummin().to_numpy()
+    session_close = close[bounds[1:] - 1]
+    trend_close = np.full(len(df), np.nan)
+    back = session_id >= 3
+    trend_close[back] = session_close[session_id[back] - 3]
+    return session_id, session_open, session_high, session_low, trend_close
+
+
+def _classify_spread_regime(
+    rows: list[tuple[Any, dict[str, Any]]],
+    i: int,
+    session: tuple[np.ndarray, ...] | None = None,
+) -> str:
+    """risk_on / risk_off / mixed from the bar's open-to-close move and 3-bar trend.
+
+    With ``session`` (from ``_session_context``) the move is measured from the
+    session open and the trend against the close three sessions back.
+    """
+    row = rows[i][1]
+    bar_close = float(row.get("close", 0))
+    prev_close_3: float | None = None
+    if session is not None:
+        _, session_open, session_high, session_low, trend_close = session
+        bar_open = float(session_open[i])
+        bar_high = float(session_high[i])
+        bar_low = float(session_low[i])
+        if not np.isnan(trend_close[i]):
+            prev_close_3 = float(trend_close[i])
+    else:
+        bar_open = float(row.get("open", row.get("close", 0)))
+        bar_high = float(row.get("high", bar_close))
+        bar_low = float(row.get("low", bar_close))
+        if i >= 3:
+            prev_close_3 = float(rows[i - 3][1]["close"])
+    bar_range = (bar_high - bar_low) / bar_open if bar_open > 0 else 0
+
+    # Primary: today's open-to-close direction
+    day_return = (bar_close - bar_open) / bar_open if bar_open > 0 else 0
+
+    # Secondary: recent 3-day trend for confirmation
+    trend_return = 0.0
+    if prev_close_3:
+        trend_return = (bar_close - prev_close_3) / prev_close_3
+
+    # Regime classification with trend confirmation
+    if day_return > 0.001 and trend_return >= 0:
+        return "risk_on"
+    if day_return < -0.001 and trend_return <= 0:
+        return "risk_off"
+    if abs(day_return) > 0.003:
+        # Strong intraday move overrides trend — still tradeable
+        return "risk_on" if day_return > 0 else "risk_off"
+    if bar_range < 0.005:
+        # Very narrow range day — low vol, good for selling premium
+        # Default to put spread (bullish bias, most common for premium sellers)
+        return "risk_on"
+    return "mixed"
+
+
+def _iv_estimate(rows: list[tuple[Any, dict[str, Any]]], i: int, bars_per_year: float = 252) -> float:
+    """Realized-vol IV proxy from the last 10 closes, clamped to 8%-60%."""
+    lookback = min(i, 10)
+    if lookback >= 2:
+        recent_closes = [float(rows[j][1]["close"]) for j in range(i - lookback, i + 1)]
+        daily_returns = [(recent_closes[k] - recent_closes[k-1]) / recent_closes[k-1]
+                         for k in range(1, len(recent_closes))]
+        realized_vol = float(np.std(daily_returns)) * (bars_per_year ** 0.5) if daily_returns else 0.15
+    else:
+        realized_vol = 0.15  # default ~15% annualized
+
+    # IV tends to be slightly above realized vol; clamp to realistic range
+    return max(0.08, min(realized_vol * 1.1, 0.60))
+
+
+def _is_entry_bar(idx: Any, entry_start: str, entry_end: str) -> bool:
+    # Daily bars (midnight stamps) are always eligible; minute bars must fall in the window.
+    if hasattr(idx, "hour") and idx.hour != 0:
+        hhmm = f"{idx.hour:02d}:{idx.minute:02d}"
+        return entry_start <= hhmm <= entry_end
+    return True
+
+
+def _entry_clock(idx: Any, entry_start: str) -> tuple[date, str]:
+    """Session date and HH:MM of an entry; daily bars assume the window start."""
+    if hasattr(idx, "hour") and idx.hour != 0:
+        return idx.date(), f"{idx.hour:02d}:{idx.minute:02d}"
+    day = idx.date() if hasattr(idx, "date") else datetime.strptime(str(idx)[:10], "%Y-%m-%d").date()
+    return day, entry_start
+
+
+def _minutes_to_close(hhmm: str) -> float:
+    hour, minute = (int(part) for part in hhmm.split(":", 1))
+    return float(16 * 60 - (hour * 60 + minute))
+
+
 # ── Credit spread execution path ─────────────────────────────────────────────
 
 async def _run_credit_spread(
@@ -786,6 +1478,8 @@ async def _run_credit_spread(
     start_date: str,
     end_date: str,
     slippage_pct: float,
+    timeframe: str = "day",
+    reset_indicators_daily: bool = False,
 ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
     """Credit spread backtest: regime-aware direction, short+long legs, premium-based P&L."""
     execution = spec.get("execution", {})
@@ -836,35 +1530,39 @@ async def _run_credit_spread(
         elif tr.get("type") == "time_before_close":
             close_before_minutes = int(tr.get("minutesBeforeClose", tr.get("minutes_before_close", 15)))
 
-    # Fetch underlying bars via the server's cached /api/market/aggs endpoint
-    # This leverages MongoDB cache, WebSocket feed, and rate-limit fallback
+    # Fetch underlying bars from the on-disk cache; missing ranges go through the
+    # server's /api/market/aggs endpoint, falling back to the direct API
+    multiplier, timespan = _parse_timeframe(timeframe)
+    intraday = timespan != "day"
     try:
-        bars = await _fetch_bars_via_server(underlying, 1, "day", start_date, end_date)
+        df = await _load_equity_frame(fetcher, underlying, start_date, end_date, timeframe)
     except Exception as fetch_err:
-        # Fallback to direct API if server is unavailable
-        try:
-            raw = await fetcher.get_intraday_aggregates(underlying, 1, "day", start_date, end_date, 5000)
-            bars = raw.get("results", [])
-        except Exception:
-            return [], {"provider": "error", "barsLoaded": 0, "usedFallbackData": False,
-                        "error": f"Failed to fetch bars: {fetch_err}"}
+        return [], {"provider": "error", "barsLoaded": 0, "usedFallbackData": False,
+                    "error": f"Failed to fetch bars: {fetch_err}"}
 
-    if not bars:
+    if df is None:
         return [], {"provider": "server", "barsLoaded": 0, "usedFallbackData": False}
 
-    df = _bars_to_dataframe(bars)
-    if len(df) < 21:
-        return [], {"provider": "server", "barsLoaded": len(df), "usedFallbackData": False}
+    first = _session_start_row(df, start_date)
+    if len(df) - first < 21:
+        return [], {"provider": "server", "barsLoaded": len(df) - first, "usedFallbackData": False}
 
     indicators = spec.get("indicators", [])
-    df = compute_indicators(df, indicators)
+    df = compute_session_indicators(df, indicators, reset_indicators_daily)
+    bars_per_session = _bars_per_session(multiplier, timespan)
+    # Intraday bars are classified on the session's move so far.
+    session_ctx = _session_context(df) if intraday else None
 
     entry_rules = spec.get("rules", {}).get("entry", [])
     exit_rules = spec.get("rules", {}).get("exit", [])
     risk = spec.get("riskManagement", {})
-    # For daily bars with 0DTE: max 1 bar (enter and exit same day)
+    # 0DTE: daily bars enter and settle on the next bar; intraday bars can be
+    # held at most until the entry session's close.
     dte_max_val = int(opts.get("dteMax", opts.get("dte_max", 0)))
-    max_bars = 1 if dte_max_val == 0 else int(risk.get("maxBarsInTrade", 120))
+    if dte_max_val == 0:
+        max_bars = bars_per_session if intraday else 1
+    else:
+        max_bars = int(risk.get("maxBarsInTrade", 120))
 
     trades: list[dict[str, Any]] = []
     in_trade = False
@@ -875,15 +1573,58 @@ async def _run_credit_spread(
     long_entry: dict[str, Any] = {}
     trade_regime = "mixed"
 
-    rows = list(df.iterrows())
+    entry_mask = compile_rules(entry_rules, df)
+    exit_mask = compile_rules(exit_rules, df)
+
+    rows = _bar_rows(df)
     # For credit spreads, entry is regime-based (not indicator-based), so minimal warmup needed
     # Only need enough bars for indicators if indicator-based entry rules exist
     has_indicator_rules = any(r.get("field") != "PRICE" for r in entry_rules)
     warmup = min(20, max(len(rows) - 5, 0)) if has_indicator_rules else 1
+    # Bars before start_date only warm up indicators.
+    warmup = max(warmup, first)
+
+    # Replay the option chain as it was on each potential entry day. Every bar
+    # that passes the entry filters is a candidate (whether a trade is already
+    # open isn't known until the loop runs), and its chain window is loaded
+    # from the local store up front, so the loop itself never touches the network.
+    chains: dict[date, HistoricalChain] = {}
+    chain_store = get_option_chain_store()
+    if chain_store is not None:
+        # One strike range per (session, type), widened to cover every candidate bar
+        strike_ranges: dict[tuple[date, str], tuple[float, float]] = {}
+        for i in range(warmup, len(rows)):
+            idx, row = rows[i]
+            if not entry_mask[i] or not _is_entry_bar(idx, entry_start, entry_end):
+                continue
+            regime = _classify_spread_regime(rows, i, session_ctx)
+            if regime == "mixed":
+                continue
+            action_str = risk_on_action if regime == "risk_on" else risk_off_action
+            ctype = "put" if "put" in action_str else "call"
+            session, _ = _entry_clock(idx, entry_start)
+            spot = float(row["close"])
+            reach = spot * OPTION_CHAIN_STRIKE_WINDOW_PCT + spread_width
+            lo, hi = (spot - reach, spot) if ctype == "put" else (spot, spot + reach)
+            prev_lo, prev_hi = strike_ranges.get((session, ctype), (lo, hi))
+            strike_ranges[(session, ctype)] = (min(lo, prev_lo), max(hi, prev_hi))
+        chain_needs: dict[date, list[ChainWindow]] = {}
+        for (session, ctype), (lo, hi) in strike_ranges.items():
+            chain_needs.setdefault(session, []).append(ChainWindow(
+                ctype, dte_max, float(math.floor(lo)), float(math.ceil(hi)), entry_start,
+            ))
+        try:
+            chains = await chain_store.preload(fetcher, underlying, chain_needs)
+        except Exception:
+            chains = {}
+    historical_entries = 0
+    synthetic_entries = 0
+
     for i, (idx, row) in enumerate(rows):
+        if i % PROGRESS_EVERY_BARS == 0:
+            await report_progress(i, len(rows), len(trades))
         if i < warmup:
             continue
-        prev_row = rows[i - 1][1] if i > 0 else None
 
         # For daily bars: each bar = one trading day, entry is assumed at ~14:00
         if hasattr(idx, 'hour'):
@@ -896,43 +1637,14 @@ async def _run_credit_spread(
         if not in_trade:
             # For daily bars, every bar is a potential entry day (time window is implicit)
             # For minute bars, filter by entry time window
-            if hasattr(idx, 'hour') and idx.hour != 0:  # minute bars have real hours
-                if hhmm < entry_start or hhmm > entry_end:
-                    continue
+            if not _is_entry_bar(idx, entry_start, entry_end):
+                continue
 
-            if not evaluate_rules(entry_rules, row, prev_row):
+            if not entry_mask[i]:
                 continue
 
             # Classify regime from underlying price action + recent trend
-            bar_open = float(row.get("open", row.get("close", 0)))
-            bar_close = float(row.get("close", 0))
-            bar_high = float(row.get("high", bar_close))
-            bar_low = float(row.get("low", bar_close))
-            bar_range = (bar_high - bar_low) / bar_open if bar_open > 0 else 0
-
-            # Primary: today's open-to-close direction
-            day_return = (bar_close - bar_open) / bar_open if bar_open > 0 else 0
-
-            # Secondary: recent 3-day trend for confirmation
-            trend_return = 0.0
-            if i >= 3:
-                prev_close_3 = float(rows[i - 3][1]["close"])
-                trend_return = (bar_close - prev_close_3) / prev_close_3
-
-            # Regime classification with trend confirmation
-            if day_return > 0.001 and trend_return >= 0:
-                trade_regime = "risk_on"
-            elif day_return < -0.001 and trend_return <= 0:
-                trade_regime = "risk_off"
-            elif abs(day_return) > 0.003:
-                # Strong intraday move overrides trend — still tradeable
-                trade_regime = "risk_on" if day_return > 0 else "risk_off"
-            elif bar_range < 0.005:
-                # Very narrow range day — low vol, good for selling premium
-                # Default to put spread (bullish bias, most common for premium sellers)
-                trade_regime = "risk_on"
-            else:
-                trade_regime = "mixed"
+            trade_regime = _classify_spread_regime(rows, i, session_ctx)
 
             # Pick direction based on regime
             if trade_regime == "risk_on":
@@ -944,84 +1656,27 @@ async def _run_credit_spread(
 
             contract_type = "put" if "put" in action_str else "call"
 
-            # Try live options chain first; fall back to synthetic estimation
+            # Legs come from the replayed historical chain; fall back to synthetic estimation
             underlying_price = float(row["close"])
+            iv_estimate = _iv_estimate(rows, i, 252 * bars_per_session)
             short_leg_sel = None
             long_leg_sel = None
 
-            try:
-                import asyncio
-                await asyncio.sleep(0.3)
-                chain = await fetcher.get_options_snapshot(underlying, contract_type=contract_type, limit=100)
-                chain_results = chain.get("results", [])
-                if chain_results:
-                    short_leg_sel, long_leg_sel = _select_spread_legs(
-                        chain_results, underlying_price,
-                        contract_type, delta_target, spread_width, dte_min, dte_max,
-                    )
-            except Exception:
-                pass
+            session, entry_hhmm = _entry_clock(idx, entry_start)
+            chain = chains.get(session)
+            if chain is not None:
+                short_leg_sel, long_leg_sel = _select_spread_legs_from_history(
+                    chain, underlying_price, contract_type, delta_target, spread_width,
+                    dte_min, dte_max, iv_estimate, _minutes_to_close(entry_hhmm),
+                )
+            from_history = short_leg_sel is not None
 
-            # Synthetic fallback: IV-aware premium estimation
+            # Synthetic fallback: Black-Scholes legs at the realized-vol IV proxy
             if short_leg_sel is None:
-                # Compute realized volatility from recent bars as IV proxy
-                lookback = min(i, 10)
-                if lookback >= 2:
-                    recent_closes = [float(rows[j][1]["close"]) for j in range(i - lookback, i + 1)]
-                    daily_returns = [(recent_closes[k] - recent_closes[k-1]) / recent_closes[k-1]
-                                     for k in range(1, len(recent_closes))]
-                    realized_vol = float(np.std(daily_returns)) * (252 ** 0.5) if daily_returns else 0.15
-                else:
-                    realized_vol = 0.15  # default ~15% annualized
-
-                # IV tends to be slightly above realized vol; clamp to realistic range
-                iv_estimate = max(0.08, min(realized_vol * 1.1, 0.60))
-
-                # For 0DTE: daily vol = annual_vol / sqrt(252), intraday (2hrs) ≈ daily / sqrt(3.25)
-                daily_vol = iv_estimate / (252 ** 0.5)
-                intraday_vol = daily_vol / (3.25 ** 0.5)  # ~2hrs of trading left at entry
-
-                # Strike offset: 20-delta ≈ 0.84 * sigma (normal approximation)
-                sigma_move = underlying_price * intraday_vol
-                strike_offset = sigma_move * 0.84  # ≈20-delta distance
-
-                if contract_type == "put":
-                    short_strike = round(underlying_price - strike_offset, 0)
-                    long_strike = short_strike - spread_width
-                else:
-                    short_strike = round(underlying_price + strike_offset, 0)
-                    long_strike = short_strike + spread_width
-
-                # Black-Scholes-like premium estimation for 0DTE
-                # Short leg: OTM premium ≈ underlying * iv * sqrt(T) * N'(d2) (simplified)
-                # For 20-delta, premium ≈ 0.15-0.40% of underlying on typical days
-                time_to_expiry = 2.0 / (252 * 6.5)  # 2 hours in annual terms
-                short_premium_est = underlying_price * iv_estimate * (time_to_expiry ** 0.5) * 0.25
-                # Long leg is further OTM — roughly 30-40% of short premium
-                long_premium_est = short_premium_est * 0.35
-
-                # Clamp premiums to realistic SPY 0DTE ranges ($0.20 - $5.00)
-                short_premium_est = max(0.20, min(short_premium_est, 5.0))
-                long_premium_est = max(0.05, min(long_premium_est, short_premium_est * 0.5))
-
-                short_leg_sel = {
-                    "symbol": f"O:{underlying}{contract_type[0].upper()}{int(short_strike)}",
-                    "strike": short_strike,
-                    "dte": 0,
-                    "mid": short_premium_est,
-                    "delta": delta_target,
-                    "greeks": {"delta": delta_target, "iv": round(iv_estimate, 4)},
-                    "expiration": str(idx)[:10],
-                }
-                long_leg_sel = {
-                    "symbol": f"O:{underlying}{contract_type[0].upper()}{int(long_strike)}",
-                    "strike": long_strike,
-                    "dte": 0,
-                    "mid": long_premium_est,
-                    "delta": delta_target * 0.4,
-                    "greeks": {"delta": delta_target * 0.4, "iv": round(iv_estimate, 4)},
-                    "expiration": str(idx)[:10],
-                }
+                short_leg_sel, long_leg_sel = _synthetic_spread_legs(
+                    underlying, underlying_price, contract_type, delta_target, spread_width,
+                    iv_estimate, session, dte_min, _minutes_to_close(entry_hhmm),
+                )
 
             short_premium = short_leg_sel["mid"] * (1 - slippage_pct)
             long_premium = (long_leg_sel["mid"] * (1 + slippage_pct)) if long_leg_sel else 0.0
@@ -1030,6 +1685,10 @@ async def _run_credit_spread(
             if credit_received <= 0:
                 continue  # Skip if no credit can be collected
 
+            if from_history:
+                historical_entries += 1
+            else:
+                synthetic_entries += 1
             short_entry = short_leg_sel
             long_entry = long_leg_sel or {}
             entry_idx = i
@@ -1037,60 +1696,16 @@ async def _run_credit_spread(
         else:
             bars_held = i - entry_idx
 
-            # --- Improved 0DTE spread exit valuation ---
-            # For 0DTE credit spreads, the key dynamics are:
-            # 1. Theta decay is nonlinear — most premium decays in the final 1-2 hours
-            # 2. Delta impact from underlying price movement
-            # 3. If price stays away from strike, spread decays toward zero (full profit)
-            # 4. If price breaches strike, spread approaches max loss
-
-            entry_close = float(rows[entry_idx][1]["close"])
-            exit_close = float(row["close"])
-            underlying_move = (exit_close - entry_close) / entry_close
-            short_strike_val = short_entry.get("strike", 0)
-            short_delta_val = short_entry.get("delta", delta_target)
-
-            # Distance from current price to short strike (as fraction of entry price)
-            if contract_type == "put":
-                # For put spread: price BELOW strike = in trouble
-                distance_to_strike = (exit_close - short_strike_val) / entry_close
-                # Positive = price above strike (safe), negative = price below strike (danger)
-                adverse_move = max(0, -distance_to_strike)  # how far past the strike
-            else:
-                # For call spread: price ABOVE strike = in trouble
-                distance_to_strike = (short_strike_val - exit_close) / entry_close
-                adverse_move = max(0, -distance_to_strike)
+            # Mark both legs to the bar: Black-Scholes at the current spot and
+            # time left to expiry (daily bars are marked at the close), which
+            # collapses to intrinsic value once the expiration has passed.
+            bar_day, bar_hhmm = _entry_clock(idx, "16:00")
+            expiry = date.fromisoformat(short_entry["expiration"][:10])
+            t_left = _years_to_expiry((expiry - bar_day).days, _minutes_to_close(bar_hhmm))
+            spread_exit_value = _spread_value(short_entry, long_entry, float(row["close"]), t_left, contract_type)
 
-            # For 0DTE on daily bars: simulate entry at 14:00, expiry at 16:00 (2hrs)
-            # If bars_held == 1 (next day), the option has EXPIRED
             is_daily = not (hasattr(idx, 'hour') and idx.hour != 0)
-
-            if is_daily and bars_held >= 1:
-                # Option expired — compute final settlement value
-                if adverse_move > 0:
-                    # Price breached the short strike — spread has intrinsic value
-                    intrinsic = min(adverse_move * entry_close, spread_width) * 100
-                    spread_exit_value = intrinsic
-                else:
-                    # Price stayed safe — spread expires worthless (full profit for seller)
-                    spread_exit_value = 0.0
-            else:
-                # Intraday: nonlinear theta decay model
-                # Theta decay for 0DTE: sqrt(time_remaining) model
-                # At entry (2hrs left): premium = full; at expiry: premium → intrinsic only
-                total_time = 120.0  # 2 hours = 120 minutes
-                minutes_remaining_est = max(total_time - (bars_held * total_time / max_bars), 1)
-                theta_factor = (minutes_remaining_est / total_time) ** 0.5  # sqrt decay
-
-                # Premium component (time value) decays with theta_factor
-                time_value_remaining = credit_received * theta_factor
-
-                # Delta component: how much spread value changed from price movement
-                delta_pnl = short_delta_val * underlying_move * entry_close * 100
-                if contract_type == "put":
-                    delta_pnl = -delta_pnl  # put delta is negative for seller
-
-                spread_exit_value = max(0, time_value_remaining + delta_pnl)
+            zero_dte_intraday = intraday and short_entry.get("dte", 0) == 0
 
             current_pnl = credit_received - spread_exit_value
 
@@ -1109,7 +1724,7 @@ async def _run_credit_spread(
             should_exit = False
 
             # 1. Standard indicator-based exit rules
-            if evaluate_rules(exit_rules, row, prev_row):
+            if exit_mask[i]:
                 reason = "rule_exit"
                 should_exit = True
             # 2. Profit target (e.g., close at 50% of max profit)
@@ -1138,6 +1753,12 @@ async def _run_credit_spread(
             elif bars_held >= max_bars:
                 reason = "max_bars"
                 should_exit = True
+            # 8. Expiry: the legs have expired, or a 0DTE entry session's last bar
+            elif t_left <= 0 or zero_dte_intraday and (
+                i + 1 == len(rows) or session_ctx[0][i + 1] != session_ctx[0][entry_idx]
+            ):
+                reason = "expiration"
+                should_exit = True
 
             if should_exit or i == len(rows) - 1:
                 if not reason:
@@ -1180,15 +1801,32 @@ async def _run_credit_spread(
                 trades.append(trade)
                 in_trade = False
 
-    return trades, {"provider": "polygon", "barsLoaded": len(df), "usedFallbackData": False}
+    return trades, {
+        "provider": "polygon",
+        "barsLoaded": len(df) - first,
+        "warmupBars": first,
+        "usedFallbackData": synthetic_entries > 0,
+        "historicalChainDays": len(chains),
+        "historicalChainEntries": historical_entries,
+        "syntheticPremiumEntries": synthetic_entries,
+    }
 
 
 # ── Entry point ───────────────────────────────────────────────────────────────
 
+def _resolve_equity_ticker(cs: dict[str, Any]) -> str:
+    if cs.get("method") == "equities" and cs.get("equities", {}).get("ticker"):
+        return cs["equities"]["ticker"]
+    if cs.get("ticker"):
+        return cs["ticker"]
+    return "SPY"
+
+
 async def execute_backtest(req: BacktestRequest) -> BacktestResponse:
     """Main dispatcher: routes to equities, options, futures, or credit spread execution path."""
     spec = req.runtime_spec
     slippage_pct = req.slippage_bps / 10_000
+    _, timespan = _parse_timeframe(req.timeframe)
 
     # Check for credit spread path first (takes priority over single-leg options)
     spread_config = spec.get("execution", {}).get("spreadConfig")
@@ -1197,14 +1835,18 @@ async def execute_backtest(req: BacktestRequest) -> BacktestResponse:
         trades, diagnostics = await _run_credit_spread(
             fetcher, spec, req.contract_selection,
             req.start_date, req.end_date, slippage_pct,
+            req.timeframe, req.reset_indicators_daily,
         )
     elif req.trading_method == "options":
         fetcher = _get_polygon_fetcher()
         trades, diagnostics = await _run_options(
             fetcher, spec, req.contract_selection,
             req.start_date, req.end_date, slippage_pct,
+            req.timeframe, req.reset_indicators_daily,
         )
     elif req.trading_method == "futures":
+        if timespan != "day":
+            raise ValueError("Futures backtests only support the 'day' timeframe.")
         trades, diagnostics = await _run_futures(
             spec, req.contract_selection,
             req.start_date, req.end_date, slippage_pct,
@@ -1212,16 +1854,16 @@ async def execute_backtest(req: BacktestRequest) -> BacktestResponse:
     else:
         # Equities (default)
         fetcher = _get_polygon_fetcher()
-        ticker = "SPY"
-        cs = req.contract_selection
-        if cs.get("method") == "equities" and cs.get("equities", {}).get("ticker"):
-            ticker = cs["equities"]["ticker"]
-        elif cs.get("ticker"):
-            ticker = cs["ticker"]
+        ticker = _resolve_equity_ticker(req.contract_selection)
         trades, diagnostics = await _run_equities(
             fetcher, spec, ticker,
             req.start_date, req.end_date, slippage_pct,
+            req.timeframe, req.reset_indicators_daily,
         )
+    diagnostics["timeframe"] = req.timeframe
+
+    bars_loaded = int(diagnostics.get("barsLoaded") or 0)
+    await report_progress(bars_loaded, bars_loaded, len(trades))
 
     total = len(trades)
     pnl = round(sum(t["pnl"] for t in trades), 2) if trades else 0
@@ -1229,6 +1871,12 @@ async def execute_backtest(req: BacktestRequest) -> BacktestResponse:
     win_rate = round(wins / total * 100, 2) if total > 0 else 0
 
     sharpe, max_dd, equity_curve = _compute_analytics(trades, req.initial_capital)
+    monte_carlo = None
+    if req.monte_carlo is not None and trades:
+        returns, _ = _trade_returns(trades, req.initial_capital)
+        monte_carlo = await asyncio.to_thread(
+            simulate_monte_carlo, np.asarray(returns), req.initial_capital, req.monte_carlo,
+        )
 
     return BacktestResponse(
         pnl=pnl,
@@ -1238,5 +1886,6 @@ async def execute_backtest(req: BacktestRequest) -> BacktestResponse:
         sharpeRatio=sharpe,
         maxDrawdownPct=max_dd,
         equityCurve=equity_curve,
+        monteCarlo=monte_carlo,
         diagnostics=diagnostics,
     )
@@ -0,0 +1,255 @@
+"""
+Background jobs for long-running backtests.
+
+A submitted backtest returns a job id immediately and runs on a bounded pool
+of asyncio workers. While it runs, the execution paths publish progress (bars
+processed, trades so far, ETA) through ``report_progress``; subscribers
+receive every update as it happens, which the API streams as Server-Sent
+Events. Finished jobs keep their result in a ``JobStore`` until a TTL
+expires. The in-memory store is the default backend; anything implementing
+``JobStore`` can replace it.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+BACKTEST_JOB_WORKERS = max(1, int(os.getenv("BACKTEST_JOB_WORKERS", "4")))
+BACKTEST_JOB_TTL_S = float(os.getenv("BACKTEST_JOB_TTL_S", "3600"))
+
+TERMINAL_STATUSES = {"succeeded", "failed", "cancelled"}
+
+
+# ── Result store ─────────────────────────────────────────────────────────────
+
+class JobStore(ABC):
+    """Where job records (plain JSON-able dicts) live until they expire."""
+
+    @abstractmethod
+    async def save(self, record: dict[str, Any], ttl_s: float | None) -> None:
+        ...
+
+    @abstractmethod
+    async def load(self, job_id: str) -> dict[str, Any] | None:
+        ...
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local store; expired records are dropped lazily on access."""
+
+    def __init__(self) -> None:
+        self._records: dict[str, tuple[dict[str, Any], float | None]] = {}
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        expired = [k for k, (_, exp) in self._records.items() if exp is not None and exp <= now]
+        for key in expired:
+            del self._records[key]
+
+    async def save(self, record: dict[str, Any], ttl_s: float | None) -> None:
+        self._purge()
+        expires = time.monotonic() + ttl_s if ttl_s is not None else None
+        self._records[record["jobId"]] = (record, expires)
+
+    async def load(self, job_id: str) -> dict[str, Any] | None:
+        self._purge()
+        entry = self._records.get(job_id)
+        return entry[0] if entry else None
+
+
+# ── Progress reporting ───────────────────────────────────────────────────────
+
+class _Job:
+    def __init__(self, kind: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.progress: dict[str, Any] = {
+            "barsProcessed": 0,
+            "barsTotal": None,
+            "tradesSoFar": 0,
+            "etaSeconds": None,
+        }
+        self.result: Any = None
+        self.error: str | None = None
+        self.task: asyncio.Task | None = None
+        self.changed = asyncio.Event()
+
+    def touch(self) -> None:
+        # Wake current subscribers; later ones wait on the fresh event.
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def record(self, include_result: bool = True) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "jobId": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "progress": dict(self.progress),
+            "error": self.error,
+        }
+        if include_result:
+            out["result"] = self.result
+        return out
+
+
+_current_job: ContextVar[_Job | None] = ContextVar("current_backtest_job", default=None)
+
+
+def _publish(job: _Job, bars_processed: int, bars_total: int, trades_so_far: int) -> None:
+    eta = None
+    if job.started_at is not None and bars_total > 0 and 0 < bars_processed < bars_total:
+        elapsed = time.time() - job.started_at
+        eta = round(elapsed * (bars_total - bars_processed) / bars_processed, 1)
+    elif bars_total > 0 and bars_processed >= bars_total:
+        eta = 0.0
+    job.progress = {
+        "barsProcessed": int(bars_processed),
+        "barsTotal": int(bars_total),
+        "tradesSoFar": int(trades_so_far),
+        "etaSeconds": eta,
+    }
+    job.touch()
+
+
+async def report_progress(bars_processed: int, bars_total: int, trades_so_far: int) -> None:
+    """Publish progress for the job running in this context (no-op outside a job).
+
+    Also yields to the event loop, so CPU-bound loops that call this stay
+    cancellable and let the progress stream flush.
+    """
+    job = _current_job.get()
+    if job is None:
+        return
+    _publish(job, bars_processed, bars_total, trades_so_far)
+    await asyncio.sleep(0)
+
+
+def progress_reporter() -> Callable[[int, int, int], None] | None:
+    """A ``report_progress`` for synchronous code running in a worker thread.
+
+    Bound to the job running in this context (None outside a job); each call
+    hands the update to the event loop, so it is safe from any thread.
+    """
+    job = _current_job.get()
+    if job is None:
+        return None
+    loop = asyncio.get_running_loop()
+
+    def report(bars_processed: int, bars_total: int, trades_so_far: int) -> None:
+        loop.call_soon_threadsafe(_publish, job, bars_processed, bars_total, trades_so_far)
+
+    return report
+
+
+# ── Job manager ──────────────────────────────────────────────────────────────
+
+class JobManager:
+    """Runs submitted coroutines on at most ``max_workers`` concurrent slots."""
+
+    def __init__(self, store: JobStore, max_workers: int, ttl_s: float) -> None:
+        self.store = store
+        self.ttl_s = ttl_s
+        self._slots = asyncio.Semaphore(max_workers)
+        self._live: dict[str, _Job] = {}
+
+    async def submit(self, kind: str, run: Callable[[], Awaitable[Any]]) -> dict[str, Any]:
+        job = _Job(kind)
+        self._live[job.id] = job
+        await self.store.save(job.record(), None)
+        job.task = asyncio.create_task(self._run(job, run))
+        return job.record(include_result=False)
+
+    async def _run(self, job: _Job, run: Callable[[], Awaitable[Any]]) -> None:
+        _current_job.set(job)
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                job.touch()
+                await self.store.save(job.record(), None)
+                result = await run()
+            job.result = result.model_dump() if hasattr(result, "model_dump") else result
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as exc:
+            job.status = "failed"
+            job.error = str(exc)
+        finally:
+            job.finished_at = time.time()
+            job.touch()
+            self._live.pop(job.id, None)
+            await self.store.save(job.record(), self.ttl_s)
+
+    async def get(self, job_id: str) -> dict[str, Any] | None:
+        job = self._live.get(job_id)
+        if job is not None:
+            return job.record()
+        return await self.store.load(job_id)
+
+    async def cancel(self, job_id: str) -> dict[str, Any] | None:
+        """Cancel a queued or running job; finished jobs are returned unchanged."""
+        job = self._live.get(job_id)
+        if job is None:
+            return await self.store.load(job_id)
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                pass
+        return job.record()
+
+    async def events(self, job_id: str, keepalive_s: float = 15.0) -> AsyncIterator[dict[str, Any] | None]:
+        """Yield the job record on every change until it finishes.
+
+        ``None`` is yielded after ``keepalive_s`` without changes so callers can
+        keep idle connections open. Jobs this process isn't running yield
+        their stored record once.
+        """
+        job = self._live.get(job_id)
+        if job is None:
+            record = await self.store.load(job_id)
+            if record is not None:
+                yield record
+            return
+        changed = job.changed
+        record = job.record(include_result=job.status in TERMINAL_STATUSES)
+        yield record
+        while record["status"] not in TERMINAL_STATUSES:
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=keepalive_s)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            # Updates that landed while we were waiting collapse into this one.
+            changed = job.changed
+            record = job.record(include_result=job.status in TERMINAL_STATUSES)
+            yield record
+
+    async def shutdown(self) -> None:
+        for job in list(self._live.values()):
+            await self.cancel(job.id)
+
+
+_job_manager: JobManager | None = None
+
+
+def get_job_manager() -> JobManager:
+    """Process-wide manager backed by the in-memory store."""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(InMemoryJobStore(), BACKTEST_JOB_WORKERS, BACKTEST_JOB_TTL_S)
+    return _job_manager
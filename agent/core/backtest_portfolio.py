@@ -0,0 +1,422 @@
+"""
+Portfolio backtests — one runtime_spec across many symbols in a single pass.
+
+Each symbol's bars are loaded concurrently and its indicators computed (and
+cached) as for `/backtest`. The fields the rules read are then stacked into
+2-D ``(bar, symbol)`` arrays on the union of all timestamps, the entry and
+exit rules are compiled once over the whole grid, and a single walk over the
+time axis advances every symbol's position together. Per-symbol fills follow
+the same rules as `_walk_bars`; position sizing turns them into one combined,
+marked-to-market equity curve.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from core.backtest_executor import (
+    BacktestRequest,
+    _compare_arrays,
+    _get_polygon_fetcher,
+    _load_equity_frame,
+    _parse_timeframe,
+    compute_indicators,
+)
+
+PORTFOLIO_MAX_SYMBOLS = int(os.getenv("PORTFOLIO_MAX_SYMBOLS", "500"))
+PORTFOLIO_FETCH_CONCURRENCY = max(1, int(os.getenv("PORTFOLIO_FETCH_CONCURRENCY", "8")))
+
+_WARMUP_BARS = 20  # same indicator warm-up as _walk_bars
+_EXIT_REASONS = np.array(["rule_exit", "take_profit", "stop_loss", "max_bars", "end_of_test"])
+
+
+# ── Pydantic models ──────────────────────────────────────────────────────────
+
+class BacktestPortfolioRequest(BacktestRequest):
+    trading_method: str = "equities"
+    symbols: list[str]
+    # Fraction of current equity committed per position; defaults to an equal
+    # split across the symbols.
+    position_size_pct: float | None = None
+    # Open positions allowed at once; defaults to as many as the sizing allows
+    # without leverage. When more symbols signal than there are free slots,
+    # earlier symbols in the request win.
+    max_positions: int | None = None
+
+
+class BacktestPortfolioResponse(BaseModel):
+    pnl: float  # total return of the combined equity, %
+    finalEquity: float
+    winRate: float
+    totalTrades: int
+    sharpeRatio: float | None = None
+    maxDrawdownPct: float | None = None
+    equityCurve: list[dict[str, Any]] = []
+    symbols: dict[str, dict[str, Any]] = {}
+    diagnostics: dict[str, Any] = {}
+
+
+# ── Stacked grid ─────────────────────────────────────────────────────────────
+
+def _rule_fields(rules: list[dict[str, Any]]) -> set[str]:
+    fields = {"close"}
+    for rule in rules:
+        fields.add(rule["field"])
+        if isinstance(rule.get("value"), str):
+            fields.add(rule["value"])
+    return fields
+
+
+def _stack_frames(
+    frames: dict[str, pd.DataFrame], fields: set[str]
+) -> tuple[pd.DatetimeIndex, dict[str, np.ndarray], np.ndarray]:
+    """Align per-symbol frames on the union of their timestamps.
+
+    Returns ``(index, {field: (n, m) array}, has_bar)``. Cells where a symbol
+    has no bar are NaN; fields a frame lacks are absent from the mapping when
+    no symbol has them, else NaN for that symbol.
+    """
+    index = frames[next(iter(frames))].index
+    for df in list(frames.values())[1:]:
+        index = index.union(df.index)
+    n, m = len(index), len(frames)
+    has_bar = np.zeros((n, m), dtype=bool)
+    grids: dict[str, np.ndarray] = {}
+    for j, df in enumerate(frames.values()):
+        rows = index.get_indexer(df.index)
+        has_bar[rows, j] = True
+        for field in fields:
+            if field not in df.columns:
+                continue
+            grid = grids.get(field)
+            if grid is None:
+                grid = grids[field] = np.full((n, m), np.nan)
+            grid[rows, j] = pd.to_numeric(df[field], errors="coerce").to_numpy(dtype=np.float64)
+    return index, grids, has_bar
+
+
+def _previous_rows(has_bar: np.ndarray) -> np.ndarray:
+    """``prev[i, j]`` = row of symbol j's bar before row i (-1 when none)."""
+    n = has_bar.shape[0]
+    seen = np.where(has_bar, np.arange(n)[:, None], -1)
+    np.maximum.accumulate(seen, axis=0, out=seen)
+    prev = np.full_like(seen, -1)
+    prev[1:] = seen[:-1]
+    return prev
+
+
+def _compile_rules_grid(
+    rules: list[dict[str, Any]],
+    grids: dict[str, np.ndarray],
+    prev_rows: np.ndarray,
+    has_bar: np.ndarray,
+) -> np.ndarray:
+    """``compile_rules`` over the stacked grid.
+
+    The previous value for crossing rules is each symbol's own previous bar,
+    so gaps in one symbol's calendar don't leak into another's.
+    """
+    mask = has_bar.copy()
+    shape = has_bar.shape
+    for rule in rules:
+        left = grids.get(rule["field"])
+        if left is None:
+            return np.zeros(shape, dtype=bool)
+
+        target = rule.get("value")
+        if isinstance(target, str):
+            right = grids.get(target)
+            if right is None:
+                return np.zeros(shape, dtype=bool)
+        elif target is None:
+            return np.zeros(shape, dtype=bool)
+        else:
+            right = np.full(shape, float(target))
+
+        prev_left = np.take_along_axis(left, np.maximum(prev_rows, 0), axis=0)
+        prev_left[prev_rows < 0] = np.nan
+
+        mask &= _compare_arrays(rule["operator"], left, right, prev_left)
+        mask &= ~np.isnan(left) & ~np.isnan(right)
+    return mask
+
+
+# ── Portfolio walk ───────────────────────────────────────────────────────────
+
+def _walk_portfolio(
+    index: pd.DatetimeIndex,
+    grids: dict[str, np.ndarray],
+    has_bar: np.ndarray,
+    spec: dict[str, Any],
+    slippage_pct: float,
+    initial_capital: float,
+    position_size_pct: float,
+    max_positions: int,
+) -> tuple[list[tuple[int, int, int, float, float, float, float, str]], np.ndarray]:
+    """Advance every symbol's position along the shared time axis.
+
+    Exits are checked in ``_scan_exit`` order, then freed capital is
+    reallocated to new entries on the same bar. Returns the fills as
+    ``(symbol, entry_row, exit_row, entry_price, exit_price, pnl_pct,
+    notional, reason)`` and the marked-to-market equity per row.
+    """
+    entry_rules = spec.get("rules", {}).get("entry", [])
+    exit_rules = spec.get("rules", {}).get("exit", [])
+    risk = spec.get("riskManagement", {})
+    sl_level = -risk.get("stopLossPct", 0.10) * 100
+    tp_level = risk.get("takeProfitPct", 0.20) * 100
+    max_bars = int(risk.get("maxBarsInTrade", 24))
+    action = spec.get("execution", {}).get("action", "BUY")
+    direction = 1 if action in ("BUY",) else -1
+    entry_factor = 1 + slippage_pct * direction
+    exit_factor = 1 - slippage_pct * direction
+
+    n, m = has_bar.shape
+    equity_rows = np.full(n, np.nan)
+    fills: list[tuple[int, int, int, float, float, float, float, str]] = []
+    if not n:
+        return fills, equity_rows
+
+    close = grids["close"]
+    # Open positions are marked at the symbol's last known close.
+    marks = pd.DataFrame(close).ffill().to_numpy()
+    ordinal = np.cumsum(has_bar, axis=0) - 1
+    rows = np.arange(n)
+    last_row = np.where(has_bar.any(axis=0), n - 1 - np.argmax(has_bar[::-1], axis=0), -1)
+
+    prev_rows = _previous_rows(has_bar)
+    exit_mask = _compile_rules_grid(exit_rules, grids, prev_rows, has_bar)
+    # A position opened on a symbol's final bar never exits, so it is never opened.
+    entry_mask = (
+        _compile_rules_grid(entry_rules, grids, prev_rows, has_bar)
+        & (ordinal >= _WARMUP_BARS)
+        & (rows[:, None] < last_row[None, :])
+    )
+    entry_rows = np.flatnonzero(entry_mask.any(axis=1))
+
+    in_pos = np.zeros(m, dtype=bool)
+    entry_row = np.zeros(m, dtype=np.int64)
+    entry_ord = np.zeros(m, dtype=np.int64)
+    entry_price = np.zeros(m)
+    notional = np.zeros(m)
+    realized = float(initial_capital)
+    equity_rows[0] = realized
+
+    def open_pnl(row: int) -> float:
+        held = np.flatnonzero(in_pos)
+        ret = (marks[row, held] * exit_factor - entry_price[held]) / entry_price[held] * direction
+        return float(np.dot(notional[held], ret))
+
+    i = int(entry_rows[0]) if len(entry_rows) else n
+    while i < n:
+        if in_pos.any():
+            live = in_pos & has_bar[i]
+            exit_price = close[i] * exit_factor
+            with np.errstate(invalid="ignore", divide="ignore"):
+                pnl_pct = (exit_price - entry_price) / entry_price * direction * 100
+            checks = np.stack([
+                exit_mask[i],
+                pnl_pct >= tp_level,
+                pnl_pct <= sl_level,
+                ordinal[i] - entry_ord >= max_bars,
+                last_row == i,
+            ]) & live
+            exiting = checks.any(axis=0)
+            if exiting.any():
+                reasons = _EXIT_REASONS[np.argmax(checks, axis=0)]
+                for j in np.flatnonzero(exiting).tolist():
+                    fills.append((
+                        j, int(entry_row[j]), i, float(entry_price[j]), float(exit_price[j]),
+                        float(pnl_pct[j]), float(notional[j]), str(reasons[j]),
+                    ))
+                realized += float(np.sum(notional[exiting] * pnl_pct[exiting])) / 100
+                in_pos &= ~exiting
+        else:
+            exiting = np.zeros(m, dtype=bool)
+
+        # Re-entry waits for the bar after an exit, as in _walk_bars.
+        candidates = np.flatnonzero(entry_mask[i] & ~in_pos & ~exiting)
+        slots = max_positions - int(in_pos.sum())
+        if len(candidates) and slots > 0:
+            equity = realized + open_pnl(i)
+            chosen = candidates[:slots]
+            in_pos[chosen] = True
+            entry_row[chosen] = i
+            entry_ord[chosen] = ordinal[i, chosen]
+            entry_price[chosen] = close[i, chosen] * entry_factor
+            notional[chosen] = max(equity, 0.0) * position_size_pct
+
+        if in_pos.any():
+            equity_rows[i] = realized + open_pnl(i)
+            i += 1
+        else:
+            equity_rows[i] = realized
+            # Flat: nothing changes until the next bar where any symbol signals.
+            k = int(np.searchsorted(entry_rows, i + 1))
+            i = int(entry_rows[k]) if k < len(entry_rows) else n
+
+    equity_rows = pd.Series(equity_rows).ffill().to_numpy()
+    return fills, equity_rows
+
+
+def _curve_analytics(
+    index: pd.DatetimeIndex, equity_rows: np.ndarray
+) -> tuple[float | None, float | None, list[dict[str, Any]]]:
+    """Sharpe on daily closes (annualised with 252), max drawdown on every bar."""
+    if not len(equity_rows):
+        return None, None, []
+    peaks = np.maximum.accumulate(equity_rows)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdowns = np.where(peaks > 0, (peaks - equity_rows) / peaks, 0.0)
+    max_dd = round(float(np.max(drawdowns)) * 100, 2)
+
+    days = pd.Series(equity_rows, index=index).groupby(index.normalize()).tail(1)
+    curve = [
+        {"timestamp": str(ts), "equity": round(float(value), 2)}
+        for ts, value in zip(days.index, days.to_numpy())
+    ]
+    sharpe = None
+    daily = days.to_numpy()
+    if len(daily) > 2:
+        returns = np.diff(daily) / np.maximum(daily[:-1], 1)
+        std = float(np.std(returns, ddof=1))
+        if std > 0:
+            sharpe = round(float(np.mean(returns)) / std * (252 ** 0.5), 2)
+    return sharpe, max_dd, curve
+
+
+# ── Entry point ──────────────────────────────────────────────────────────────
+
+def _normalize_symbols(symbols: list[str]) -> list[str]:
+    seen: dict[str, None] = {}
+    for symbol in symbols:
+        clean = str(symbol).strip().upper()
+        if clean:
+            seen.setdefault(clean, None)
+    if not seen:
+        raise ValueError("symbols must contain at least one ticker.")
+    if len(seen) > PORTFOLIO_MAX_SYMBOLS:
+        raise ValueError(f"symbols has {len(seen)} tickers; the limit is {PORTFOLIO_MAX_SYMBOLS}.")
+    return list(seen)
+
+
+async def execute_backtest_portfolio(req: BacktestPortfolioRequest) -> BacktestPortfolioResponse:
+    """Run ``req.runtime_spec`` over every symbol and combine the results."""
+    started = time.perf_counter()
+    spec = req.runtime_spec
+    if req.trading_method != "equities":
+        raise ValueError("Portfolio backtests support trading_method 'equities' only.")
+    if spec.get("execution", {}).get("spreadConfig"):
+        raise ValueError("Portfolio backtests do not support spread strategies.")
+    if _parse_timeframe(req.timeframe)[1] != "day":
+        raise ValueError("Portfolio backtests only support the 'day' timeframe.")
+    symbols = _normalize_symbols(req.symbols)
+    size_pct = req.position_size_pct if req.position_size_pct is not None else 1.0 / len(symbols)
+    if not 0 < size_pct <= 1:
+        raise ValueError("position_size_pct must be in (0, 1].")
+    max_positions = req.max_positions or max(1, int(1.0 / size_pct + 1e-9))
+    if max_positions < 1:
+        raise ValueError("max_positions must be at least 1.")
+    slippage_pct = req.slippage_bps / 10_000
+
+    fetcher = _get_polygon_fetcher()
+    slots = asyncio.Semaphore(PORTFOLIO_FETCH_CONCURRENCY)
+
+    async def load(symbol: str) -> pd.DataFrame | None:
+        async with slots:
+            return await _load_equity_frame(fetcher, symbol, req.start_date, req.end_date)
+
+    loaded = await asyncio.gather(*(load(s) for s in symbols), return_exceptions=True)
+    indicators = spec.get("indicators", [])
+    frames: dict[str, pd.DataFrame] = {}
+    bars_loaded: dict[str, int] = {}
+    failed: dict[str, str] = {}
+    for symbol, result in zip(symbols, loaded):
+        if isinstance(result, BaseException):
+            failed[symbol] = str(result)
+            continue
+        bars_loaded[symbol] = 0 if result is None else len(result)
+        if result is not None and len(result) >= 21:
+            frames[symbol] = compute_indicators(result, indicators)
+
+    diagnostics: dict[str, Any] = {
+        "provider": "polygon",
+        "symbolsRequested": len(symbols),
+        "symbolsTraded": len(frames),
+        "barsLoaded": bars_loaded,
+        "failedSymbols": failed,
+        "positionSizePct": size_pct,
+        "maxPositions": max_positions,
+        "usedFallbackData": False,
+    }
+    initial = float(req.initial_capital)
+    empty = {s: {"pnl": 0, "winRate": 0, "totalTrades": 0, "pnlDollar": 0.0, "trades": []} for s in symbols}
+    if not frames:
+        diagnostics["elapsedMs"] = round((time.perf_counter() - started) * 1000, 1)
+        return BacktestPortfolioResponse(
+            pnl=0, finalEquity=initial, winRate=0, totalTrades=0, symbols=empty, diagnostics=diagnostics,
+        )
+
+    rules = spec.get("rules", {})
+    fields = _rule_fields(rules.get("entry", []) + rules.get("exit", []))
+    index, grids, has_bar = _stack_frames(frames, fields)
+    fills, equity_rows = _walk_portfolio(
+        index, grids, has_bar, spec, slippage_pct, initial, size_pct, max_positions,
+    )
+
+    action = spec.get("execution", {}).get("action", "BUY")
+    side = "long" if action in ("BUY",) else "short"
+    ordinal = np.cumsum(has_bar, axis=0) - 1
+    traded = list(frames)
+    per_symbol = empty
+    fills.sort(key=lambda f: (f[1], f[0]))
+    stamps = [str(ts) for ts in index[[row for fill in fills for row in fill[1:3]]]]
+    for k, (j, entry_row, exit_row, entry_price, exit_price, pnl_pct, notional, reason) in enumerate(fills):
+        per_symbol[traded[j]]["trades"].append({
+            "symbol": traded[j],
+            "entryTime": stamps[2 * k],
+            "exitTime": stamps[2 * k + 1],
+            "side": side,
+            "entryAction": action,
+            "exitAction": "EXIT",
+            "entryPrice": round(entry_price, 4),
+            "exitPrice": round(exit_price, 4),
+            "pnl": round(pnl_pct, 2),
+            "notional": round(notional, 2),
+            "pnlDollar": round(notional * pnl_pct / 100, 2),
+            "barsHeld": int(ordinal[exit_row, j] - ordinal[entry_row, j]),
+            "reason": reason,
+        })
+
+    for summary in per_symbol.values():
+        trades = summary["trades"]
+        if trades:
+            wins = sum(1 for t in trades if t["pnl"] > 0)
+            summary["pnl"] = round(sum(t["pnl"] for t in trades), 2)
+            summary["winRate"] = round(wins / len(trades) * 100, 2)
+            summary["totalTrades"] = len(trades)
+            summary["pnlDollar"] = round(sum(t["pnlDollar"] for t in trades), 2)
+
+    total = len(fills)
+    wins = sum(1 for f in fills if f[5] > 0)
+    final_equity = float(equity_rows[-1])
+    sharpe, max_dd, curve = _curve_analytics(index, equity_rows)
+    diagnostics["barsStacked"] = len(index)
+    diagnostics["elapsedMs"] = round((time.perf_counter() - started) * 1000, 1)
+    return BacktestPortfolioResponse(
+        pnl=round((final_equity / initial - 1) * 100, 2) if initial > 0 else 0,
+        finalEquity=round(final_equity, 2),
+        winRate=round(wins / total * 100, 2) if total else 0,
+        totalTrades=total,
+        sharpeRatio=sharpe,
+        maxDrawdownPct=max_dd,
+        equityCurve=curve,
+        symbols=per_symbol,
+        diagnostics=diagnostics,
+    )
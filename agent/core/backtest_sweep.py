@@ -0,0 +1,346 @@
+"""
+Parameter-sweep backtests — one data load, many parameter combinations.
+
+Bars are fetched and indicators computed once per request. The numeric bar
+columns are then placed in a shared-memory block that every worker process
+maps read-only, and the parameter grid is fanned out across a process pool.
+Each combination runs the same `_walk_bars` engine as `/backtest`, so the
+ranked metrics match what individual runs would report.
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field
+
+from core.backtest_executor import (
+    FUTURES_TICK_VALUE,
+    BacktestRequest,
+    _compute_analytics,
+    _get_polygon_fetcher,
+    _load_equity_frame,
+    _load_futures_frame,
+    _parse_timeframe,
+    _resolve_equity_ticker,
+    _walk_bars,
+    compute_indicators,
+)
+
+MAX_SWEEP_COMBINATIONS = int(os.getenv("MAX_SWEEP_COMBINATIONS", "5000"))
+SWEEP_MAX_WORKERS = int(os.getenv("SWEEP_MAX_WORKERS", "0")) or (os.cpu_count() or 2)
+
+# Lower is better for these metrics; everything else ranks descending.
+_ASCENDING_METRICS = {"maxDrawdownPct"}
+_RANKABLE_METRICS = {"sharpeRatio", "pnl", "winRate", "maxDrawdownPct", "totalTrades"}
+
+
+# ── Pydantic models ──────────────────────────────────────────────────────────
+
+class BacktestSweepRequest(BacktestRequest):
+    # Dotted paths into runtime_spec, e.g. "riskManagement.stopLossPct" or
+    # "rules.entry.0.value", each mapped to the values to try.
+    param_grid: dict[str, list[Any]]
+    rank_by: str = "sharpeRatio"
+    top_n: int | None = Field(None, ge=1)
+    max_workers: int | None = None
+
+
+class BacktestSweepResponse(BaseModel):
+    combinations: int
+    rankBy: str
+    results: list[dict[str, Any]]
+    diagnostics: dict[str, Any] = {}
+
+
+# ── Grid expansion ───────────────────────────────────────────────────────────
+
+def _set_path(spec: dict[str, Any], path: str, value: Any) -> None:
+    """Set a dotted path in a runtime_spec, creating missing dict levels."""
+    keys = path.split(".")
+    node: Any = spec
+    for i, key in enumerate(keys):
+        last = i == len(keys) - 1
+        if isinstance(node, list):
+            try:
+                idx = int(key)
+                if last:
+                    node[idx] = value
+                    return
+                node = node[idx]
+            except (ValueError, IndexError) as exc:
+                raise ValueError(f"Invalid list index '{key}' in sweep path '{path}'.") from exc
+        elif isinstance(node, dict):
+            if last:
+                node[key] = value
+                return
+            node = node.setdefault(key, {})
+        else:
+            raise ValueError(f"Sweep path '{path}' does not resolve inside runtime_spec.")
+
+
+def expand_param_grid(
+    spec: dict[str, Any], param_grid: dict[str, list[Any]]
+) -> list[tuple[dict[str, Any], dict[str, Any]]]:
+    """Cartesian product of the grid as (params, patched runtime_spec) pairs."""
+    if not param_grid:
+        raise ValueError("param_grid must contain at least one parameter.")
+    keys = sorted(param_grid)
+    for key in keys:
+        if not isinstance(param_grid[key], list) or not param_grid[key]:
+            raise ValueError(f"param_grid['{key}'] must be a non-empty list.")
+
+    total = 1
+    for key in keys:
+        total *= len(param_grid[key])
+    if total > MAX_SWEEP_COMBINATIONS:
+        raise ValueError(
+            f"param_grid expands to {total} combinations; the limit is {MAX_SWEEP_COMBINATIONS}."
+        )
+
+    combos: list[tuple[dict[str, Any], dict[str, Any]]] = []
+    for values in itertools.product(*(param_grid[key] for key in keys)):
+        params = dict(zip(keys, values))
+        patched = copy.deepcopy(spec)
+        for path, value in params.items():
+            _set_path(patched, path, value)
+        combos.append((params, patched))
+    return combos
+
+
+def grid_indicators(spec: dict[str, Any], combos: list[tuple[dict[str, Any], dict[str, Any]]]) -> list[str]:
+    """Every indicator any combination needs, so one shared frame serves them all.
+
+    A grid path can patch ``indicators`` itself (or a rule that reads an
+    indicator only some combinations list), so the base spec's list alone
+    is not enough.
+    """
+    required = list(spec.get("indicators", []))
+    for _, patched in combos:
+        required.extend(patched.get("indicators", []))
+    return list(dict.fromkeys(required))
+
+
+async def shutdown_pool(pool: ProcessPoolExecutor) -> None:
+    """Join the pool's workers off the event loop."""
+    await asyncio.to_thread(pool.shutdown)
+
+
+# ── Shared read-only bar frame ───────────────────────────────────────────────
+
+def _share_frame(df: pd.DataFrame) -> tuple[shared_memory.SharedMemory, dict[str, Any]]:
+    """Copy the numeric columns of ``df`` into one shared-memory block.
+
+    Returns the owning block plus a small picklable descriptor workers use to
+    rebuild a zero-copy DataFrame view.
+    """
+    columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    n = len(df)
+    shm = shared_memory.SharedMemory(create=True, size=max(len(columns) * n * 8, 1))
+    block = np.ndarray((len(columns), n), dtype=np.float64, buffer=shm.buf)
+    for j, col in enumerate(columns):
+        block[j] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+
+    descriptor: dict[str, Any] = {"name": shm.name, "columns": columns, "rows": n}
+    if isinstance(df.index, pd.DatetimeIndex):
+        tz = df.index.tz
+        naive = df.index.tz_convert("UTC").tz_localize(None) if tz is not None else df.index
+        descriptor["index"] = {
+            "ticks": naive.asi8,
+            "unit": np.datetime_data(naive.dtype)[0],
+            "tz": str(tz) if tz is not None else None,
+        }
+    else:
+        descriptor["index"] = {"values": df.index}
+    return shm, descriptor
+
+
+def _attach_frame(descriptor: dict[str, Any]) -> tuple[shared_memory.SharedMemory, pd.DataFrame]:
+    shm = shared_memory.SharedMemory(name=descriptor["name"])
+    columns = descriptor["columns"]
+    block = np.ndarray((len(columns), descriptor["rows"]), dtype=np.float64, buffer=shm.buf)
+    block.flags.writeable = False
+
+    index_info = descriptor["index"]
+    if "ticks" in index_info:
+        index = pd.DatetimeIndex(index_info["ticks"].view(f"datetime64[{index_info['unit']}]"))
+        if index_info["tz"]:
+            index = index.tz_localize("UTC").tz_convert(index_info["tz"])
+    else:
+        index = index_info["values"]
+
+    # block.T is (rows, columns) in Fortran order, so each column stays a view.
+    df = pd.DataFrame(block.T, columns=columns, index=index, copy=False)
+    return shm, df
+
+
+# ── Worker side ──────────────────────────────────────────────────────────────
+
+_worker_shm: shared_memory.SharedMemory | None = None
+_worker_frame: pd.DataFrame | None = None
+
+
+def _init_worker(descriptor: dict[str, Any]) -> None:
+    global _worker_shm, _worker_frame
+    _worker_shm, _worker_frame = _attach_frame(descriptor)
+
+
+def _evaluate_combo(
+    df: pd.DataFrame,
+    params: dict[str, Any],
+    spec: dict[str, Any],
+    slippage_pct: float,
+    initial_capital: float,
+    futures_multiplier: float | None,
+    contract_spec: str | None,
+) -> dict[str, Any]:
+    trades = _walk_bars(df, spec, slippage_pct, futures_multiplier=futures_multiplier, contract_spec=contract_spec)
+    return _summarize(params, trades, initial_capital)
+
+
+def _summarize(params: dict[str, Any], trades: list[dict[str, Any]], initial_capital: float) -> dict[str, Any]:
+    total = len(trades)
+    wins = sum(1 for t in trades if t["pnl"] > 0)
+    sharpe, max_dd, _ = _compute_analytics(trades, initial_capital)
+    return {
+        "params": params,
+        "pnl": round(sum(t["pnl"] for t in trades), 2) if trades else 0,
+        "winRate": round(wins / total * 100, 2) if total > 0 else 0,
+        "totalTrades": total,
+        "sharpeRatio": sharpe,
+        "maxDrawdownPct": max_dd,
+    }
+
+
+def _run_chunk(
+    chunk: list[tuple[dict[str, Any], dict[str, Any]]],
+    slippage_pct: float,
+    initial_capital: float,
+    futures_multiplier: float | None,
+    contract_spec: str | None,
+) -> list[dict[str, Any]]:
+    """Evaluate a slice of the grid against the worker's shared frame."""
+    if _worker_frame is None:
+        raise RuntimeError("Sweep worker started without a shared bar frame.")
+    return [
+        _evaluate_combo(_worker_frame, params, spec, slippage_pct, initial_capital, futures_multiplier, contract_spec)
+        for params, spec in chunk
+    ]
+
+
+# ── Entry point ──────────────────────────────────────────────────────────────
+
+def _rank(rows: list[dict[str, Any]], rank_by: str) -> list[dict[str, Any]]:
+    ascending = rank_by in _ASCENDING_METRICS
+
+    def key(row: dict[str, Any]) -> tuple[int, float]:
+        value = row.get(rank_by)
+        if value is None:
+            return (1, 0.0)  # combinations without the metric rank last
+        return (0, value if ascending else -value)
+
+    ranked = sorted(rows, key=key)
+    for idx, row in enumerate(ranked):
+        row["rank"] = idx + 1
+    return ranked
+
+
+async def _load_sweep_frame(
+    req: BacktestRequest,
+) -> tuple[pd.DataFrame | None, float | None, str | None, dict[str, Any]]:
+    """Bars for the request's instrument as (df, futures_multiplier, contract_spec, diagnostics)."""
+    if _parse_timeframe(req.timeframe)[1] != "day":
+        raise ValueError("Sweeps and walk-forward runs only support the 'day' timeframe.")
+    futures_multiplier: float | None = None
+    contract_spec: str | None = None
+    if req.trading_method == "futures":
+        fut_cs = req.contract_selection.get("futures", req.contract_selection)
+        symbol = fut_cs.get("symbol", "ES").upper()
+        futures_multiplier = FUTURES_TICK_VALUE.get(symbol, FUTURES_TICK_VALUE["ES"])["multiplier"]
+        contract_spec = f"{symbol} continuous"
+        df, provider, fallback = await _load_futures_frame(symbol, req.start_date, req.end_date)
+    else:
+        symbol = _resolve_equity_ticker(req.contract_selection)
+        df = await _load_equity_frame(_get_polygon_fetcher(), symbol, req.start_date, req.end_date)
+        provider, fallback = "polygon", False
+
+    diagnostics: dict[str, Any] = {
+        "ticker": symbol,
+        "provider": provider,
+        "barsLoaded": 0 if df is None else len(df),
+        "usedFallbackData": fallback,
+    }
+    return df, futures_multiplier, contract_spec, diagnostics
+
+
+async def execute_backtest_sweep(req: BacktestSweepRequest) -> BacktestSweepResponse:
+    """Run the parameter grid for one ticker/timeframe and rank the combinations."""
+    started = time.perf_counter()
+    if req.rank_by not in _RANKABLE_METRICS:
+        raise ValueError(f"rank_by must be one of {sorted(_RANKABLE_METRICS)}.")
+
+    spec = req.runtime_spec
+    spread_config = spec.get("execution", {}).get("spreadConfig")
+    if req.trading_method == "options" or (
+        spread_config and spread_config.get("strategy") in ("credit_spread", "debit_spread")
+    ):
+        raise ValueError("Parameter sweeps support equities and futures strategies only.")
+
+    combos = expand_param_grid(spec, req.param_grid)
+    slippage_pct = req.slippage_bps / 10_000
+
+    df, futures_multiplier, contract_spec, diagnostics = await _load_sweep_frame(req)
+    if df is None or len(df) < 21:
+        return BacktestSweepResponse(combinations=len(combos), rankBy=req.rank_by, results=[], diagnostics=diagnostics)
+
+    # One frame is shared by every combination, so it carries all their indicators.
+    df = compute_indicators(df, grid_indicators(spec, combos))
+
+    workers = max(1, min(req.max_workers or SWEEP_MAX_WORKERS, SWEEP_MAX_WORKERS, len(combos)))
+    if workers == 1:
+        rows = await asyncio.to_thread(
+            lambda: [
+                _evaluate_combo(df, params, patched, slippage_pct, req.initial_capital, futures_multiplier, contract_spec)
+                for params, patched in combos
+            ]
+        )
+    else:
+        # A few chunks per worker keeps the pool balanced without per-combo IPC.
+        chunk_size = max(1, -(-len(combos) // (workers * 4)))
+        chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+        shm, descriptor = _share_frame(df)
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(descriptor,))
+        try:
+            loop = asyncio.get_running_loop()
+            chunk_rows = await asyncio.gather(*(
+                loop.run_in_executor(
+                    pool, _run_chunk, chunk, slippage_pct, req.initial_capital, futures_multiplier, contract_spec,
+                )
+                for chunk in chunks
+            ))
+        finally:
+            await shutdown_pool(pool)
+            shm.close()
+            shm.unlink()
+        rows = [row for part in chunk_rows for row in part]
+
+    ranked = _rank(rows, req.rank_by)
+    if req.top_n is not None:
+        ranked = ranked[: req.top_n]
+
+    diagnostics["workers"] = workers
+    diagnostics["elapsedMs"] = round((time.perf_counter() - started) * 1000, 1)
+    return BacktestSweepResponse(
+        combinations=len(combos),
+        rankBy=req.rank_by,
+        results=ranked,
+        diagnostics=diagnostics,
+    )
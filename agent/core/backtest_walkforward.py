@@ -0,0 +1,330 @@
+"""
+Walk-forward optimization — rolling in-sample tuning, out-of-sample scoring.
+
+`start_date`..`end_date` is cut into consecutive train/test windows. On each
+train window every combination of the parameter grid (the risk settings by
+default) is run and ranked; the winner is then run once on the following
+test window. Bars are loaded and indicators computed once, and both phases
+fan out over the same shared-memory frame and process pool as parameter
+sweeps. The out-of-sample trades of all test windows are stitched into one
+equity curve, and the chosen parameters are summarised per window so
+unstable optimisations stand out.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from core import backtest_sweep as sweep
+from core.backtest_executor import BacktestRequest, _compute_analytics, _walk_bars, compute_indicators
+from core.backtest_sweep import (
+    _RANKABLE_METRICS,
+    SWEEP_MAX_WORKERS,
+    _init_worker,
+    _load_sweep_frame,
+    _rank,
+    _share_frame,
+    _summarize,
+    expand_param_grid,
+    grid_indicators,
+    shutdown_pool,
+)
+
+WALKFORWARD_MAX_WINDOWS = int(os.getenv("WALKFORWARD_MAX_WINDOWS", "200"))
+WALKFORWARD_MAX_EVALUATIONS = int(os.getenv("WALKFORWARD_MAX_EVALUATIONS", "20000"))
+
+# Grid used when the request doesn't bring its own.
+DEFAULT_RISK_GRID: dict[str, list[Any]] = {
+    "riskManagement.stopLossPct": [0.05, 0.10, 0.15],
+    "riskManagement.takeProfitPct": [0.10, 0.20, 0.30],
+    "riskManagement.maxBarsInTrade": [12, 24, 48],
+}
+
+_WARMUP_BARS = 20  # _walk_bars skips this many leading bars of any slice
+
+
+# ── Pydantic models ──────────────────────────────────────────────────────────
+
+class BacktestWalkForwardRequest(BacktestRequest):
+    param_grid: dict[str, list[Any]] | None = None
+    train_days: int = 180
+    test_days: int = 60
+    # Distance between consecutive windows; defaults to test_days so the
+    # test windows tile the range without overlapping.
+    step_days: int | None = None
+    # Anchored windows keep the train start fixed at the first bar.
+    anchored: bool = False
+    rank_by: str = "sharpeRatio"
+    max_workers: int | None = None
+
+
+class BacktestWalkForwardResponse(BaseModel):
+    rankBy: str
+    windows: list[dict[str, Any]]
+    outOfSample: dict[str, Any]
+    trades: list[dict[str, Any]]
+    equityCurve: list[dict[str, Any]] = []
+    parameterStability: dict[str, dict[str, Any]] = {}
+    diagnostics: dict[str, Any] = {}
+
+
+# ── Windows ──────────────────────────────────────────────────────────────────
+
+def build_windows(
+    index: pd.DatetimeIndex,
+    train_days: int,
+    test_days: int,
+    step_days: int,
+    anchored: bool = False,
+) -> list[dict[str, Any]]:
+    """Train/test windows over ``index`` as row ranges plus their boundaries.
+
+    Test windows that would start after the last bar are dropped; the last
+    one may be shorter than ``test_days``. Windows with too few train bars
+    for ``_walk_bars`` are skipped.
+    """
+    if not len(index):
+        return []
+    origin = index[0].normalize()
+    train, test, step = (pd.Timedelta(days=d) for d in (train_days, test_days, step_days))
+    windows: list[dict[str, Any]] = []
+    k = 0
+    while True:
+        train_end = origin + k * step + train
+        if train_end > index[-1]:
+            break
+        train_start = origin if anchored else origin + k * step
+        test_end = train_end + test
+        lo, mid, hi = index.searchsorted([train_start, train_end, test_end])
+        k += 1
+        if hi <= mid or mid - lo <= _WARMUP_BARS + 1:
+            continue
+        windows.append({
+            "trainStart": str(train_start.date()),
+            "trainEnd": str(train_end.date()),
+            "testStart": str(train_end.date()),
+            "testEnd": str(test_end.date()),
+            "trainRows": (int(lo), int(mid)),
+            "testRows": (int(mid), int(hi)),
+        })
+    return windows
+
+
+# ── Slice evaluation (runs in workers) ───────────────────────────────────────
+
+# (key, first row, end row, params, patched runtime_spec)
+SliceTask = tuple[Any, int, int, dict[str, Any], dict[str, Any]]
+
+
+def _evaluate_slices(
+    df: pd.DataFrame,
+    tasks: list[SliceTask],
+    keep_trades: bool,
+    slippage_pct: float,
+    initial_capital: float,
+    futures_multiplier: float | None,
+    contract_spec: str | None,
+) -> list[tuple[Any, dict[str, Any], list[dict[str, Any]] | None]]:
+    """Run each task on its row range of ``df``.
+
+    Each slice is extended backwards by the warm-up, so the first entry can
+    land on the window's first bar; indicators come from the full history.
+    """
+    out: list[tuple[Any, dict[str, Any], list[dict[str, Any]] | None]] = []
+    for key, lo, hi, params, spec in tasks:
+        part = df.iloc[max(0, lo - _WARMUP_BARS):hi]
+        trades = _walk_bars(part, spec, slippage_pct, futures_multiplier=futures_multiplier, contract_spec=contract_spec)
+        out.append((key, _summarize(params, trades, initial_capital), trades if keep_trades else None))
+    return out
+
+
+def _run_slices(
+    tasks: list[SliceTask],
+    keep_trades: bool,
+    slippage_pct: float,
+    initial_capital: float,
+    futures_multiplier: float | None,
+    contract_spec: str | None,
+) -> list[tuple[Any, dict[str, Any], list[dict[str, Any]] | None]]:
+    if sweep._worker_frame is None:
+        raise RuntimeError("Walk-forward worker started without a shared bar frame.")
+    return _evaluate_slices(
+        sweep._worker_frame, tasks, keep_trades, slippage_pct, initial_capital, futures_multiplier, contract_spec,
+    )
+
+
+# ── Summaries ────────────────────────────────────────────────────────────────
+
+def _parameter_stability(chosen: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """How consistently each parameter was picked across windows."""
+    stability: dict[str, dict[str, Any]] = {}
+    if not chosen:
+        return stability
+    for key in sorted(chosen[0]):
+        values = [params[key] for params in chosen]
+        counts: dict[str, int] = {}
+        for value in values:
+            counts[repr(value)] = counts.get(repr(value), 0) + 1
+        mode_repr = max(counts, key=counts.get)
+        entry: dict[str, Any] = {
+            "values": values,
+            "mode": next(v for v in values if repr(v) == mode_repr),
+            "modeShare": round(counts[mode_repr] / len(values), 3),
+            "distinct": len(counts),
+            "changes": sum(1 for a, b in zip(values, values[1:]) if a != b),
+        }
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            arr = np.asarray(values, dtype=np.float64)
+            mean = float(arr.mean())
+            std = float(arr.std(ddof=1)) if len(arr) > 1 else 0.0
+            entry["mean"] = round(mean, 6)
+            entry["std"] = round(std, 6)
+            entry["cv"] = round(std / abs(mean), 4) if mean else None
+        stability[key] = entry
+    return stability
+
+
+# ── Entry point ──────────────────────────────────────────────────────────────
+
+async def execute_backtest_walkforward(req: BacktestWalkForwardRequest) -> BacktestWalkForwardResponse:
+    """Optimise on each train window, score the winner on the next test window."""
+    started = time.perf_counter()
+    if req.rank_by not in _RANKABLE_METRICS:
+        raise ValueError(f"rank_by must be one of {sorted(_RANKABLE_METRICS)}.")
+    if req.train_days < 1 or req.test_days < 1:
+        raise ValueError("train_days and test_days must be positive.")
+    step_days = req.step_days or req.test_days
+    if step_days < req.test_days:
+        raise ValueError("step_days must be at least test_days so test windows don't overlap.")
+
+    spec = req.runtime_spec
+    spread_config = spec.get("execution", {}).get("spreadConfig")
+    if req.trading_method == "options" or (
+        spread_config and spread_config.get("strategy") in ("credit_spread", "debit_spread")
+    ):
+        raise ValueError("Walk-forward runs support equities and futures strategies only.")
+
+    combos = expand_param_grid(spec, req.param_grid or DEFAULT_RISK_GRID)
+    slippage_pct = req.slippage_bps / 10_000
+
+    df, futures_multiplier, contract_spec, diagnostics = await _load_sweep_frame(req)
+    empty = BacktestWalkForwardResponse(rankBy=req.rank_by, windows=[], outOfSample={}, trades=[], diagnostics=diagnostics)
+    if df is None or len(df) < 21:
+        return empty
+
+    windows = build_windows(df.index, req.train_days, req.test_days, step_days, req.anchored)
+    if len(windows) > WALKFORWARD_MAX_WINDOWS:
+        raise ValueError(f"The range splits into {len(windows)} windows; the limit is {WALKFORWARD_MAX_WINDOWS}.")
+    if len(windows) * len(combos) > WALKFORWARD_MAX_EVALUATIONS:
+        raise ValueError(
+            f"{len(windows)} windows x {len(combos)} combinations exceeds the limit of "
+            f"{WALKFORWARD_MAX_EVALUATIONS} evaluations."
+        )
+    diagnostics["windows"] = len(windows)
+    diagnostics["combinations"] = len(combos)
+    if not windows:
+        return empty
+
+    # Indicators are causal, so computing them once over the whole range
+    # leaks nothing from a test window into its train window.
+    df = compute_indicators(df, grid_indicators(spec, combos))
+
+    train_tasks: list[SliceTask] = [
+        ((w, c), *windows[w]["trainRows"], params, patched)
+        for w in range(len(windows))
+        for c, (params, patched) in enumerate(combos)
+    ]
+    args = (slippage_pct, req.initial_capital, futures_multiplier, contract_spec)
+    workers = max(1, min(req.max_workers or SWEEP_MAX_WORKERS, SWEEP_MAX_WORKERS, len(train_tasks)))
+
+    loop = asyncio.get_running_loop()
+    shm = pool = None
+    if workers > 1:
+        shm, descriptor = _share_frame(df)
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(descriptor,))
+
+    async def evaluate(tasks: list[SliceTask], keep_trades: bool):
+        if pool is None:
+            return await asyncio.to_thread(_evaluate_slices, df, tasks, keep_trades, *args)
+        # A few chunks per worker keeps the pool balanced without per-task IPC.
+        size = max(1, -(-len(tasks) // (workers * 4)))
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(pool, _run_slices, tasks[i:i + size], keep_trades, *args)
+            for i in range(0, len(tasks), size)
+        ))
+        return [row for part in parts for row in part]
+
+    try:
+        by_window: list[list[dict[str, Any]]] = [[] for _ in windows]
+        for (w, c), row, _ in await evaluate(train_tasks, False):
+            row["_combo"] = c
+            by_window[w].append(row)
+        best = [_rank(rows, req.rank_by)[0] for rows in by_window]
+        test_tasks: list[SliceTask] = [
+            (w, *windows[w]["testRows"], combos[best[w]["_combo"]][0], combos[best[w]["_combo"]][1])
+            for w in range(len(windows))
+        ]
+        tested = {w: (row, trades) for w, row, trades in await evaluate(test_tasks, True)}
+    finally:
+        if pool is not None:
+            await shutdown_pool(pool)
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    out_windows: list[dict[str, Any]] = []
+    oos_trades: list[dict[str, Any]] = []
+    train_pnl = test_pnl = 0.0
+    train_bars = test_bars = 0
+    for w, window in enumerate(windows):
+        (train_lo, train_hi), (test_lo, test_hi) = window["trainRows"], window["testRows"]
+        row, trades = tested[w]
+        in_sample = {k: v for k, v in best[w].items() if k not in ("params", "rank", "_combo")}
+        out_of_sample = {k: v for k, v in row.items() if k != "params"}
+        out_windows.append({
+            "window": w,
+            "trainStart": window["trainStart"],
+            "trainEnd": window["trainEnd"],
+            "testStart": window["testStart"],
+            "testEnd": window["testEnd"],
+            "trainBars": train_hi - train_lo,
+            "testBars": test_hi - test_lo,
+            "bestParams": best[w]["params"],
+            "inSample": in_sample,
+            "outOfSample": out_of_sample,
+        })
+        for trade in trades or []:
+            trade["window"] = w
+            oos_trades.append(trade)
+        train_pnl += best[w]["pnl"]
+        test_pnl += row["pnl"]
+        train_bars += train_hi - train_lo
+        test_bars += test_hi - test_lo
+
+    summary = _summarize({}, oos_trades, req.initial_capital)
+    summary.pop("params")
+    _, _, curve = _compute_analytics(oos_trades, req.initial_capital)
+    # Out-of-sample return per bar relative to in-sample; near 1 means the
+    # optimised edge carried over.
+    train_rate = train_pnl / train_bars if train_bars else 0.0
+    summary["walkForwardEfficiency"] = round((test_pnl / test_bars) / train_rate, 3) if train_rate > 0 and test_bars else None
+
+    diagnostics["workers"] = workers
+    diagnostics["evaluations"] = len(train_tasks) + len(test_tasks)
+    diagnostics["elapsedMs"] = round((time.perf_counter() - started) * 1000, 1)
+    return BacktestWalkForwardResponse(
+        rankBy=req.rank_by,
+        windows=out_windows,
+        outOfSample=summary,
+        trades=oos_trades,
+        equityCurve=curve,
+        parameterStability=_parameter_stability([w["bestParams"] for w in out_windows]),
+        diagnostics=diagnostics,
+    )
@@ -0,0 +1,280 @@
+"""
+Persistent on-disk cache for historical OHLCV aggregates.
+
+Bars for a finished session never change, so each (ticker, multiplier,
+timespan) series is stored once as a memory-mapped NumPy structured array
+alongside a small JSON file listing the date ranges already fetched. Range
+queries read the covered part straight from disk and only call out to the
+network for the missing date gaps, which are merged back into the file.
+Today's session is always fetched live and never persisted.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from core.polygon_agent import _resolve_local_path
+
+BAR_DTYPE = np.dtype([
+    ("t", "<i8"),  # bar start, epoch milliseconds (UTC)
+    ("o", "<f8"),
+    ("h", "<f8"),
+    ("l", "<f8"),
+    ("c", "<f8"),
+    ("v", "<f8"),
+])
+
+BAR_CACHE_ENABLED = os.getenv("BAR_CACHE_ENABLED", "true").lower() == "true"
+
+_MARKET_TZ = ZoneInfo("America/New_York")
+# An empty answer for a gap longer than this cannot be a weekend/holiday run,
+# so it is treated as a transient upstream miss and not recorded as covered.
+_MAX_EMPTY_GAP_DAYS = 4
+
+# (start_date, end_date) -> (bars, truncated). ``truncated`` means the source
+# hit its row limit, so only dates up to the last returned bar are complete.
+# Bars may come back as dicts or as a ready ``BAR_DTYPE`` array.
+GapFetcher = Callable[[str, str], Awaitable[tuple[list[dict[str, Any]] | np.ndarray, bool]]]
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value[:10], "%Y-%m-%d").date()
+
+
+def _day_start_ms(day: date) -> int:
+    """Epoch ms of midnight ET, the boundary Polygon uses for session dates."""
+    return int(datetime(day.year, day.month, day.day, tzinfo=_MARKET_TZ).timestamp() * 1000)
+
+
+def _today_et() -> date:
+    return datetime.now(_MARKET_TZ).date()
+
+
+def bars_to_array(bars: list[dict[str, Any]] | np.ndarray) -> np.ndarray:
+    """Convert Polygon/server bar dicts to a sorted, de-duplicated ``BAR_DTYPE`` array.
+
+    Accepts epoch-millisecond or ISO-8601 ``t`` values; bars without a
+    timestamp or OHLC price are dropped. An array that is already
+    ``BAR_DTYPE`` is only sorted and de-duplicated.
+    """
+    if isinstance(bars, np.ndarray):
+        return _dedupe(np.asarray(bars, dtype=BAR_DTYPE))
+    rows = [b for b in bars if isinstance(b, dict) and b.get("t") is not None]
+    if not rows:
+        return np.empty(0, dtype=BAR_DTYPE)
+
+    raw_t = [b["t"] for b in rows]
+    if isinstance(raw_t[0], str):
+        t = pd.to_datetime(raw_t, utc=True).as_unit("ms").asi8
+    else:
+        t = np.asarray(raw_t, dtype=np.int64)
+
+    out = np.empty(len(rows), dtype=BAR_DTYPE)
+    out["t"] = t
+    for key in ("o", "h", "l", "c", "v"):
+        out[key] = pd.to_numeric(pd.Series([b.get(key) for b in rows], dtype=object), errors="coerce")
+    out["v"] = np.nan_to_num(out["v"])
+    valid = ~(np.isnan(out["o"]) | np.isnan(out["h"]) | np.isnan(out["l"]) | np.isnan(out["c"]))
+    return _dedupe(out[valid])
+
+
+def _dedupe(arr: np.ndarray) -> np.ndarray:
+    # np.unique keeps the first occurrence, so callers put the freshest rows first.
+    _, idx = np.unique(arr["t"], return_index=True)
+    return arr[idx]
+
+
+def bar_array_to_frame(arr: np.ndarray, dtype: np.dtype | type = np.float64) -> pd.DataFrame:
+    """Build the executor's OHLCV DataFrame (ET DatetimeIndex) from a bar array.
+
+    ``dtype`` sets the column precision; float32 halves the memory of long
+    intraday series.
+    """
+    index = pd.DatetimeIndex(
+        arr["t"].astype("datetime64[ms]"), name="timestamp"
+    ).tz_localize("UTC").tz_convert("America/New_York")
+    return pd.DataFrame(
+        {
+            "open": arr["o"].astype(dtype, copy=False),
+            "high": arr["h"].astype(dtype, copy=False),
+            "low": arr["l"].astype(dtype, copy=False),
+            "close": arr["c"].astype(dtype, copy=False),
+            "volume": arr["v"].astype(dtype, copy=False),
+        },
+        index=index,
+    )
+
+
+def _merge_intervals(intervals: list[tuple[date, date]]) -> list[tuple[date, date]]:
+    merged: list[tuple[date, date]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _missing_ranges(
+    coverage: list[tuple[date, date]], start: date, end: date
+) -> list[tuple[date, date]]:
+    gaps: list[tuple[date, date]] = []
+    cursor = start
+    for c_start, c_end in coverage:
+        if c_end < cursor:
+            continue
+        if c_start > end:
+            break
+        if c_start > cursor:
+            gaps.append((cursor, c_start - timedelta(days=1)))
+        cursor = max(cursor, c_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class BarCache:
+    """Date-range cache of OHLCV bars rooted at one directory.
+
+    Layout: ``<root>/<TICKER>/<multiplier><timespan>/bars.npy`` plus
+    ``coverage.json``. Files are replaced atomically, so concurrent readers
+    (other workers or processes) only ever see a complete old or new copy.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def _series_dir(self, ticker: str, multiplier: int, timespan: str) -> Path:
+        safe_ticker = re.sub(r"[^A-Za-z0-9._-]", "_", ticker.upper())
+        return self.root / safe_ticker / f"{int(multiplier)}{timespan}"
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def _load(self, series: Path) -> tuple[np.ndarray, list[tuple[date, date]]]:
+        coverage_path = series / "coverage.json"
+        bars_path = series / "bars.npy"
+        # Coverage is read first: bars are always written before coverage, so the
+        # array on disk is never older than the coverage we just read.
+        try:
+            raw = json.loads(coverage_path.read_text())
+            coverage = [(_parse_date(s), _parse_date(e)) for s, e in raw.get("coverage", [])]
+            bars = np.load(bars_path, mmap_mode="r", allow_pickle=False)
+        except (FileNotFoundError, ValueError, OSError):
+            return np.empty(0, dtype=BAR_DTYPE), []
+        if bars.dtype != BAR_DTYPE:
+            return np.empty(0, dtype=BAR_DTYPE), []
+        return bars, coverage
+
+    def _save(self, series: Path, bars: np.ndarray, coverage: list[tuple[date, date]]) -> None:
+        series.mkdir(parents=True, exist_ok=True)
+        fd, tmp_bars = tempfile.mkstemp(dir=series, suffix=".npy.tmp")
+        with os.fdopen(fd, "wb") as fh:
+            np.save(fh, np.ascontiguousarray(bars, dtype=BAR_DTYPE), allow_pickle=False)
+        os.replace(tmp_bars, series / "bars.npy")
+
+        payload = {"coverage": [[s.isoformat(), e.isoformat()] for s, e in coverage]}
+        fd, tmp_cov = tempfile.mkstemp(dir=series, suffix=".json.tmp")
+        with os.fdopen(fd, "w") as fh:
+            json.dump(payload, fh)
+        os.replace(tmp_cov, series / "coverage.json")
+
+    @staticmethod
+    def _slice(bars: np.ndarray, start: date, end: date) -> np.ndarray:
+        t = bars["t"]
+        lo = np.searchsorted(t, _day_start_ms(start), side="left")
+        hi = np.searchsorted(t, _day_start_ms(end + timedelta(days=1)), side="left")
+        return bars[lo:hi]
+
+    async def get_range(
+        self,
+        ticker: str,
+        multiplier: int,
+        timespan: str,
+        start_date: str,
+        end_date: str,
+        fetch: GapFetcher,
+    ) -> tuple[np.ndarray, int]:
+        """Return bars for ``[start_date, end_date]`` (ET session dates, inclusive).
+
+        Only the date gaps not yet on disk are passed to ``fetch``. Returns the
+        bar array and the number of ranges that had to be fetched.
+        """
+        start, end = _parse_date(start_date), _parse_date(end_date)
+        if end < start:
+            return np.empty(0, dtype=BAR_DTYPE), 0
+
+        today = _today_et()
+        cacheable_end = min(end, today - timedelta(days=1))
+        series = self._series_dir(ticker, multiplier, timespan)
+        fetched_ranges = 0
+
+        async with self._lock(str(series)):
+            bars, coverage = await asyncio.to_thread(self._load, series)
+            gaps = _missing_ranges(coverage, start, cacheable_end) if cacheable_end >= start else []
+
+            fresh: list[np.ndarray] = []
+            new_coverage = list(coverage)
+            for gap_start, gap_end in gaps:
+                raw, truncated = await fetch(gap_start.isoformat(), gap_end.isoformat())
+                fetched_ranges += 1
+                arr = self._slice(bars_to_array(raw), gap_start, gap_end)
+                fresh.append(arr)
+                if truncated:
+                    if not len(arr):
+                        continue
+                    # The last returned session may be partial; keep only whole days.
+                    last_day = pd.Timestamp(int(arr["t"][-1]), unit="ms", tz=_MARKET_TZ).date()
+                    gap_end = last_day - timedelta(days=1)
+                    if gap_end < gap_start:
+                        continue
+                elif not len(arr) and (gap_end - gap_start).days >= _MAX_EMPTY_GAP_DAYS:
+                    continue
+                new_coverage.append((gap_start, gap_end))
+
+            if fresh:
+                bars = _dedupe(np.concatenate([*reversed(fresh), np.asarray(bars)]))
+                try:
+                    await asyncio.to_thread(self._save, series, bars, _merge_intervals(new_coverage))
+                except OSError:
+                    pass  # a read-only or full disk only costs us the cache
+
+            result = self._slice(bars, start, cacheable_end) if cacheable_end >= start else bars[:0]
+
+        if end > cacheable_end:
+            live_start = max(start, cacheable_end + timedelta(days=1))
+            raw, _ = await fetch(live_start.isoformat(), end.isoformat())
+            fetched_ranges += 1
+            live = self._slice(bars_to_array(raw), live_start, end)
+            result = np.concatenate([np.asarray(result), live])
+
+        return np.asarray(result), fetched_ranges
+
+
+_bar_cache: BarCache | None = None
+
+
+def get_bar_cache() -> BarCache | None:
+    """Process-wide cache rooted at BAR_CACHE_DIR, or None when disabled."""
+    global _bar_cache
+    if not BAR_CACHE_ENABLED:
+        return None
+    if _bar_cache is None:
+        _bar_cache = BarCache(_resolve_local_path("BAR_CACHE_DIR", ".cache/bars"))
+    return _bar_cache
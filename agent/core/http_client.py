@@ -0,0 +1,79 @@
+"""Process-wide pooled HTTP client shared by the market data fetchers.
+
+Every outbound call to Polygon/Massive, Databento, Quandl, FRED and the Node
+server goes through one long-lived ``httpx.AsyncClient`` so connections are
+kept alive between tool calls instead of paying a fresh TCP+TLS handshake per
+request. The API closes the client in its FastAPI lifespan; the CLI simply lets
+it go with the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+import httpx
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(key, default)))
+    except ValueError:
+        return default
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(key, default)))
+    except ValueError:
+        return default
+
+
+HTTP_MAX_CONNECTIONS = _env_int("HTTP_MAX_CONNECTIONS", 100)
+HTTP_MAX_KEEPALIVE_CONNECTIONS = _env_int("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)
+HTTP_KEEPALIVE_EXPIRY = _env_float("HTTP_KEEPALIVE_EXPIRY", 30.0)
+HTTP_DEFAULT_TIMEOUT = _env_float("HTTP_DEFAULT_TIMEOUT", 20.0)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _http2_available() -> bool:
+    # httpx only negotiates HTTP/2 when the optional `h2` package is installed.
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use in the running loop.
+
+    A pooled client is bound to the event loop that opened its connections, so a
+    new one is created if the loop changes (e.g. successive ``asyncio.run`` calls).
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=HTTP_DEFAULT_TIMEOUT,
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and release its pooled connections."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
@@ -0,0 +1,171 @@
+"""
+Memoized indicator columns keyed by a fingerprint of the bar data.
+
+Indicators are a pure function of the OHLCV bars, so each computed indicator
+group (e.g. RSI(14), or MACD+SIGNAL) is stored against a hash of the bar
+arrays. A later run over the same bars only computes the groups it hasn't
+seen yet, which makes iterating on a strategy's rules cheap. Entries live in
+an in-memory LRU bounded by size and can optionally spill to disk, so they
+survive restarts and evictions.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from core.polygon_agent import _resolve_local_path
+
+INDICATOR_CACHE_ENABLED = os.getenv("INDICATOR_CACHE_ENABLED", "true").lower() == "true"
+INDICATOR_CACHE_MAX_MB = float(os.getenv("INDICATOR_CACHE_MAX_MB", "256"))
+INDICATOR_CACHE_DISK = os.getenv("INDICATOR_CACHE_DISK", "false").lower() == "true"
+
+# Version of the indicator implementations. Spilled columns are stored under it,
+# so bump it whenever a kernel's output changes and older spills are ignored.
+INDICATOR_CACHE_VERSION = 2
+
+# Columns an indicator may read; anything else on the frame doesn't affect the hash.
+_FINGERPRINT_COLUMNS = ("open", "high", "low", "close", "volume")
+
+# group key -> {column name: values}
+IndicatorColumns = dict[str, np.ndarray]
+
+
+def bars_fingerprint(df: pd.DataFrame) -> str:
+    """Stable hash of the frame's index and OHLCV columns."""
+    h = hashlib.blake2b(digest_size=16)
+    index = df.index
+    if isinstance(index, pd.DatetimeIndex):
+        h.update(str(index.tz).encode())
+        h.update(np.ascontiguousarray(index.asi8).tobytes())
+    else:
+        h.update(np.ascontiguousarray(np.asarray(index, dtype=np.int64)).tobytes())
+    for col in _FINGERPRINT_COLUMNS:
+        if col not in df.columns:
+            continue
+        h.update(col.encode())
+        h.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+
+class IndicatorCache:
+    """LRU of ``fingerprint -> {group: columns}`` with optional disk spill.
+
+    Thread-safe; the size bound counts the bytes of the cached arrays.
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Path | None = None) -> None:
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self._entries: OrderedDict[str, dict[str, IndicatorColumns]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def _spill_path(self, fingerprint: str, group: str) -> Path:
+        safe_group = re.sub(r"[^A-Za-z0-9._-]", "_", group)
+        return self.spill_dir / f"v{INDICATOR_CACHE_VERSION}" / fingerprint[:2] / fingerprint / f"{safe_group}.npz"
+
+    def _read_spill(self, fingerprint: str, group: str) -> IndicatorColumns | None:
+        if self.spill_dir is None:
+            return None
+        try:
+            with np.load(self._spill_path(fingerprint, group), allow_pickle=False) as data:
+                return {name: data[name] for name in data.files}
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def _write_spill(self, fingerprint: str, group: str, columns: IndicatorColumns) -> None:
+        if self.spill_dir is None:
+            return
+        path = self._spill_path(fingerprint, group)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".npz.tmp")
+            with os.fdopen(fd, "wb") as fh:
+                np.savez(fh, **columns)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # a read-only or full disk only costs us the spill
+
+    def _store(self, fingerprint: str, group: str, columns: IndicatorColumns) -> None:
+        with self._lock:
+            groups = self._entries.setdefault(fingerprint, {})
+            if group in groups:
+                return
+            for values in columns.values():
+                values.setflags(write=False)
+            groups[group] = columns
+            self._bytes += sum(v.nbytes for v in columns.values())
+            self._entries.move_to_end(fingerprint)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= sum(v.nbytes for cols in evicted.values() for v in cols.values())
+
+    def get_or_compute(
+        self,
+        df: pd.DataFrame,
+        groups: list[str],
+        compute: Callable[[str], IndicatorColumns],
+    ) -> IndicatorColumns:
+        """Columns for every requested group; only uncached groups are computed."""
+        fingerprint = bars_fingerprint(df)
+        with self._lock:
+            cached = dict(self._entries.get(fingerprint, {}))
+            if fingerprint in self._entries:
+                self._entries.move_to_end(fingerprint)
+
+        out: IndicatorColumns = {}
+        for group in groups:
+            columns = cached.get(group)
+            if columns is not None:
+                self.hits += 1
+            else:
+                columns = self._read_spill(fingerprint, group)
+                if columns is not None:
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+                    columns = {
+                        name: np.asarray(values, dtype=np.float64)
+                        for name, values in compute(group).items()
+                    }
+                    self._write_spill(fingerprint, group, columns)
+                self._store(fingerprint, group, columns)
+            out.update(columns)
+        return out
+
+    def stats(self) -> dict[str, float | int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "datasets": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_indicator_cache: IndicatorCache | None = None
+
+
+def get_indicator_cache() -> IndicatorCache | None:
+    """Process-wide cache, or None when INDICATOR_CACHE_ENABLED is off."""
+    global _indicator_cache
+    if not INDICATOR_CACHE_ENABLED:
+        return None
+    if _indicator_cache is None:
+        spill = _resolve_local_path("INDICATOR_CACHE_DIR", ".cache/indicators") if INDICATOR_CACHE_DISK else None
+        _indicator_cache = IndicatorCache(int(INDICATOR_CACHE_MAX_MB * 1024 * 1024), spill)
+    return _indicator_cache
@@ -0,0 +1,184 @@
+"""
+NumPy kernels for the indicators the backtest executor uses.
+
+Each kernel takes contiguous float64 arrays, writes into a preallocated output
+and reproduces pandas_ta's default (non-TA-Lib) definitions:
+
+* ``ema``  — SMA-seeded EMA (``presma``), ``adjust=False``
+* ``rsi``  — Wilder RSI on RMA-smoothed gains and losses
+* ``macd`` — EMA(fast) - EMA(slow), signal = EMA of MACD from its first value
+* ``vwap`` — session-anchored VWAP of the HLC3 typical price
+
+Too-short inputs give all-NaN outputs where pandas_ta would return None.
+Recursive smoothing runs in closed form over blocks, so there is no
+per-bar Python loop.
+"""
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# exp(-_BLOCK_LOG_SPAN) is the smallest decay factor a block may reach, which
+# keeps the rescaled terms inside float64 range.
+_BLOCK_LOG_SPAN = 600.0
+
+
+def _as_float(values: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _nan_out(n: int, out: np.ndarray | None) -> np.ndarray:
+    if out is None:
+        return np.full(n, np.nan)
+    out.fill(np.nan)
+    return out
+
+
+def _ewm_adjust_false(x: np.ndarray, alpha: float, out: np.ndarray) -> np.ndarray:
+    """``pd.Series(x).ewm(alpha=alpha, adjust=False).mean()`` into ``out``.
+
+    Within a block of length B, y[j] = d[j] * (y_prev + alpha * cumsum(x / d)),
+    where d[j] = (1 - alpha) ** (j + 1). Blocks are sized so that 1/d stays
+    finite. Interior NaNs change pandas' weighting, so they defer to pandas.
+    """
+    n = len(x)
+    out[:] = np.nan
+    finite = np.flatnonzero(~np.isnan(x))
+    if not len(finite):
+        return out
+    first = int(finite[0])
+    if len(finite) != n - first:
+        out[:] = pd.Series(x).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        return out
+
+    out[first] = x[first]
+    if alpha >= 1.0:
+        out[first:] = x[first:]
+        return out
+    log_keep = -math.log1p(-alpha)
+    block = max(1, int(_BLOCK_LOG_SPAN / log_keep))
+    decay_full = np.exp(-log_keep * np.arange(1, min(block, n) + 1))
+    prev = x[first]
+    pos = first + 1
+    while pos < n:
+        end = min(pos + block, n)
+        decay = decay_full[: end - pos]
+        seg = out[pos:end]
+        np.divide(x[pos:end], decay, out=seg)
+        np.cumsum(seg, out=seg)
+        seg *= alpha
+        seg += prev
+        seg *= decay
+        prev = seg[-1]
+        pos = end
+    return out
+
+
+def ema(close: np.ndarray, length: int, out: np.ndarray | None = None) -> np.ndarray:
+    """pandas_ta ``ema(close, length)``: seeded with the SMA of the first ``length`` values."""
+    close = _as_float(close)
+    n = len(close)
+    if n < length or length < 1:
+        return _nan_out(n, out)
+    if out is None:
+        out = np.empty(n)
+    seeded = close.copy()
+    head = seeded[:length]
+    seed = float(np.nanmean(head)) if not np.isnan(head).all() else np.nan
+    seeded[: length - 1] = np.nan
+    seeded[length - 1] = seed
+    return _ewm_adjust_false(seeded, 2.0 / (length + 1.0), out)
+
+
+def rma(values: np.ndarray, length: int, out: np.ndarray | None = None) -> np.ndarray:
+    """Wilder smoothing: EWM with alpha = 1/length, ``adjust=False``."""
+    values = _as_float(values)
+    if out is None:
+        out = np.empty(len(values))
+    return _ewm_adjust_false(values, 1.0 / length if length > 0 else 0.5, out)
+
+
+def rsi(close: np.ndarray, length: int = 14, out: np.ndarray | None = None) -> np.ndarray:
+    close = _as_float(close)
+    n = len(close)
+    if n < length + 1 or length < 1:
+        return _nan_out(n, out)
+    change = np.empty(n)
+    change[0] = np.nan
+    np.subtract(close[1:], close[:-1], out=change[1:])
+    gains = rma(np.where(change < 0, 0.0, change), length)
+    losses = rma(np.where(change > 0, 0.0, change), length)
+    if out is None:
+        out = np.empty(n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(100.0 * gains, gains + np.abs(losses), out=out)
+    return out
+
+
+def macd(
+    close: np.ndarray,
+    fast: int = 12,
+    slow: int = 26,
+    signal: int = 9,
+) -> tuple[np.ndarray, np.ndarray]:
+    """``(macd, signal)`` lines; the histogram is their difference."""
+    close = _as_float(close)
+    n = len(close)
+    if slow < fast:
+        fast, slow = slow, fast
+    if n < slow + signal - 1:
+        return np.full(n, np.nan), np.full(n, np.nan)
+    line = ema(close, fast)
+    line -= ema(close, slow)
+    signal_line = np.full(n, np.nan)
+    valid = np.flatnonzero(~np.isnan(line))
+    if len(valid):
+        first = int(valid[0])
+        ema(line[first:], signal, out=signal_line[first:])
+    return line, signal_line
+
+
+def vwap(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray,
+    session: np.ndarray,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """VWAP of (high + low + close) / 3, reset whenever ``session`` changes.
+
+    ``session`` is any non-decreasing per-bar session id (e.g. the local
+    calendar day), matching pandas_ta's default ``anchor="D"``.
+    """
+    volume = _as_float(volume)
+    n = len(volume)
+    if n < 2:
+        return _nan_out(n, out)
+    if out is None:
+        out = np.empty(n)
+    typical = (_as_float(high) + _as_float(low) + _as_float(close)) / 3.0
+    weighted = typical * volume
+    cum_volume = np.empty(n)
+    starts = np.flatnonzero(np.concatenate(([True], session[1:] != session[:-1])))
+    bounds = np.append(starts, n).tolist()
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        np.cumsum(weighted[start:end], out=out[start:end])
+        np.cumsum(volume[start:end], out=cum_volume[start:end])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out /= cum_volume
+    return out
+
+
+def session_days(index: pd.Index) -> np.ndarray | None:
+    """Local calendar-day number for each bar.
+
+    None unless the index is an ascending DatetimeIndex, which is what
+    pandas_ta requires before it will compute a VWAP.
+    """
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2 or not index[0] < index[-1]:
+        return None
+    wall = index.tz_localize(None) if index.tz is not None else index
+    return wall.as_unit("ns").asi8 // 86_400_000_000_000
@@ -0,0 +1,115 @@
+"""
+Monte Carlo resampling of a backtest's trade returns.
+
+One backtest gives one trade order and so one Sharpe and one drawdown. Here
+the per-trade returns are resampled into thousands of alternative sequences
+— bootstrapped with replacement, or permuted — and the distribution of
+terminal equity, max drawdown and Sharpe across them is reported, along with
+the probability of ruin. Permuting keeps the trade set, so terminal equity
+and Sharpe are fixed and only the path-dependent numbers (drawdown, ruin)
+spread; bootstrapping varies all of them. Paths are generated as 2-D
+``(path, trade)`` arrays in fixed-size batches, so memory stays bounded
+without per-path loops.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Literal
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+MONTE_CARLO_MAX_PATHS = int(os.getenv("MONTE_CARLO_MAX_PATHS", "100000"))
+# Cells (paths x trades) generated per batch; bounds peak memory.
+MONTE_CARLO_BATCH_CELLS = int(os.getenv("MONTE_CARLO_BATCH_CELLS", "4000000"))
+
+
+class MonteCarloOptions(BaseModel):
+    # Validated on the request model, so bad options are a 422 before the backtest runs.
+    paths: int = Field(10_000, ge=1, le=MONTE_CARLO_MAX_PATHS)
+    method: Literal["bootstrap", "permute"] = "bootstrap"
+    seed: int | None = None
+    # A path is ruined once equity falls this far below its starting value.
+    ruin_drawdown_pct: float = Field(50.0, gt=0, le=100)
+    confidence: float = Field(0.95, gt=0, lt=1)
+
+
+def _percentiles(values: np.ndarray, qs: tuple[int, ...], scale: float = 1.0) -> dict[str, float]:
+    points = np.percentile(values, qs)
+    return {f"p{q}": round(float(v) * scale, 2) for q, v in zip(qs, points)}
+
+
+def simulate(
+    returns: np.ndarray,
+    initial_capital: float,
+    options: MonteCarloOptions,
+) -> dict[str, Any] | None:
+    """Resample ``returns`` (fractions of pre-trade equity) into equity paths.
+
+    Returns None when there are fewer than two trades to resample.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n = len(returns)
+    if n < 2:
+        return None
+    paths = options.paths
+    ruin_level = 1.0 - options.ruin_drawdown_pct / 100.0
+
+    rng = np.random.default_rng(options.seed)
+    terminal = np.empty(paths)
+    max_dd = np.empty(paths)
+    sharpe = np.empty(paths)
+    ruined = np.empty(paths, dtype=bool)
+    batch = max(1, MONTE_CARLO_BATCH_CELLS // n)
+    growth = 1.0 + returns
+    for start in range(0, paths, batch):
+        stop = min(start + batch, paths)
+        rows = stop - start
+        if options.method == "bootstrap":
+            sample = growth[rng.integers(0, n, size=(rows, n))]
+        else:
+            sample = rng.permuted(np.broadcast_to(growth, (rows, n)), axis=1)
+
+        # Sharpe uses the same per-trade convention as _compute_analytics.
+        rets = sample - 1.0
+        std = rets.std(axis=1, ddof=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sharpe[start:stop] = np.where(std > 0, rets.mean(axis=1) / std * (252 ** 0.5), np.nan)
+
+        equity = np.cumprod(sample, axis=1, out=sample)
+        peak = np.maximum.accumulate(equity, axis=1)
+        np.maximum(peak, 1.0, out=peak)  # the starting equity is the first peak
+        terminal[start:stop] = equity[:, -1]
+        max_dd[start:stop] = ((peak - equity) / peak).max(axis=1)
+        ruined[start:stop] = equity.min(axis=1) <= ruin_level
+
+    tail = (1.0 - options.confidence) / 2.0 * 100
+    finite_sharpe = sharpe[np.isfinite(sharpe)]
+    sharpe_stats: dict[str, Any] = {"confidence": options.confidence}
+    if len(finite_sharpe):
+        lower, median, upper = np.percentile(finite_sharpe, [tail, 50, 100 - tail])
+        sharpe_stats.update({
+            "mean": round(float(finite_sharpe.mean()), 2),
+            "median": round(float(median), 2),
+            "lower": round(float(lower), 2),
+            "upper": round(float(upper), 2),
+        })
+
+    return {
+        "method": options.method,
+        "paths": paths,
+        "trades": n,
+        "seed": options.seed,
+        "terminalEquity": {
+            "mean": round(float(terminal.mean()) * initial_capital, 2),
+            **_percentiles(terminal, (1, 5, 25, 50, 75, 95, 99), initial_capital),
+        },
+        "maxDrawdownPct": {
+            "mean": round(float(max_dd.mean()) * 100, 2),
+            **_percentiles(max_dd, (50, 75, 95, 99), 100.0),
+        },
+        "sharpeRatio": sharpe_stats,
+        "probabilityOfLoss": round(float((terminal < 1.0).mean()), 4),
+        "probabilityOfRuin": round(float(ruined.mean()), 4),
+        "ruinDrawdownPct": options.ruin_drawdown_pct,
+    }
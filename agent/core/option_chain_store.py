@@ -0,0 +1,297 @@
+"""
+Local store of historical option chains for backtest replay.
+
+Each (underlying, session date) is kept as one NumPy structured array of the
+contracts listed that day: expiration, strike, the day's option bar and the
+NBBO at a snapshot time. Rows are sorted by (type, expiration, strike), so a
+backtest can pick legs for any signal bar with binary searches in memory
+instead of asking the live snapshot endpoint, which only knows about today.
+
+Days missing from disk are fetched once from the reference-contracts,
+aggregates and quotes endpoints, before the bar loop starts, and persisted.
+Only finished sessions are written; today's chain is kept in memory only.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from core.polygon_agent import PolygonDataFetcher, _resolve_local_path
+
+CHAIN_DTYPE = np.dtype([
+    ("put", "u1"),       # 1 = put, 0 = call
+    ("exp", "<i4"),      # expiration, days since 1970-01-01
+    ("strike", "<f8"),
+    ("ticker", "<U32"),
+    ("o", "<f8"),        # day bar; NaN when the contract did not trade
+    ("h", "<f8"),
+    ("l", "<f8"),
+    ("c", "<f8"),
+    ("v", "<f8"),
+    ("vw", "<f8"),
+    ("bid", "<f8"),      # NBBO at the snapshot time; NaN when unavailable
+    ("ask", "<f8"),
+])
+
+# Stored days live under this version; bump it when what a stored day holds
+# changes. (v1 days missed contracts still listed on the session.)
+OPTION_CHAIN_STORE_VERSION = 2
+
+OPTION_CHAIN_STORE_ENABLED = os.getenv("OPTION_CHAIN_STORE_ENABLED", "true").lower() == "true"
+OPTION_CHAIN_FETCH_MISSING = os.getenv("OPTION_CHAIN_FETCH_MISSING", "true").lower() == "true"
+OPTION_CHAIN_FETCH_QUOTES = os.getenv("OPTION_CHAIN_FETCH_QUOTES", "true").lower() == "true"
+OPTION_CHAIN_FETCH_CONCURRENCY = max(1, int(os.getenv("OPTION_CHAIN_FETCH_CONCURRENCY", "8")))
+# Strikes fetched on the out-of-the-money side of spot, as a fraction of spot.
+OPTION_CHAIN_STRIKE_WINDOW_PCT = float(os.getenv("OPTION_CHAIN_STRIKE_WINDOW_PCT", "0.05"))
+
+_MARKET_TZ = ZoneInfo("America/New_York")
+_EPOCH = date(1970, 1, 1)
+# Composite (type, expiration) key; expirations are well below this many days.
+_KEY_STRIDE = 1_000_000
+
+
+def _day_number(day: date) -> int:
+    return (day - _EPOCH).days
+
+
+def _from_day_number(value: int) -> date:
+    return _EPOCH + timedelta(days=int(value))
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value[:10], "%Y-%m-%d").date()
+
+
+@dataclass(frozen=True)
+class ChainWindow:
+    """The slice of a day's chain one fetch covered."""
+
+    contract_type: str  # "call" | "put"
+    max_dte: int
+    strike_lo: float
+    strike_hi: float
+    snapshot: str  # "HH:MM" ET the quotes were taken at
+
+    def covers(self, other: "ChainWindow") -> bool:
+        return (
+            self.contract_type == other.contract_type
+            and self.snapshot == other.snapshot
+            and self.max_dte >= other.max_dte
+            and self.strike_lo <= other.strike_lo
+            and self.strike_hi >= other.strike_hi
+        )
+
+
+class HistoricalChain:
+    """One session's option chain, indexed for leg lookups."""
+
+    def __init__(self, underlying: str, session: date, rows: np.ndarray) -> None:
+        order = np.lexsort((rows["strike"], rows["exp"], rows["put"]))
+        self.underlying = underlying
+        self.session = session
+        self.rows = rows[order]
+        self._key = self.rows["put"].astype(np.int64) * _KEY_STRIDE + self.rows["exp"]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def expirations(self, contract_type: str) -> list[date]:
+        put = 1 if contract_type.lower() == "put" else 0
+        exps = np.unique(self.rows["exp"][self.rows["put"] == put])
+        return [_from_day_number(e) for e in exps.tolist()]
+
+    def contracts(self, contract_type: str, expiration: date) -> np.ndarray:
+        """Rows for one expiration and type, sorted by strike."""
+        put = 1 if contract_type.lower() == "put" else 0
+        key = put * _KEY_STRIDE + _day_number(expiration)
+        lo, hi = np.searchsorted(self._key, [key, key + 1])
+        return self.rows[lo:hi]
+
+    @staticmethod
+    def mid(rows: np.ndarray) -> np.ndarray:
+        """Quote midpoint where the NBBO is usable, else the day's VWAP, else its close."""
+        bid, ask = rows["bid"], rows["ask"]
+        quoted = (bid > 0) & (ask > 0) & (ask >= bid)
+        fallback = np.where(rows["vw"] > 0, rows["vw"], rows["c"])
+        with np.errstate(invalid="ignore"):
+            return np.where(quoted, (bid + ask) / 2.0, fallback)
+
+
+class OptionChainStore:
+    """Per-day option chains on disk.
+
+    Layout: ``<root>/<UNDERLYING>/<YYYY-MM-DD>.npy`` plus a ``.json`` sidecar
+    listing the windows fetched for that day. Files are replaced atomically.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def _paths(self, underlying: str, session: date) -> tuple[Path, Path]:
+        safe = re.sub(r"[^A-Za-z0-9._-]", "_", underlying.upper())
+        base = self.root / f"v{OPTION_CHAIN_STORE_VERSION}" / safe / session.isoformat()
+        return base.with_suffix(".npy"), base.with_suffix(".json")
+
+    def load(self, underlying: str, session: date) -> tuple[np.ndarray, list[ChainWindow]]:
+        rows_path, meta_path = self._paths(underlying, session)
+        # The sidecar is written last, so a readable sidecar implies a complete array.
+        try:
+            meta = json.loads(meta_path.read_text())
+            windows = [ChainWindow(**w) for w in meta.get("windows", [])]
+            rows = np.load(rows_path, allow_pickle=False)
+        except (FileNotFoundError, ValueError, TypeError, OSError):
+            return np.empty(0, dtype=CHAIN_DTYPE), []
+        if rows.dtype != CHAIN_DTYPE:
+            return np.empty(0, dtype=CHAIN_DTYPE), []
+        return rows, windows
+
+    def save(self, underlying: str, session: date, rows: np.ndarray, windows: list[ChainWindow]) -> None:
+        rows_path, meta_path = self._paths(underlying, session)
+        rows_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_rows = tempfile.mkstemp(dir=rows_path.parent, suffix=".npy.tmp")
+        with os.fdopen(fd, "wb") as fh:
+            np.save(fh, np.ascontiguousarray(rows, dtype=CHAIN_DTYPE), allow_pickle=False)
+        os.replace(tmp_rows, rows_path)
+
+        payload = {"windows": [w.__dict__ for w in windows]}
+        fd, tmp_meta = tempfile.mkstemp(dir=rows_path.parent, suffix=".json.tmp")
+        with os.fdopen(fd, "w") as fh:
+            json.dump(payload, fh)
+        os.replace(tmp_meta, meta_path)
+
+    async def preload(
+        self,
+        fetcher: PolygonDataFetcher,
+        underlying: str,
+        needs: dict[date, list[ChainWindow]],
+        fetch_missing: bool = OPTION_CHAIN_FETCH_MISSING,
+    ) -> dict[date, HistoricalChain]:
+        """Load every requested session into memory, fetching uncovered windows.
+
+        Days whose chain can't be loaded or fetched are simply absent from the
+        result; callers fall back to their own estimate for those bars.
+        """
+        slots = asyncio.Semaphore(OPTION_CHAIN_FETCH_CONCURRENCY)
+        today = datetime.now(_MARKET_TZ).date()
+
+        async def load_day(session: date, wanted: list[ChainWindow]) -> tuple[date, HistoricalChain | None]:
+            rows, windows = self.load(underlying, session)
+            missing = [w for w in wanted if not any(have.covers(w) for have in windows)]
+            if missing and fetch_missing:
+                fresh: list[np.ndarray] = []
+                for window in missing:
+                    try:
+                        fresh.append(await _fetch_window(fetcher, underlying, session, window, slots))
+                    except Exception:
+                        continue
+                    windows.append(window)
+                if fresh:
+                    rows = _dedupe(np.concatenate([*fresh, rows]))
+                    if session < today:
+                        try:
+                            await asyncio.to_thread(self.save, underlying, session, rows, windows)
+                        except OSError:
+                            pass  # a read-only or full disk only costs us the store
+            if not len(rows):
+                return session, None
+            return session, HistoricalChain(underlying.upper(), session, rows)
+
+        loaded = await asyncio.gather(*(load_day(d, w) for d, w in sorted(needs.items())))
+        return {session: chain for session, chain in loaded if chain is not None}
+
+
+def _dedupe(rows: np.ndarray) -> np.ndarray:
+    # np.unique keeps the first occurrence, so callers put the freshest rows first.
+    _, idx = np.unique(rows["ticker"], return_index=True)
+    return rows[idx]
+
+
+def _snapshot_ns(session: date, hhmm: str) -> int:
+    hour, minute = (int(part) for part in hhmm.split(":", 1))
+    moment = datetime(session.year, session.month, session.day, hour, minute, tzinfo=_MARKET_TZ)
+    return int(moment.timestamp()) * 1_000_000_000
+
+
+async def _fetch_window(
+    fetcher: PolygonDataFetcher,
+    underlying: str,
+    session: date,
+    window: ChainWindow,
+    slots: asyncio.Semaphore,
+) -> np.ndarray:
+    """Fetch the contracts, day bars and snapshot quotes for one chain window."""
+    async with slots:
+        contracts = await fetcher.get_option_contracts(
+            underlying,
+            as_of=session.isoformat(),
+            expiration_gte=session.isoformat(),
+            expiration_lte=(session + timedelta(days=window.max_dte)).isoformat(),
+            contract_type=window.contract_type,
+            strike_gte=window.strike_lo,
+            strike_lte=window.strike_hi,
+        )
+    contracts = [c for c in contracts if c.get("ticker") and c.get("expiration_date")]
+    rows = np.zeros(len(contracts), dtype=CHAIN_DTYPE)
+    if not contracts:
+        return rows
+    for key in ("o", "h", "l", "c", "v", "vw", "bid", "ask"):
+        rows[key] = np.nan
+
+    day = session.isoformat()
+    session_start_ns = _snapshot_ns(session, "00:00")
+    snapshot_ns = _snapshot_ns(session, window.snapshot)
+
+    async def fill(i: int, contract: dict[str, Any]) -> None:
+        ticker = contract["ticker"]
+        row = rows[i]
+        row["put"] = 1 if str(contract.get("contract_type", "")).lower() == "put" else 0
+        row["exp"] = _day_number(_parse_date(contract["expiration_date"]))
+        row["strike"] = float(contract.get("strike_price") or 0.0)
+        row["ticker"] = ticker
+        async with slots:
+            try:
+                bars = (await fetcher.get_intraday_aggregates(ticker, 1, "day", day, day, 1)).get("results") or []
+            except Exception:
+                bars = []
+        if bars:
+            for key in ("o", "h", "l", "c", "v", "vw"):
+                value = bars[0].get(key)
+                if value is not None:
+                    row[key] = float(value)
+        if not OPTION_CHAIN_FETCH_QUOTES:
+            return
+        async with slots:
+            try:
+                quotes = (await fetcher.get_option_quotes(ticker, limit=1, timestamp_lte=snapshot_ns)).get("results") or []
+            except Exception:
+                quotes = []
+        # A quote from an earlier session is stale, not the NBBO at the snapshot.
+        if quotes and int(quotes[0].get("sip_timestamp") or 0) >= session_start_ns:
+            row["bid"] = float(quotes[0].get("bid_price") or np.nan)
+            row["ask"] = float(quotes[0].get("ask_price") or np.nan)
+
+    await asyncio.gather(*(fill(i, c) for i, c in enumerate(contracts)))
+    return rows
+
+
+_option_chain_store: OptionChainStore | None = None
+
+
+def get_option_chain_store() -> OptionChainStore | None:
+    """Process-wide store rooted at OPTION_CHAIN_DIR, or None when disabled."""
+    global _option_chain_store
+    if not OPTION_CHAIN_STORE_ENABLED:
+        return None
+    if _option_chain_store is None:
+        _option_chain_store = OptionChainStore(_resolve_local_path("OPTION_CHAIN_DIR", ".cache/option_chains"))
+    return _option_chain_store
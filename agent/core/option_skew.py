@@ -0,0 +1,98 @@
+"""
+Volatility skew across an option chain.
+
+Each contract's implied volatility is compared with two references from its
+own expiration:
+
+* the at-the-money IV, linearly interpolated in strike between the two listed
+  strikes that bracket spot (calls and puts at one strike are averaged);
+* the mean IV of its moneyness bucket (log-moneyness bins of
+  ``bucket_width``).
+
+Everything is vectorized over the whole chain: rows are grouped by one sort
+on (expiration, strike) and reduced with ``reduceat``/``bincount`` rather
+than looped per expiration.
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+SKEW_FIELDS = ("atm_iv", "skew", "moneyness", "bucket_iv", "bucket_skew")
+
+
+def _atm_iv(group: np.ndarray, strike: np.ndarray, iv: np.ndarray, n_groups: int, spot: float) -> np.ndarray:
+    """ATM IV per expiration group; NaN where no strikes bracket spot."""
+    atm = np.full(n_groups, np.nan)
+    if not len(iv):
+        return atm
+    order = np.lexsort((strike, group))
+    g, k, v = group[order], strike[order], iv[order]
+    # One level per (expiration, strike): mean IV over the contracts listed there.
+    starts = np.flatnonzero(np.r_[True, (g[1:] != g[:-1]) | (k[1:] != k[:-1])])
+    lvl_g, lvl_k = g[starts], k[starts]
+    lvl_iv = np.add.reduceat(v, starts) / np.diff(np.r_[starts, len(v)])
+
+    # Levels are sorted by (group, strike), so group * span + strike is monotone
+    # and one searchsorted finds the first strike >= spot in every group.
+    span = float(lvl_k.max()) + spot + 1.0
+    key = lvl_g * span + lvl_k
+    groups = np.arange(n_groups)
+    hi = np.searchsorted(key, groups * span + spot, side="left")
+    lo = hi - 1
+    hi_c = np.minimum(hi, len(key) - 1)
+    lo_c = np.maximum(lo, 0)
+    has_hi = (hi < len(key)) & (lvl_g[hi_c] == groups)
+    has_lo = (lo >= 0) & (lvl_g[lo_c] == groups)
+
+    exact = has_hi & (lvl_k[hi_c] == spot)
+    bracket = has_hi & has_lo & ~exact
+    with np.errstate(invalid="ignore", divide="ignore"):
+        w = (spot - lvl_k[lo_c]) / (lvl_k[hi_c] - lvl_k[lo_c])
+        atm[bracket] = (lvl_iv[lo_c] + w * (lvl_iv[hi_c] - lvl_iv[lo_c]))[bracket]
+    atm[exact] = lvl_iv[hi_c][exact]
+    return atm
+
+
+def chain_skew(
+    expiration: Sequence[str] | np.ndarray,
+    strike: np.ndarray,
+    iv: np.ndarray,
+    spot: float,
+    bucket_width: float = 0.025,
+) -> dict[str, np.ndarray]:
+    """Per-contract skew columns aligned with the inputs.
+
+    ``atm_iv``/``skew`` (IV minus ATM IV), ``moneyness`` (ln K/S) and
+    ``bucket_iv``/``bucket_skew`` (IV minus its bucket's mean). Contracts
+    without a usable IV, and expirations whose strikes don't bracket spot,
+    get NaN.
+    """
+    strike = np.asarray(strike, dtype=np.float64)
+    iv = np.asarray(iv, dtype=np.float64)
+    n = len(strike)
+    out = {field: np.full(n, np.nan) for field in SKEW_FIELDS}
+    if not n or not np.isfinite(spot) or spot <= 0:
+        return out
+
+    _, group = np.unique(np.asarray(expiration, dtype=object).astype(str), return_inverse=True)
+    n_groups = int(group.max()) + 1
+    valid = np.isfinite(iv) & (iv > 0) & np.isfinite(strike) & (strike > 0)
+    rows = np.flatnonzero(valid)
+
+    atm = _atm_iv(group[rows], strike[rows], iv[rows], n_groups, spot)[group]
+    out["atm_iv"] = np.where(valid, atm, np.nan)
+    out["skew"] = np.where(valid, iv - atm, np.nan)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        moneyness = np.log(strike / spot)
+    out["moneyness"] = np.where(np.isfinite(moneyness), moneyness, np.nan)
+    if len(rows):
+        bucket = np.floor(moneyness[rows] / bucket_width).astype(np.int64)
+        bucket -= bucket.min()
+        _, cell = np.unique(group[rows] * (int(bucket.max()) + 1) + bucket, return_inverse=True)
+        bucket_iv = np.bincount(cell, weights=iv[rows]) / np.bincount(cell)
+        out["bucket_iv"][rows] = bucket_iv[cell]
+        out["bucket_skew"][rows] = iv[rows] - bucket_iv[cell]
+    return out
@@ -0,0 +1,287 @@
+"""
+In-process cache of normalized option-chain snapshots.
+
+Polygon's chain snapshot is refetched by the ranking tool, the options
+backtests and the agent tools, often for the same underlying seconds apart.
+``OptionSnapshotCache`` keeps one ``OptionChainSnapshot`` per
+(underlying, expiration, contract type, fetch parameters) with:
+
+* a TTL, after which an entry is stale;
+* stale-while-revalidate: for ``stale_s`` past the TTL the stale entry is
+  served immediately while a background refresh runs;
+* single-flight: concurrent misses and refreshes of one key share a fetch.
+
+Snapshots are columnar (one NumPy array per numeric field). A refresh whose
+contract set is unchanged merges only the rows whose quotes or greeks moved
+into the cached arrays and re-normalizes just those records; new or expired
+contracts rebuild the snapshot.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+import numpy as np
+
+OPTION_SNAPSHOT_CACHE_ENABLED = os.getenv("OPTION_SNAPSHOT_CACHE_ENABLED", "true").lower() == "true"
+OPTION_SNAPSHOT_TTL_S = float(os.getenv("OPTION_SNAPSHOT_TTL_S", "15"))
+# How long past the TTL a stale snapshot may still be served while it refreshes.
+OPTION_SNAPSHOT_STALE_S = float(os.getenv("OPTION_SNAPSHOT_STALE_S", "60"))
+OPTION_SNAPSHOT_CACHE_MAX_ENTRIES = int(os.getenv("OPTION_SNAPSHOT_CACHE_MAX_ENTRIES", "256"))
+OPTION_SNAPSHOT_DELTA_REFRESH = os.getenv("OPTION_SNAPSHOT_DELTA_REFRESH", "true").lower() == "true"
+
+TEXT_FIELDS = ("contract", "expiration", "contract_type", "exercise_style")
+# Fields a refresh can change for an existing contract.
+QUOTE_FIELDS = (
+    "change_percent", "open_interest", "implied_volatility", "volume",
+    "bid", "ask", "mid", "delta", "gamma", "theta", "vega", "rho", "underlying_price",
+)
+NUMERIC_FIELDS = ("strike",) + QUOTE_FIELDS
+# Output key order of a normalized record (``underlying_price`` stays columnar).
+RECORD_FIELDS = (
+    "contract", "expiration", "strike", "contract_type", "exercise_style", "change_percent",
+    "open_interest", "implied_volatility", "volume", "bid", "ask", "mid",
+    "delta", "gamma", "theta", "vega", "rho",
+)
+_INT_FIELDS = {"open_interest", "volume"}
+
+
+# ── Columnar snapshot ────────────────────────────────────────────────────────
+
+def _number(value: Any) -> float:
+    if value is None or isinstance(value, bool):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _midpoints(bid: np.ndarray, ask: np.ndarray) -> np.ndarray:
+    """Vectorized ``_midpoint``: NaN unless both sides are positive and uncrossed."""
+    with np.errstate(invalid="ignore"):
+        ok = (bid > 0) & (ask > 0) & (ask >= bid)
+    return np.where(ok, np.round((bid + ask) / 2.0, 4), np.nan)
+
+
+class OptionChainSnapshot:
+    """Normalized chain contracts held as columns, sorted by contract ticker."""
+
+    def __init__(self, text: dict[str, list[Any]], numeric: dict[str, np.ndarray]) -> None:
+        contracts = text["contract"]
+        order = sorted(range(len(contracts)), key=lambda i: contracts[i] or "")
+        # Overlapping pages can repeat a contract; keep its last occurrence.
+        # Rows without a ticker can't be matched, so all of them are kept.
+        order = [
+            i for k, i in enumerate(order)
+            if contracts[i] is None or k + 1 == len(order) or contracts[order[k + 1]] != contracts[i]
+        ]
+        self.text = {f: [text[f][i] for i in order] for f in TEXT_FIELDS}
+        self.numeric = {f: numeric[f][order] for f in NUMERIC_FIELDS}
+        self._index = {c: i for i, c in enumerate(self.text["contract"]) if c is not None}
+        self._records: list[dict[str, Any]] | None = None
+
+    @classmethod
+    def from_results(cls, results: list[dict[str, Any]]) -> "OptionChainSnapshot":
+        """Build from raw ``/v3/snapshot/options`` result objects."""
+        text: dict[str, list[Any]] = {f: [] for f in TEXT_FIELDS}
+        raw: list[tuple[float, ...]] = []
+        for option in results:
+            details = option.get("details") or {}
+            greeks = option.get("greeks") or {}
+            last_quote = option.get("last_quote") or {}
+            day = option.get("day") or {}
+            underlying = option.get("underlying_asset") or {}
+            text["contract"].append(details.get("ticker"))
+            text["expiration"].append(details.get("expiration_date"))
+            text["contract_type"].append(details.get("contract_type"))
+            text["exercise_style"].append(details.get("exercise_style"))
+            raw.append((
+                _number(details.get("strike_price")),
+                _number(day.get("change_percent")),
+                _number(option.get("open_interest")),
+                _number(option.get("implied_volatility")),
+                _number(day.get("volume")),
+                _number(last_quote.get("bid")),
+                _number(last_quote.get("ask")),
+                _number(greeks.get("delta")),
+                _number(greeks.get("gamma")),
+                _number(greeks.get("theta")),
+                _number(greeks.get("vega")),
+                _number(greeks.get("rho")),
+                _number(underlying.get("price")),
+            ))
+        parsed = ("strike", "change_percent", "open_interest", "implied_volatility", "volume",
+                  "bid", "ask", "delta", "gamma", "theta", "vega", "rho", "underlying_price")
+        table = np.array(raw, dtype=np.float64).reshape(len(raw), len(parsed))
+        numeric = {f: table[:, k].copy() for k, f in enumerate(parsed)}
+        numeric["mid"] = _midpoints(numeric["bid"], numeric["ask"])
+        return cls(text, numeric)
+
+    @classmethod
+    def concat(cls, parts: list["OptionChainSnapshot"]) -> "OptionChainSnapshot":
+        """One snapshot from several pages (duplicate contracts collapse)."""
+        text = {f: [v for part in parts for v in part.text[f]] for f in TEXT_FIELDS}
+        numeric = {
+            f: np.concatenate([part.numeric[f] for part in parts]) if parts else np.empty(0)
+            for f in NUMERIC_FIELDS
+        }
+        return cls(text, numeric)
+
+    def __len__(self) -> int:
+        return len(self.text["contract"])
+
+    def _record(self, i: int) -> dict[str, Any]:
+        record: dict[str, Any] = {}
+        for field in RECORD_FIELDS:
+            if field in self.numeric:
+                value = float(self.numeric[field][i])
+                if value != value:
+                    record[field] = None
+                elif field in _INT_FIELDS and value.is_integer():
+                    record[field] = int(value)
+                else:
+                    record[field] = value
+            else:
+                record[field] = self.text[field][i]
+        return record
+
+    def records(self) -> list[dict[str, Any]]:
+        """Normalized dicts, sorted by contract. Shared with the cache: treat as read-only."""
+        if self._records is None:
+            self._records = [self._record(i) for i in range(len(self))]
+        return list(self._records)
+
+    def merge(self, fresh: "OptionChainSnapshot") -> int:
+        """Fold a newer snapshot of the same chain in; returns the number of rows changed.
+
+        Only rows whose quote or greek fields moved are written (and
+        re-normalized). A changed contract set, or rows without a ticker,
+        replace everything.
+        """
+        rows = np.fromiter(
+            (self._index.get(c, -1) if c is not None else -1 for c in fresh.text["contract"]),
+            dtype=np.int64, count=len(fresh),
+        )
+        if len(fresh) != len(self) or (rows < 0).any():
+            self.text, self.numeric, self._index = fresh.text, fresh.numeric, fresh._index
+            self._records = fresh._records
+            return len(fresh)
+
+        changed = np.zeros(len(fresh), dtype=bool)
+        for field in QUOTE_FIELDS:
+            old, new = self.numeric[field][rows], fresh.numeric[field]
+            changed |= ~((old == new) | (np.isnan(old) & np.isnan(new)))
+        targets = rows[changed]
+        for field in QUOTE_FIELDS:
+            self.numeric[field][targets] = fresh.numeric[field][changed]
+        if self._records is not None:
+            for i in targets.tolist():
+                self._records[i] = self._record(i)
+        return len(targets)
+
+
+# ── Cache ────────────────────────────────────────────────────────────────────
+
+class _Entry:
+    __slots__ = ("snapshot", "meta", "fetched_at")
+
+    def __init__(self, snapshot: OptionChainSnapshot, meta: dict[str, Any]) -> None:
+        self.snapshot = snapshot
+        self.meta = meta
+        self.fetched_at = time.monotonic()
+
+
+SnapshotLoader = Callable[[], Awaitable[tuple[OptionChainSnapshot, dict[str, Any]]]]
+
+
+class OptionSnapshotCache:
+    """TTL + stale-while-revalidate + single-flight cache of chain snapshots."""
+
+    def __init__(
+        self,
+        ttl_s: float = OPTION_SNAPSHOT_TTL_S,
+        stale_s: float = OPTION_SNAPSHOT_STALE_S,
+        max_entries: int = OPTION_SNAPSHOT_CACHE_MAX_ENTRIES,
+        delta_refresh: bool = OPTION_SNAPSHOT_DELTA_REFRESH,
+    ) -> None:
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self.max_entries = max(1, max_entries)
+        self.delta_refresh = delta_refresh
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    async def get(
+        self, key: Hashable, load: SnapshotLoader, force: bool = False,
+    ) -> tuple[OptionChainSnapshot, dict[str, Any], dict[str, Any]]:
+        """Snapshot, its fetch metadata and cache info (status hit/stale/miss, age).
+
+        ``force`` skips the TTL and waits for a fresh fetch.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and not force:
+            age = time.monotonic() - entry.fetched_at
+            if age <= self.ttl_s + self.stale_s:
+                self._entries.move_to_end(key)
+                status = "hit" if age <= self.ttl_s else "stale"
+                if status == "stale":
+                    self._refresh(key, load)
+                return entry.snapshot, entry.meta, {"status": status, "age_s": round(age, 3)}
+        entry = await asyncio.shield(self._refresh(key, load))
+        return entry.snapshot, entry.meta, {"status": "miss", "age_s": 0.0}
+
+    def peek(self, key: Hashable) -> tuple[OptionChainSnapshot, dict[str, Any], dict[str, Any]] | None:
+        """Like ``get``, but only for an entry still within its TTL; never fetches."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry.fetched_at
+        if age > self.ttl_s:
+            return None
+        self._entries.move_to_end(key)
+        return entry.snapshot, entry.meta, {"status": "hit", "age_s": round(age, 3)}
+
+    def put(self, key: Hashable, snapshot: OptionChainSnapshot, meta: dict[str, Any]) -> None:
+        """Store a snapshot fetched outside ``get`` (e.g. assembled from streamed pages)."""
+        self._store(key, snapshot, meta)
+
+    def _refresh(self, key: Hashable, load: SnapshotLoader) -> asyncio.Task:
+        task = self._inflight.get(key)
+        # A task from a finished event loop can't be awaited here.
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            return task
+        task = asyncio.get_running_loop().create_task(self._load(key, load))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._settle(key, t))
+        return task
+
+    def _settle(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # background refresh failures keep the stale entry
+
+    async def _load(self, key: Hashable, load: SnapshotLoader) -> _Entry:
+        snapshot, meta = await load()
+        return self._store(key, snapshot, meta)
+
+    def _store(self, key: Hashable, snapshot: OptionChainSnapshot, meta: dict[str, Any]) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is not None and self.delta_refresh:
+            entry.snapshot.merge(snapshot)
+            entry.meta = meta
+            entry.fetched_at = time.monotonic()
+        else:
+            entry = _Entry(snapshot, meta)
+            self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
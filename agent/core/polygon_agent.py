@@ -2,17 +2,20 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import re
 import sys
 import uuid
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from textwrap import dedent
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
 
 import httpx
+import numpy as np
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from pydantic import BaseModel
@@ -32,7 +35,14 @@ from agents import (
 from agents.exceptions import InputGuardrailTripwireTriggered
 from agents.models.openai_responses import OpenAIResponsesModel
 from agents.mcp import MCPServerStdio
-from core.algo import MarketLeaderboard
+from core.algo import MultiMetricLeaderboard
+from core.http_client import get_http_client
+from core.option_snapshot_cache import (
+    OPTION_SNAPSHOT_CACHE_ENABLED,
+    OptionChainSnapshot,
+    OptionSnapshotCache,
+)
+from core.option_skew import chain_skew
 
 load_dotenv()
 
@@ -41,6 +51,13 @@ CAPITOL_TRADES_URL = "https://www.capitoltrades.com/trades"
 CAPITOL_TRADES_BFF_URL = "https://bff.capitoltrades.com"
 QUANDL_BASE_URL = "https://data.nasdaq.com/api/v3"
 DEFAULT_TRACE_LABEL = "Polygon.io Demo"
+# Full-chain snapshot scans: concurrent page requests, and how far out (days) the
+# expiration windows reach; later expirations are fetched in one open-ended window.
+OPTION_SNAPSHOT_PAGE_CONCURRENCY = max(1, int(os.getenv("OPTION_SNAPSHOT_PAGE_CONCURRENCY", "8")))
+OPTION_SNAPSHOT_WINDOW_HORIZON_DAYS = int(os.getenv("OPTION_SNAPSHOT_WINDOW_HORIZON_DAYS", "1100"))
+# Initial expiration windows (days out) for full-chain scans; near-dated
+# expirations are densest, so the windows widen with distance.
+_CHAIN_WINDOW_EDGES_DAYS = (0, 1, 2, 3, 5, 8, 15, 22, 31, 46, 61, 91, 121, 181, 271, 366, 546, 731)
 # Disable history replay by default until the OpenAI Responses API exposes a safe way
 # to trim reasoning/function_call pairs without corrupting the transcript.
 DEFAULT_SESSION_HISTORY_LIMIT = 0
@@ -570,6 +587,22 @@ def _midpoint(bid: Optional[float], ask: Optional[float]) -> Optional[float]:
     return round((bid + ask) / 2.0, 4)
 
 
+def _full_chain_key(ticker: str, expiration_date: str | None, contract_type: str | None) -> tuple:
+    """Snapshot-cache key of a full-chain scan."""
+    normalized = (contract_type or "").lower()
+    return (ticker.upper(), expiration_date, normalized if normalized in {"call", "put"} else None, "full")
+
+
+def _full_chain_meta(snapshot: OptionChainSnapshot, pages: int) -> Dict[str, Any]:
+    return {
+        "query_count": len(snapshot),
+        "status": "OK",
+        "applied_sort": "ticker",
+        "fallback_used": False,
+        "pages": pages,
+    }
+
+
 class PolygonDataFetcher:
     """Helper for interacting with Polygon.io endpoints our account can access."""
 
@@ -577,6 +610,7 @@ class PolygonDataFetcher:
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        self._snapshot_cache = OptionSnapshotCache() if OPTION_SNAPSHOT_CACHE_ENABLED else None
 
     async def get(self, endpoint: str, params: Dict[str, Any] | None = None) -> Dict[str, Any]:
         params = dict(params or {})
@@ -586,10 +620,9 @@ class PolygonDataFetcher:
             "Authorization": f"Bearer {self.api_key}",
             "X-API-Key": self.api_key,
         }
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        response = await get_http_client().get(url, params=params, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
 
     async def get_options_snapshot(
         self,
@@ -599,7 +632,17 @@ class PolygonDataFetcher:
         limit: int = 25,
         sort: str | None = "ticker",
         order: str | None = "asc",
+        refresh: bool = False,
+        full_chain: bool = False,
     ) -> Dict[str, Any]:
+        """Normalized chain snapshot, sorted by contract and truncated to ``limit``.
+
+        By default this is one page (at most 250 contracts, chosen by
+        ``sort``/``order``). ``full_chain`` scans every page through
+        ``iter_options_chain`` instead; pass ``limit=0`` to keep them all.
+        Served from the snapshot cache when enabled; ``refresh`` bypasses the
+        TTL and waits for a fresh fetch.
+        """
         normalized_contract_type = (contract_type or "").lower()
         if normalized_contract_type not in {"call", "put"}:
             normalized_contract_type = None
@@ -662,68 +705,182 @@ class PolygonDataFetcher:
 
             return None
 
-        try:
-            payloads: List[Dict[str, Any]] = [await _fetch(base_params)]
-        except httpx.HTTPStatusError as exc:
-            if exc.response.status_code != 400:
-                raise
-            fallback_payloads = await _fallback_for_bad_request()
-            if not fallback_payloads:
-                raise
-            payloads = fallback_payloads
-
-        combined_results: List[Dict[str, Any]] = []
-        total_query_count = 0
-        status: Optional[str] = None
-
-        for payload in payloads:
-            status = status or payload.get("status")
-            query_count = payload.get("queryCount")
-            if isinstance(query_count, int):
-                total_query_count += query_count
-
-            for option in payload.get("results", []):
-                details = option.get("details") or {}
-                greeks = option.get("greeks") or {}
-                last_quote = option.get("last_quote") or {}
-                day = option.get("day") or {}
-
-                combined_results.append(
-                    {
-                        "contract": details.get("ticker"),
-                        "expiration": details.get("expiration_date"),
-                        "strike": details.get("strike_price"),
-                        "contract_type": details.get("contract_type"),
-                        "exercise_style": details.get("exercise_style"),
-                        "change_percent": day.get("change_percent"),
-                        "open_interest": option.get("open_interest"),
-                        "implied_volatility": option.get("implied_volatility"),
-                        "volume": day.get("volume"),
-                        "bid": last_quote.get("bid"),
-                        "ask": last_quote.get("ask"),
-                        "mid": _midpoint(last_quote.get("bid"), last_quote.get("ask")),
-                        "delta": greeks.get("delta"),
-                        "gamma": greeks.get("gamma"),
-                        "theta": greeks.get("theta"),
-                        "vega": greeks.get("vega"),
-                        "rho": greeks.get("rho"),
-                    }
-                )
+        async def _load_full_chain() -> tuple[OptionChainSnapshot, Dict[str, Any]]:
+            pages = [
+                page async for page in self.iter_options_chain(ticker, expiration_date, normalized_contract_type)
+            ]
+            snapshot = OptionChainSnapshot.concat(pages)
+            return snapshot, _full_chain_meta(snapshot, len(pages))
 
-        combined_results.sort(key=lambda item: (item.get("contract") or ""))
+        async def _load() -> tuple[OptionChainSnapshot, Dict[str, Any]]:
+            try:
+                payloads: List[Dict[str, Any]] = [await _fetch(base_params)]
+            except httpx.HTTPStatusError as exc:
+                if exc.response.status_code != 400:
+                    raise
+                fallback_payloads = await _fallback_for_bad_request()
+                if not fallback_payloads:
+                    raise
+                payloads = fallback_payloads
+
+            raw_results: List[Dict[str, Any]] = []
+            total_query_count = 0
+            status: Optional[str] = None
+            for payload in payloads:
+                status = status or payload.get("status")
+                query_count = payload.get("queryCount")
+                if isinstance(query_count, int):
+                    total_query_count += query_count
+                raw_results.extend(payload.get("results", []))
+
+            meta = {
+                "query_count": total_query_count or None,
+                "status": status,
+                "applied_sort": applied_sort,
+                "fallback_used": fallback_used,
+            }
+            return OptionChainSnapshot.from_results(raw_results), meta
+
+        loader = _load_full_chain if full_chain else _load
+        if self._snapshot_cache is None:
+            snapshot, meta = await loader()
+            cache_info: Dict[str, Any] = {"status": "disabled", "age_s": None}
+        else:
+            if full_chain:
+                key = _full_chain_key(ticker, expiration_date, normalized_contract_type)
+            else:
+                key = (ticker.upper(), expiration_date, normalized_contract_type,
+                       base_params["limit"], base_params.get("sort"), base_params.get("order"))
+            snapshot, meta, cache_info = await self._snapshot_cache.get(key, loader, force=refresh)
+
+        combined_results = snapshot.records()
         if limit > 0:
             combined_results = combined_results[: max(1, min(limit, len(combined_results)))]
 
         return {
             "underlying": ticker.upper(),
-            "query_count": total_query_count or None,
-            "status": status,
+            "query_count": meta["query_count"],
+            "status": meta["status"],
             "results_count": len(combined_results),
             "options": combined_results,
-            "applied_sort": applied_sort,
-            "fallback_used": fallback_used,
+            "applied_sort": meta["applied_sort"],
+            "fallback_used": meta["fallback_used"],
+            "pages": meta.get("pages", 1),
+            "cache": cache_info,
         }
 
+    async def iter_options_chain(
+        self,
+        ticker: str,
+        expiration_date: str | None = None,
+        contract_type: str | None = None,
+        concurrency: int = OPTION_SNAPSHOT_PAGE_CONCURRENCY,
+    ) -> AsyncIterator[OptionChainSnapshot]:
+        """Yield every contract in the chain, one columnar page at a time, as pages arrive.
+
+        The chain is split by contract type and expiration window and the
+        pieces are fetched concurrently (at most ``concurrency`` requests in
+        flight). The last window is open-ended, so no expiration is dropped.
+        Windows are requested sorted by expiration date, which holds across
+        option roots (SPX and SPXW, adjusted roots like AAPL1) where ticker
+        order does not. A window that overflows one page is re-split after its
+        last expiration, and only that expiration follows ``next_url``: it is
+        re-requested in full, skipping the contracts already yielded.
+        """
+        endpoint = f"/v3/snapshot/options/{ticker.upper()}"
+        contract_types = [contract_type.lower()] if (contract_type or "").lower() in {"call", "put"} else ["call", "put"]
+        windows: List[tuple[date, date | None]]
+        if expiration_date:
+            first = date.fromisoformat(expiration_date[:10])
+            windows = [(first, first)]
+        else:
+            today = date.today()
+            edges = [d for d in _CHAIN_WINDOW_EDGES_DAYS if d <= OPTION_SNAPSHOT_WINDOW_HORIZON_DAYS]
+            bounds = edges + [OPTION_SNAPSHOT_WINDOW_HORIZON_DAYS + 1]
+            windows = [
+                (today + timedelta(days=lo), today + timedelta(days=hi - 1))
+                for lo, hi in zip(bounds, bounds[1:]) if hi > lo
+            ]
+            windows.append((today + timedelta(days=bounds[-1]), None))
+
+        slots = asyncio.Semaphore(max(1, concurrency))
+        # Bounded, so a slow consumer holds back fetching instead of buffering the chain.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2 * max(1, concurrency))
+        tasks: set[asyncio.Task] = set()
+        done = object()
+        # Windows spawned but not finished; a window spawns its splits before
+        # it reports done, so this only reaches zero when the chain is complete.
+        outstanding = 0
+
+        def spawn(ctype: str, lo: date, hi: date | None, seen: frozenset[str] = frozenset()) -> None:
+            nonlocal outstanding
+            outstanding += 1
+            task = asyncio.create_task(fetch_window(ctype, lo, hi, seen))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        async def fetch_page(
+            params: Dict[str, Any], seen: frozenset[str],
+        ) -> tuple[List[Dict[str, Any]], str | None]:
+            async with slots:
+                payload = await self.get(endpoint, params)
+            results = payload.get("results") or []
+            fresh = [r for r in results if (r.get("details") or {}).get("ticker") not in seen] if seen else results
+            if fresh:
+                await queue.put(OptionChainSnapshot.from_results(fresh))
+            cursor = parse_qs(urlparse(payload.get("next_url") or "").query).get("cursor")
+            return results, cursor[0] if cursor else None
+
+        async def fetch_window(ctype: str, lo: date, hi: date | None, seen: frozenset[str]) -> None:
+            try:
+                params: Dict[str, Any] = {
+                    "contract_type": ctype,
+                    "expiration_date.gte": lo.isoformat(),
+                    "limit": 250,
+                    "sort": "expiration_date",
+                    "order": "asc",
+                }
+                if hi is not None:
+                    params["expiration_date.lte"] = hi.isoformat()
+                results, cursor = await fetch_page(params, seen)
+                if cursor and results:
+                    last = (results[-1].get("details") or {}).get("expiration_date")
+                    last_exp = date.fromisoformat(last)
+                    if lo <= last_exp and (hi is None or last_exp < hi):
+                        # All of the last expiration (minus what this page held),
+                        # then the later ones split in two.
+                        held = frozenset(
+                            (r.get("details") or {}).get("ticker") for r in results
+                            if (r.get("details") or {}).get("expiration_date") == last
+                        )
+                        spawn(ctype, last_exp, last_exp, held)
+                        mid = last_exp + (timedelta(days=365) if hi is None else (hi - last_exp) // 2)
+                        spawn(ctype, last_exp + timedelta(days=1), mid)
+                        if hi is None or mid < hi:
+                            spawn(ctype, mid + timedelta(days=1), hi)
+                        cursor = None
+                while cursor:
+                    _, cursor = await fetch_page({"cursor": cursor}, seen)
+                await queue.put(done)
+            except Exception as exc:
+                await queue.put(exc)
+
+        for ctype in contract_types:
+            for lo, hi in windows:
+                spawn(ctype, lo, hi)
+        try:
+            while outstanding:
+                item = await queue.get()
+                if item is done:
+                    outstanding -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            for task in list(tasks):
+                task.cancel()
+
     async def get_option_contract_snapshot(self, underlying: str, contract: str) -> Dict[str, Any]:
         payload = await self.get(f"/v3/snapshot/options/{underlying.upper()}/{contract}")
         result = payload.get("results") or {}
@@ -765,15 +922,76 @@ class PolygonDataFetcher:
             "greeks": greeks,
         }
 
-    async def get_option_quotes(self, option_ticker: str, limit: int = 500) -> Dict[str, Any]:
-        payload = await self.get(
-            f"/v3/quotes/{option_ticker}",
-            {
-                "limit": max(1, min(limit, 5000)),
-                "sort": "timestamp",
-                "order": "desc",
-            },
-        )
+    async def get_option_contracts(
+        self,
+        underlying: str,
+        as_of: str,
+        expiration_gte: str | None = None,
+        expiration_lte: str | None = None,
+        contract_type: str | None = None,
+        strike_gte: float | None = None,
+        strike_lte: float | None = None,
+        max_pages: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """Reference contracts listed for ``underlying`` on ``as_of``, expired or not.
+
+        Polygon's ``expired`` flag selects one side (``true`` returns only
+        expired contracts), so both are queried and merged by ticker.
+        ``max_pages`` applies to each query.
+        """
+        base: Dict[str, Any] = {
+            "underlying_ticker": underlying.upper(),
+            "as_of": as_of,
+            "limit": 1000,
+            "sort": "ticker",
+            "order": "asc",
+        }
+        if expiration_gte:
+            base["expiration_date.gte"] = expiration_gte
+        if expiration_lte:
+            base["expiration_date.lte"] = expiration_lte
+        if (contract_type or "").lower() in {"call", "put"}:
+            base["contract_type"] = contract_type.lower()
+        if strike_gte is not None:
+            base["strike_price.gte"] = strike_gte
+        if strike_lte is not None:
+            base["strike_price.lte"] = strike_lte
+
+        async def fetch(expired: str) -> List[Dict[str, Any]]:
+            params: Dict[str, Any] = {**base, "expired": expired}
+            results: List[Dict[str, Any]] = []
+            for _ in range(max(1, max_pages)):
+                payload = await self.get("/v3/reference/options/contracts", params)
+                results.extend(payload.get("results", []))
+                cursor = parse_qs(urlparse(payload.get("next_url") or "").query).get("cursor")
+                if not cursor:
+                    break
+                params = {"cursor": cursor[0]}
+            return results
+
+        expired, active = await asyncio.gather(fetch("true"), fetch("false"))
+        merged: Dict[str, Dict[str, Any]] = {}
+        for contract in expired + active:
+            merged.setdefault(contract.get("ticker") or "", contract)
+        untickered = [c for c in expired + active if not c.get("ticker")]
+        return [merged[t] for t in sorted(merged) if t] + untickered
+
+    async def get_option_quotes(
+        self,
+        option_ticker: str,
+        limit: int = 500,
+        timestamp_lte: int | None = None,
+    ) -> Dict[str, Any]:
+        params: Dict[str, Any] = {
+            "limit": max(1, min(limit, 5000)),
+            "sort": "timestamp",
+            "order": "desc",
+        }
+        if timestamp_lte is not None:
+            # Nanosecond epoch; with the descending sort the first row is the
+            # NBBO in force at that instant.
+            params["timestamp.lte"] = timestamp_lte
+        payload = await self.get(f"/v3/quotes/{option_ticker}", params)
         return {
             "contract": option_ticker,
             "status": payload.get("status"),
@@ -1057,10 +1275,14 @@ class FuturesDataFetcher:
             "encoding": "csv",
         }
         headers = {"Authorization": f"Bearer {self.databento_api_key}", "Accept": "text/csv"}
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(f"{self.databento_base_url}/v0/timeseries.get_range", params=params, headers=headers)
-            response.raise_for_status()
-            csv_payload = response.text.strip()
+        response = await get_http_client().get(
+            f"{self.databento_base_url}/v0/timeseries.get_range",
+            params=params,
+            headers=headers,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        csv_payload = response.text.strip()
         if not csv_payload:
             return []
 
@@ -1113,10 +1335,9 @@ class FuturesDataFetcher:
             "order": "asc",
         }
         headers = {"User-Agent": "Mozilla/5.0", "Accept": "application/json"}
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            payload = response.json()
+        response = await get_http_client().get(url, params=params, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        payload = response.json()
 
         dataset = payload.get("dataset", {})
         columns = dataset.get("column_names", [])
@@ -1368,10 +1589,9 @@ async def get_fred_series(
         params["observation_end"] = end_date
 
     url = "https://api.stlouisfed.org/fred/series/observations"
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
-        payload = response.json()
+    response = await get_http_client().get(url, params=params, timeout=20.0)
+    response.raise_for_status()
+    payload = response.json()
 
     observations = payload.get("observations", [])
     valid_values = [obs for obs in observations if obs.get("value") not in (None, "", ".")]
@@ -1431,10 +1651,9 @@ async def _fred_release_dates(
     }
 
     url = "https://api.stlouisfed.org/fred/releases/dates"
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
-        payload = response.json()
+    response = await get_http_client().get(url, params=params, timeout=20.0)
+    response.raise_for_status()
+    payload = response.json()
 
     releases = payload.get("release_dates", [])
     normalized = []
@@ -1756,86 +1975,242 @@ async def get_capitol_trades(n: int = 10, ticker: str | None = None) -> Dict[str
     return {"trades": [], "source_url": None, "ticker": ticker}
 
 
+RANKING_METRICS = ("volume_oi_ratio", "turnover", "implied_volatility", "volatility_skew")
+
+
+def parse_ranking_metrics(metric: str) -> List[str]:
+    """Comma-separated metric names, validated against ``RANKING_METRICS``."""
+    metrics = list(dict.fromkeys(m.strip() for m in metric.split(",") if m.strip()))
+    unknown = [m for m in metrics if m not in RANKING_METRICS]
+    if not metrics or unknown:
+        raise ValueError(f"metric must be one or more of {list(RANKING_METRICS)}.")
+    return metrics
+
+
+def _page_metrics(page: OptionChainSnapshot, metrics: List[str]) -> Dict[str, np.ndarray]:
+    """Every requested metric for a page of contracts, as arrays aligned with its rows."""
+    vol = np.nan_to_num(page.numeric["volume"])
+    oi = np.nan_to_num(page.numeric["open_interest"])
+    mid = np.nan_to_num(page.numeric["mid"])
+    iv = np.nan_to_num(page.numeric["implied_volatility"])
+    values: Dict[str, np.ndarray] = {}
+    for metric in metrics:
+        if metric == "volume_oi_ratio":
+            # Avoid division by zero, prioritize purely by ratio
+            values[metric] = vol / np.where(oi > 0, oi, 1.0)
+        elif metric == "turnover":
+            values[metric] = vol * mid * 100  # Approx dollar nominal
+        elif metric == "implied_volatility":
+            values[metric] = iv
+    return values
+
+
+def _chain_spot(chain: OptionChainSnapshot) -> float:
+    """
+    Underlying price reported with the chain; failing that, the strike whose
+    |delta| is nearest 0.5 in the nearest expiration. NaN if neither is known.
+    """
+    prices = chain.numeric["underlying_price"]
+    prices = prices[np.isfinite(prices) & (prices > 0)]
+    if len(prices):
+        return float(np.median(prices))
+    delta = np.abs(chain.numeric["delta"])
+    rows = np.flatnonzero(np.isfinite(delta))
+    if not len(rows):
+        return float("nan")
+    expirations = np.array([chain.text["expiration"][i] or "" for i in rows.tolist()], dtype=object)
+    rows = rows[expirations == min(expirations)]
+    return float(chain.numeric["strike"][rows[np.argmin(np.abs(delta[rows] - 0.5))]])
+
+
+def _skew_metrics(chain: OptionChainSnapshot) -> tuple[float, Dict[str, np.ndarray]]:
+    """Spot and the ``chain_skew`` columns for a whole chain; ``skew`` is IV minus ATM IV."""
+    spot = _chain_spot(chain)
+    return spot, chain_skew(
+        chain.text["expiration"], chain.numeric["strike"], chain.numeric["implied_volatility"], spot,
+    )
+
+
+def _ranked_details(
+    page: OptionChainSnapshot,
+    values: Dict[str, np.ndarray],
+    skew: Dict[str, np.ndarray] | None = None,
+) -> Callable[[str, int], Dict[str, Any]]:
+    """Metadata for a row that made a board; built only for those rows."""
+    def number(field: str, i: int, columns: Dict[str, np.ndarray] = page.numeric) -> float | None:
+        value = float(columns[field][i])
+        return None if value != value else value
+
+    def details(metric: str, i: int) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "contract": page.text["contract"][i],
+            "strike": number("strike", i),
+            "type": page.text["contract_type"][i],
+            "iv": number("implied_volatility", i),
+            "price": number("mid", i),
+            "metric_value": float(values[metric][i]),
+        }
+        vol = number("volume", i) or 0.0
+        if metric == "volume_oi_ratio":
+            out["formula"] = f"{vol} / {number('open_interest', i) or 0.0}"
+        elif metric == "turnover":
+            out["formula"] = f"{vol} * {number('mid', i) or 0.0} * 100"
+        elif metric == "volatility_skew" and skew is not None:
+            out["expiration"] = page.text["expiration"][i]
+            for field in ("atm_iv", "moneyness", "bucket_iv", "bucket_skew"):
+                out[field] = number(field, i, skew)
+            out["formula"] = f"{out['iv']} - {out['atm_iv']}"
+        return out
+
+    return details
+
+
+async def stream_ranked_options(
+    ticker: str,
+    metric: str,
+    k: int = 10,
+    contract_type: str | None = None,
+    deadline_s: float | None = None,
+    fill_cache: bool = False,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Rank the full chain as it streams in, yielding the top ``k`` after every page.
+
+    ``GET /data/ranked-options/stream`` forwards every ranking as an SSE
+    event; ``get_ranked_options`` returns only the last one.
+
+    ``metric`` may name several metrics (comma-separated); each page's
+    metric arrays are computed once and every metric's board is updated from
+    them. ``ranked_results`` is the first metric's ranking and ``rankings``
+    holds all of them.
+
+    Each page is folded into the leaderboards and dropped, so memory stays at
+    the leaderboards plus the pages in flight. With ``deadline_s`` the scan
+    stops when the deadline passes and the last ranking (best so far) is
+    final; ``complete`` says whether the whole chain was seen.
+
+    A full chain in the snapshot cache (the entry of
+    ``get_options_snapshot(full_chain=True)``) within its TTL is ranked as a
+    single page without fetching. ``fill_cache`` stores a completed scan in
+    that entry, which means keeping every page until the end.
+
+    ``volatility_skew`` compares each contract with its expiration's ATM IV,
+    which needs every strike of that expiration, and pages can split an
+    expiration. Its pages are therefore kept and its board is filled once,
+    from the whole chain (or whatever arrived by the deadline), just before
+    the final ranking.
+    """
+    metrics = parse_ranking_metrics(metric)
+    fetcher = _get_polygon_fetcher()
+    leaderboard = MultiMetricLeaderboard(k=k, metrics=metrics, is_increase=True)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + deadline_s if deadline_s is not None else None
+    scanned = 0
+    pages_seen = 0
+    paged_metrics = [m for m in metrics if m != "volatility_skew"]
+    spot: float | None = None
+
+    # A full chain still within the snapshot cache's TTL is ranked as one page;
+    # otherwise, with fill_cache, a completed scan fills that cache entry.
+    cache = fetcher._snapshot_cache
+    cache_key = _full_chain_key(ticker, None, contract_type)
+    cached = cache.peek(cache_key) if cache is not None else None
+    if cache is None:
+        cache_info: Dict[str, Any] = {"status": "disabled", "age_s": None}
+    else:
+        cache_info = cached[2] if cached is not None else {"status": "miss", "age_s": 0.0}
+    store = fill_cache and cache is not None and cached is None
+    keep_pages = "volatility_skew" in metrics or store
+    kept: List[OptionChainSnapshot] = []
+
+    def ranking(complete: bool, timed_out: bool = False) -> Dict[str, Any]:
+        nonlocal spot
+        if kept and (complete or timed_out):
+            chain = kept[0] if cached is not None else OptionChainSnapshot.concat(kept)
+            kept.clear()
+            if store and complete:
+                cache.put(cache_key, chain, _full_chain_meta(chain, pages_seen))
+            if "volatility_skew" in metrics:
+                spot, skew = _skew_metrics(chain)
+                values = {"volatility_skew": skew["skew"]}
+                leaderboard.add_many(chain.text["contract"], values, _ranked_details(chain, values, skew))
+        rankings = leaderboard.get_results()
+        result = {
+            "ticker": ticker,
+            "metric": metric,
+            "ranked_results": rankings[metrics[0]],
+            "rankings": rankings,
+            "scanned_count": scanned,
+            "pages": pages_seen,
+            "complete": complete,
+            "timed_out": timed_out,
+            "cache": cache_info,
+        }
+        if spot is not None:
+            result["underlying_price"] = None if spot != spot else spot
+        return result
+
+    async def cached_chain() -> AsyncIterator[OptionChainSnapshot]:
+        yield cached[0]
+
+    pages = cached_chain() if cached is not None else fetcher.iter_options_chain(ticker, contract_type=contract_type)
+    try:
+        while True:
+            try:
+                if deadline is None:
+                    page = await pages.__anext__()
+                else:
+                    page = await asyncio.wait_for(pages.__anext__(), max(deadline - loop.time(), 0.0))
+            except StopAsyncIteration:
+                yield ranking(complete=True)
+                return
+            except asyncio.TimeoutError:
+                yield ranking(complete=False, timed_out=True)
+                return
+            values = _page_metrics(page, paged_metrics)
+            leaderboard.add_many(page.text["contract"], values, _ranked_details(page, values))
+            if keep_pages:
+                kept.append(page)
+            scanned += len(page)
+            pages_seen += 1
+            yield ranking(complete=False)
+    finally:
+        await pages.aclose()
+
+
 @function_tool
 async def get_ranked_options(
     ticker: str,
     metric: str,
     k: int = 10,
-    contract_type: str | None = None
+    contract_type: str | None = None,
+    deadline_s: float | None = None,
 ) -> Dict[str, Any]:
     """
-    Rank option contracts by a custom metric using a client-side heap algorithm.
+    Rank option contracts by a custom metric using a client-side top-K leaderboard.
     Useful for finding opportunities not directly sortable by the API.
     
     Args:
         ticker: Underlying symbol (e.g. 'SPY')
-        metric: One of 'volume_oi_ratio', 'turnover', 'volatility_skew'
+        metric: One or more (comma-separated) of 'volume_oi_ratio', 'turnover',
+            'implied_volatility', 'volatility_skew' (IV minus the expiration's
+            at-the-money IV, interpolated between the strikes around spot)
         k: Number of top results to return
         contract_type: Filter by 'call' or 'put' (optional)
+        deadline_s: Stop scanning after this many seconds and return the best so far (optional)
+
+    Returns the final ranking only.
     """
-    fetcher = _get_polygon_fetcher()
-    # Fetch a larger batch to scan (limit=250 is the hardcap in fetcher, 
-    # but we scan what we can get to find the "relative" best in that set).
-    # In a real expanded implementations, we would paginate here.
-    snapshot = await fetcher.get_options_snapshot(
-        ticker, 
-        limit=250, 
-        contract_type=contract_type
-    )
-    
-    options = snapshot.get("options", [])
-    if not options:
+    try:
+        parse_ranking_metrics(metric)
+    except ValueError:
+        return {"status": "unsupported metric", "supported_metrics": list(RANKING_METRICS), "results": []}
+
+    result: Dict[str, Any] = {}
+    async for result in stream_ranked_options(ticker, metric, k, contract_type, deadline_s):
+        pass
+    if not result.get("scanned_count") and result.get("complete"):
         return {"status": "no data", "results": []}
-
-    leaderboard = MarketLeaderboard(k=k, is_increase=True)
-    
-    for opt in options:
-        val = 0.0
-        details = {
-            "contract": opt.get("contract"),
-            "strike": opt.get("strike"),
-            "type": opt.get("contract_type"),
-            "iv": opt.get("implied_volatility"),
-            "price": opt.get("mid"),
-        }
-        
-        try:
-            vol = float(opt.get("volume") or 0)
-            oi = float(opt.get("open_interest") or 0)
-            mid = float(opt.get("mid") or 0)
-            iv = float(opt.get("implied_volatility") or 0)
-            
-            if metric == "volume_oi_ratio":
-                # Avoid division by zero, prioritize purely by ratio
-                val = vol / (oi if oi > 0 else 1.0)
-                details["metric_value"] = val
-                details["formula"] = f"{vol} / {oi}"
-                
-            elif metric == "turnover":
-                val = vol * mid * 100 # Approx dollar nominal
-                details["metric_value"] = val
-                details["formula"] = f"{vol} * {mid} * 100"
-                
-            elif metric == "volatility_skew":
-                # Placeholder: Simply ranking by IV for now 
-                # (Real skew requires comparing to ATM IV, but high IV is a proxy)
-                val = iv
-                details["metric_value"] = val
-            
-            else:
-                continue
-
-            leaderboard.add(opt.get("contract"), val, details)
-            
-        except (ValueError, TypeError):
-            continue
-
-    return {
-        "ticker": ticker,
-        "metric": metric,
-        "ranked_results": leaderboard.get_results(),
-        "scanned_count": len(options)
-    }
+    return result
 
 
 # --- Lab/Engine Integration Tools ---
@@ -1,5 +1,7 @@
 import numpy as np
 import pandas as pd
+from collections import deque
+from itertools import islice
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from pydantic import BaseModel
@@ -20,10 +22,22 @@ class BacktestResult(BaseModel):
     trades: List[Dict[str, Any]]
     equity_curve: List[Dict[str, Any]]
 
+# Bars are pulled from the aggregates iterator and simulated this many at a
+# time, so memory stays bounded however long the backtest window is.
+STREAM_CHUNK_BARS = 50000
+SIGNAL_THRESHOLD = 0.0001  # Minimal threshold
+EQUITY_SAMPLE_EVERY = 10  # Sample equity curve for chart
+TRADE_HISTORY_LIMIT = 50  # Limit trade history in response
+
 class EdgeCalculator:
     @staticmethod
     def calculate_stats(trades: List[Dict[str, Any]], initial_capital: float) -> Dict[str, float]:
-        if not trades:
+        pnl = np.array([t['pnl'] for t in trades], dtype=float)
+        return EdgeCalculator.calculate_stats_from_pnl(pnl, initial_capital)
+
+    @staticmethod
+    def calculate_stats_from_pnl(pnl: np.ndarray, initial_capital: float) -> Dict[str, float]:
+        if len(pnl) == 0:
             return {
                 "total_pnl": 0.0,
                 "sharpe_ratio": 0.0,
@@ -31,37 +45,28 @@ class EdgeCalculator:
                 "win_rate": 0.0,
                 "drawdown": 0.0
             }
-        
-        df = pd.DataFrame(trades)
-        total_pnl = df['pnl'].sum()
-        
+
+        pnl = pd.Series(pnl, dtype=float)
+        total_pnl = pnl.sum()
+
         # Win Rate
-        winners = df[df['pnl'] > 0]
-        win_rate = len(winners) / len(df) if len(df) > 0 else 0.0
-        
+        win_rate = int((pnl > 0).sum()) / len(pnl)
+
         # Expected Value (Average PnL per trade)
-        expected_value = df['pnl'].mean()
-        
+        expected_value = pnl.mean()
+
         # Sharpe Ratio (assuming roughly even intervals for trade returns)
-        # In a real engine, we'd use daily returns series. 
+        # In a real engine, we'd use daily returns series.
         # Here we approximate with per-trade return distribution.
-        returns = df['pnl'] / initial_capital
+        returns = pnl / initial_capital
         std_dev = returns.std()
         sharpe_ratio = (returns.mean() / std_dev) * np.sqrt(252) if std_dev > 0 else 0.0
 
         # Drawdown calculation
-        # Reconstruct equity curve
-        equity = [initial_capital]
-        current_equity = initial_capital
-        max_equity = initial_capital
-        max_drawdown = 0.0
-
-        for pnl in df['pnl']:
-            current_equity += pnl
-            max_equity = max(max_equity, current_equity)
-            drawdown = (max_equity - current_equity) / max_equity
-            max_drawdown = max(max_drawdown, drawdown)
-            equity.append(current_equity)
+        # Reconstruct equity curve (cumsum adds in sequence, like a running total)
+        equity = np.cumsum(np.concatenate(([initial_capital], pnl.to_numpy())))
+        max_equity = np.maximum.accumulate(equity)
+        max_drawdown = max(0.0, float(((max_equity - equity) / max_equity)[1:].max()))
 
         return {
             "total_pnl": total_pnl,
@@ -71,107 +76,147 @@ class EdgeCalculator:
             "drawdown": max_drawdown
         }
 
+def _ffill_index(mask: np.ndarray) -> np.ndarray:
+    """For each position, the index of the latest True at or before it (-1 if none)."""
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+class _AR1Simulation:
+    """AR1 close-and-flip simulation fed one chunk of bars at a time.
+
+    Row i calculates the signal for row i+1, and execution is at the row's
+    close. All state that crosses a chunk boundary is carried explicitly, so
+    chunked runs match a single pass over the full series.
+    """
+
+    def __init__(self, weight: float, bias: float, initial_capital: float):
+        self.weight = weight
+        self.bias = bias
+        self.position = 0  # 0, 1 (long), -1 (short)
+        self.entry_price = 0.0
+        self.equity = initial_capital
+        self.last_close = np.nan  # previous raw bar, for the log return
+        self.last_feature: float | None = None  # log return of the previous kept row
+        self.rows = 0  # equity-curve rows emitted so far
+        self.pnl_chunks: List[np.ndarray] = []
+        self.trades: deque = deque(maxlen=TRADE_HISTORY_LIMIT)
+        self.equity_curve: List[Dict[str, Any]] = []
+
+    def feed(self, timestamp: np.ndarray, close: np.ndarray, volume: np.ndarray) -> None:
+        if len(close) == 0:
+            return
+        # Log return against the previous raw bar, then drop incomplete rows
+        # (the first bar has no return; bars without close/volume are skipped).
+        prev_close = np.concatenate(([self.last_close], close[:-1]))
+        self.last_close = close[-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_return = np.log(close / prev_close)
+        keep = ~(np.isnan(log_return) | np.isnan(timestamp) | np.isnan(volume))
+        ts, price, log_return = timestamp[keep], close[keep], log_return[keep]
+        if len(price) == 0:
+            return
+
+        if self.last_feature is None:
+            # The very first complete row only anchors the equity curve.
+            self._emit_equity(ts[:1], np.array([self.equity]))
+            self.last_feature = log_return[0]
+            ts, price, log_return = ts[1:], price[1:], log_return[1:]
+            if len(price) == 0:
+                return
+
+        # Feature: Lag 1 Log Return. Model Prediction: Last Return * Weight + Bias
+        feature = np.concatenate(([self.last_feature], log_return[:-1]))
+        self.last_feature = log_return[-1]
+        predicted = (feature * self.weight) + self.bias
+        signal = np.where(predicted > SIGNAL_THRESHOLD, 1, np.where(predicted < -SIGNAL_THRESHOLD, -1, 0))
+
+        # Position only ever flips to a non-zero signal; a zero signal closes
+        # the trade but keeps the position (and entry) for the next bar.
+        last_signal = _ffill_index(signal != 0)
+        pos_after = np.where(last_signal >= 0, signal[np.maximum(last_signal, 0)], self.position)
+        pos_before = np.concatenate(([self.position], pos_after[:-1]))
+        entered = (signal != 0) & (signal != pos_before)
+        last_entry = _ffill_index(entered)
+        entry_after = np.where(last_entry >= 0, price[np.maximum(last_entry, 0)], self.entry_price)
+        entry_before = np.concatenate(([self.entry_price], entry_after[:-1]))
+
+        closed = (pos_before != 0) & (pos_before != signal)
+        pnl = np.where(closed, (price - entry_before) * pos_before * 100, 0.0)  # Assumes 100 shares
+        # Adding 0.0 on bars without a trade leaves the running total unchanged.
+        equity = np.cumsum(np.concatenate(([self.equity], pnl)))[1:]
+
+        self.position = int(pos_after[-1])
+        self.entry_price = float(entry_after[-1])
+        self.equity = float(equity[-1])
+
+        trade_idx = np.flatnonzero(closed)
+        self.pnl_chunks.append(pnl[trade_idx])
+        for i in trade_idx[-TRADE_HISTORY_LIMIT:].tolist():
+            self.trades.append({
+                "timestamp": float(ts[i]),
+                "side": "sell" if pos_before[i] == 1 else "buy",
+                "price": float(price[i]),
+                "pnl": float(pnl[i])
+            })
+        self._emit_equity(ts, equity)
+
+    def _emit_equity(self, ts: np.ndarray, equity: np.ndarray) -> None:
+        rows = np.arange(self.rows, self.rows + len(ts))
+        sampled = rows % EQUITY_SAMPLE_EVERY == 0
+        self.equity_curve.extend(
+            {"timestamp": t, "equity": e}
+            for t, e in zip(ts[sampled].tolist(), equity[sampled].tolist())
+        )
+        self.rows += len(ts)
+
+    def all_pnl(self) -> np.ndarray:
+        return np.concatenate(self.pnl_chunks) if self.pnl_chunks else np.empty(0)
+
 class BacktestEngine:
     def __init__(self, client):
         self.client = client
 
-    def run(self, config: BacktestConfig) -> BacktestResult:
-        # 1. Fetch Historical Data
+    def _stream_bars(self, config: BacktestConfig):
+        """Yield (timestamp, close, volume) float arrays, one chunk at a time.
+
+        `list_aggs` paginates lazily, so only one chunk of bars is held here.
+        """
         # For simplicity, using Aggy bars. In production, use Ticks for high fidelity.
-        aggs = self.client.list_aggs(
+        aggs = iter(self.client.list_aggs(
             ticker=config.ticker,
             multiplier=1,
             timespan="minute",
             from_=config.start_date,
             to=config.end_date,
             limit=50000
-        )
-        
-        bars = []
-        for agg in aggs:
-            bars.append({
-                "timestamp": agg.timestamp,
-                "close": agg.close,
-                "volume": agg.volume
-            })
-        
-        if not bars:
-            return BacktestResult(
-                total_pnl=0, sharpe_ratio=0, expected_value=0, 
-                win_rate=0, drawdown=0, trades=[], equity_curve=[]
-            )
-
-        df = pd.DataFrame(bars)
-        df['log_return'] = np.log(df['close'] / df['close'].shift(1))
-        df = df.dropna()
+        ))
+        while True:
+            chunk = [(agg.timestamp, agg.close, agg.volume) for agg in islice(aggs, STREAM_CHUNK_BARS)]
+            if not chunk:
+                return
+            # dtype=float maps missing values (None) to NaN.
+            block = np.array(chunk, dtype=float).reshape(-1, 3)
+            yield block[:, 0], block[:, 1], block[:, 2]
 
-        # 2. Run Strategy (Vectorized or Event-driven simulation)
-        # Implementing simple event loop for demonstration
-        
-        model_type = config.strategy_config.get("type")
+    def run(self, config: BacktestConfig) -> BacktestResult:
+        # 1. Strategy parameters
         params = config.strategy_config.get("parameters", {})
-        
-        trades = []
-        position = 0 # 0, 1 (long), -1 (short)
-        entry_price = 0.0
-        
         # AR1 Logic: Predicted Return = Last Return * Weight + Bias
         weight = params.get("weights", [0])[0]
         bias = params.get("bias", 0.0)
 
-        current_equity = config.initial_capital
-        equity_curve = [{"timestamp": df.iloc[0]['timestamp'], "equity": current_equity}]
-
-        # Iterate through bars
-        # Note: In a real simulation, we'd avoid lookahead bias carefully.
-        # Here, row i calculates signal for i+1. execution is at i+1 open/close.
-        
-        for i in range(1, len(df)):
-            prev_row = df.iloc[i-1]
-            curr_row = df.iloc[i]
-            
-            # Feature: Lag 1 Log Return
-            feature = prev_row['log_return']
-            
-            # Model Prediction
-            predicted_return = (feature * weight) + bias
-            
-            # Signal Generation
-            signal = 0
-            threshold = 0.0001 # Minimal threshold
-            
-            if predicted_return > threshold:
-                signal = 1
-            elif predicted_return < -threshold:
-                signal = -1
-            
-            # Simple Execution Logic (Close and Flip)
-            price = curr_row['close']
-            
-            if position != signal:
-                # Close existing
-                if position != 0:
-                    pnl = (price - entry_price) * position * 100 # Assumes 100 shares
-                    trades.append({
-                        "timestamp": curr_row['timestamp'],
-                        "side": "sell" if position == 1 else "buy",
-                        "price": price,
-                        "pnl": pnl
-                    })
-                    current_equity += pnl
-                
-                # Open new
-                if signal != 0:
-                    entry_price = price
-                    position = signal
-            
-            equity_curve.append({
-                "timestamp": curr_row['timestamp'],
-                "equity": current_equity
-            })
+        # 2. Stream historical data through the vectorized simulation
+        sim = _AR1Simulation(weight, bias, config.initial_capital)
+        for timestamp, close, volume in self._stream_bars(config):
+            sim.feed(timestamp, close, volume)
+
+        if not sim.equity_curve:
+            return BacktestResult(
+                total_pnl=0, sharpe_ratio=0, expected_value=0,
+                win_rate=0, drawdown=0, trades=[], equity_curve=[]
+            )
 
         # Calculate Statistics
-        stats = EdgeCalculator.calculate_stats(trades, config.initial_capital)
+        stats = EdgeCalculator.calculate_stats_from_pnl(sim.all_pnl(), config.initial_capital)
 
         return BacktestResult(
             total_pnl=stats['total_pnl'],
@@ -179,6 +224,6 @@ class BacktestEngine:
             expected_value=stats['expected_value'],
             win_rate=stats['win_rate'],
             drawdown=stats['drawdown'],
-            trades=trades[-50:], # Limit trade history in response
-            equity_curve=equity_curve[::10] # Sample equity curve for chart
+            trades=list(sim.trades),
+            equity_curve=sim.equity_curve
         )
@@ -66,7 +66,7 @@ class ScreenerBacktester:
                     **config.params
                 )
                 
-                opportunities = find_best_options_calls(self.client, screener_params)
+                opportunities = find_best_options_calls(self.client, screener_params, limit=1)
                 
                 if opportunities:
                     best = opportunities[0]
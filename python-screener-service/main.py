@@ -2,9 +2,16 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional, Literal
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
-from screener import find_best_options_calls, find_best_iron_condors, make_client
+from screener import (
+    CHAIN_CACHE,
+    find_best_options_calls_async,
+    find_best_iron_condors_async,
+    make_client,
+)
+from polygon_async import close_async_client, get_async_client
 from backtest.engine import BacktestEngine, BacktestConfig, BacktestResult
 from backtest.screener_backtest import ScreenerBacktester, ScreenerBacktestConfig, ScreenerBacktestResult
 from dotenv import load_dotenv
@@ -23,7 +30,8 @@ async def lifespan(app: FastAPI):
     if not key:
         logger.warning("POLYGON_API_KEY is not set. Screener will fail.")
     yield
-    # Shutdown
+    # Shutdown: release the shared Polygon connection pool
+    await close_async_client()
 
 app = FastAPI(title="Polygon Screener Service", version="1.0.0", lifespan=lifespan)
 
@@ -76,54 +84,53 @@ class IronCondorOpportunity(BaseModel):
     pop_est: float
     put_ticker: str
     call_ticker: str
+    long_put_strike: float | None = None
+    long_call_strike: float | None = None
+    long_put_ticker: str | None = None
+    long_call_ticker: str | None = None
     spot: float
 
 @app.get("/health")
-def health_check():
-    return {"status": "ok", "service": "python-screener-service"}
+async def health_check():
+    return {"status": "ok", "service": "python-screener-service", "chain_cache": CHAIN_CACHE.stats()}
 
 @app.post("/api/screen/0dte-covered-calls", response_model=List[Opportunity])
-def screen_0dte(params: ScreenParams):
+async def screen_0dte(params: ScreenParams):
     logger.info(f"Screening for {params.symbol} with params: {params}")
     try:
-        client = make_client()
         # Call the Logic
-        results = find_best_options_calls(client, params)
+        results = await find_best_options_calls_async(get_async_client(), params)
         return results
     except Exception as e:
         logger.error(f"Screening error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/screen/iron-condor", response_model=List[IronCondorOpportunity])
-def screen_iron_condor(params: ScreenIronCondorParams):
+async def screen_iron_condor(params: ScreenIronCondorParams):
     logger.info(f"Screening Iron Condors for {params.symbol}")
     try:
-        client = make_client()
-        results = find_best_iron_condors(client, params)
+        results = await find_best_iron_condors_async(get_async_client(), params)
         return results
     except Exception as e:
         logger.error(f"Condor screening error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/lab/backtest", response_model=BacktestResult)
-def run_backtest(config: BacktestConfig):
+async def run_backtest(config: BacktestConfig):
     logger.info(f"Running backtest for {config.ticker}")
     try:
-        client = make_client()
-        engine = BacktestEngine(client)
-        result = engine.run(config)
+        # The backtest engines are synchronous end to end; keep them off the event loop.
+        result = await asyncio.to_thread(lambda: BacktestEngine(make_client()).run(config))
         return result
     except Exception as e:
         logger.error(f"Backtest error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/lab/screener/backtest", response_model=ScreenerBacktestResult)
-def run_screener_backtest(config: ScreenerBacktestConfig):
+async def run_screener_backtest(config: ScreenerBacktestConfig):
     logger.info(f"Running screener backtest for {config.symbol}")
     try:
-        client = make_client()
-        backtester = ScreenerBacktester(client)
-        result = backtester.run(config)
+        result = await asyncio.to_thread(lambda: ScreenerBacktester(make_client()).run(config))
         return result
     except Exception as e:
         logger.error(f"Screener backtest error: {e}")
@@ -147,9 +154,17 @@ DEFAULT_WATCHLIST = [
 ]
 
 
+# Concurrency for the universe scan. Polygon calls also draw from the async
+# client's process-wide POLYGON_REQUESTS_PER_SEC budget.
+SCAN_MAX_WORKERS = int(os.getenv("SCAN_MAX_WORKERS", "8"))
+SCAN_TICKER_TIMEOUT_S = float(os.getenv("SCAN_TICKER_TIMEOUT_S", "20"))
+
+
 class ScanRequest(BaseModel):
     tickers: List[str] = DEFAULT_WATCHLIST
     top_n: int = Field(default=5, ge=1, le=20)
+    max_workers: Optional[int] = Field(default=None, ge=1, le=32)
+    ticker_timeout_s: Optional[float] = Field(default=None, gt=0)
     # Screener params
     min_otm_pct: float = 0.00
     max_otm_pct: float = 0.03
@@ -176,15 +191,17 @@ class ScanResponse(BaseModel):
 
 
 @app.post("/api/scan/0dte-universe", response_model=ScanResponse)
-def scan_universe(request: ScanRequest):
+async def scan_universe(request: ScanRequest):
     """
     Scan multiple tickers to find the best 0-DTE covered call opportunities.
     Returns the top N candidates ranked by the specified metric.
     """
     logger.info(f"Scanning {len(request.tickers)} tickers for 0-DTE opportunities")
-    
-    client = make_client()
-    results: List[ScanResult] = []
+
+    workers = max(1, min(request.max_workers or SCAN_MAX_WORKERS, len(request.tickers) or 1))
+    ticker_timeout = request.ticker_timeout_s or SCAN_TICKER_TIMEOUT_S
+    client = get_async_client()
+    slots = asyncio.Semaphore(workers)
 
     # Check Market Status
     market_status = "open"
@@ -192,7 +209,7 @@ def scan_universe(request: ScanRequest):
     note = None
 
     try:
-        status_obj = client.get_market_status()
+        status_obj = await client.get_market_status()
         market_status = getattr(status_obj, "market", "open").lower()
     except Exception as e:
         logger.warning(f"Could not check market status: {e}")
@@ -203,8 +220,8 @@ def scan_universe(request: ScanRequest):
         expiration_days = 1
         note = f"Market is {market_status}. Showing candidates for next trading session (1-DTE)."
         logger.info(note)
-    
-    for symbol in request.tickers:
+
+    async def scan_one(symbol: str) -> ScanResult:
         try:
             params = ScreenParams(
                 symbol=symbol,
@@ -216,35 +233,42 @@ def scan_universe(request: ScanRequest):
                 min_bid=request.min_bid,
                 rank_metric=request.rank_metric
             )
-            
-            opportunities = find_best_options_calls(client, params)
-            
+
+            # The timeout cancels in-flight pages, so a slow chain gives up
+            # instead of holding a slot for the rest of the batch.
+            async with slots:
+                async with asyncio.timeout(ticker_timeout):
+                    opportunities = await find_best_options_calls_async(client, params, limit=1)
+
             if opportunities:
                 best = opportunities[0]
-                results.append(ScanResult(
+                return ScanResult(
                     symbol=symbol,
                     best_option=Opportunity(**best),
                     premium_yield=best.get("premium_yield", 0),
                     has_opportunities=True
-                ))
-            else:
-                results.append(ScanResult(
-                    symbol=symbol,
-                    best_option=None,
-                    premium_yield=0,
-                    has_opportunities=False
-                ))
-                
+                )
+            return ScanResult(
+                symbol=symbol,
+                best_option=None,
+                premium_yield=0,
+                has_opportunities=False
+            )
+
         except Exception as e:
-            logger.warning(f"Error scanning {symbol}: {e}")
-            results.append(ScanResult(
+            error = f"Timed out after {ticker_timeout:g}s" if isinstance(e, TimeoutError) else str(e)
+            logger.warning(f"Error scanning {symbol}: {error}")
+            return ScanResult(
                 symbol=symbol,
                 best_option=None,
                 premium_yield=0,
                 has_opportunities=False,
-                error=str(e)
-            ))
-    
+                error=error
+            )
+
+    # gather() preserves the request order, so ranking ties resolve as before.
+    results: List[ScanResult] = await asyncio.gather(*(scan_one(symbol) for symbol in request.tickers))
+
     # Sort by premium_yield (or chosen metric) and take top N
     successful = [r for r in results if r.has_opportunities]
     successful.sort(key=lambda x: x.premium_yield, reverse=True)
@@ -253,11 +277,10 @@ def scan_universe(request: ScanRequest):
     # Broadcast to UI if running in integrated mode
     try:
         if top_n:
-            import requests  # Ensure requests is imported or available
             webhook_url = "http://localhost:4000/api/engine/hooks/screener-result"
             # Extract just the dicts from the Pydantic models for JSON serialization
             opps_json = [r.dict() for r in top_n]
-            requests.post(webhook_url, json={"opportunities": opps_json, "strategyName": "AI Agent 0-DTE Scan"}, timeout=1)
+            await client.post_json(webhook_url, {"opportunities": opps_json, "strategyName": "AI Agent 0-DTE Scan"}, timeout=1)
     except Exception as e:
         logger.warning(f"Failed to broadcast results to UI: {e}")
 
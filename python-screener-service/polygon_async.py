@@ -0,0 +1,135 @@
+"""
+Async Polygon client for the screener endpoints.
+
+One process-wide ``httpx.AsyncClient`` keeps connections alive across
+requests, and every call draws from a shared token-bucket rate limit. Results
+are deserialized into the same ``polygon.rest.models`` objects the sync
+``RESTClient`` returns, so the screening logic in ``screener.py`` runs
+unchanged on either path.
+"""
+import asyncio
+import os
+import time
+from urllib.parse import urlparse
+
+import httpx
+from polygon.rest.models import LastTrade, MarketStatus, OptionContractSnapshot
+
+POLYGON_REQUESTS_PER_SEC = float(os.getenv("POLYGON_REQUESTS_PER_SEC", "25"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_TIMEOUT_S = float(os.getenv("HTTP_TIMEOUT_S", "10"))
+# Largest page the snapshot endpoint serves; the sync SDK uses the API default (10).
+CHAIN_PAGE_LIMIT = 250
+
+
+class AsyncRateLimiter:
+    """Token bucket shared by every coroutine that talks to Polygon."""
+
+    def __init__(self, rate_per_sec: float, burst: int | None = None):
+        self.rate = max(rate_per_sec, 0.001)
+        self.capacity = float(burst or max(1, int(rate_per_sec)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncPolygonClient:
+    """The subset of ``polygon.RESTClient`` the screener uses, over httpx."""
+
+    def __init__(self, api_key: str, base: str, rate_limiter: AsyncRateLimiter | None = None):
+        self.base = base.rstrip("/")
+        self.rate_limiter = rate_limiter
+        self._auth = {"Authorization": f"Bearer {api_key}"}
+        self.http = httpx.AsyncClient(
+            base_url=self.base,
+            headers={"Accept-Encoding": "gzip"},
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            ),
+            timeout=HTTP_TIMEOUT_S,
+        )
+
+    async def _get_json(self, path: str, params: dict | None = None) -> dict:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        response = await self.http.get(path, params=params, headers=self._auth)
+        response.raise_for_status()
+        return response.json()
+
+    async def list_snapshot_options_chain(self, underlying_asset: str, params: dict | None = None) -> list:
+        """All pages of the chain snapshot as ``OptionContractSnapshot`` objects.
+
+        Pages are cursor-linked, so the next request is issued as soon as a
+        page's ``next_url`` is known and runs while the current page is being
+        deserialized off the event loop.
+        """
+        query = {"limit": CHAIN_PAGE_LIMIT, **(params or {})}
+        payload = await self._get_json(f"/v3/snapshot/options/{underlying_asset}", query)
+        items: list = []
+        while True:
+            next_url = payload.get("next_url")
+            next_page = None
+            if next_url:
+                parsed = urlparse(next_url)
+                path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+                next_page = asyncio.ensure_future(self._get_json(path))
+            try:
+                items.extend(await asyncio.to_thread(
+                    lambda rows: [OptionContractSnapshot.from_dict(r) for r in rows],
+                    payload.get("results") or [],
+                ))
+            except BaseException:
+                if next_page is not None:
+                    next_page.cancel()
+                raise
+            if next_page is None:
+                return items
+            payload = await next_page
+
+    async def get_last_trade(self, ticker: str) -> LastTrade:
+        payload = await self._get_json(f"/v2/last/trade/{ticker}")
+        return LastTrade.from_dict(payload.get("results") or {})
+
+    async def get_market_status(self) -> MarketStatus:
+        return MarketStatus.from_dict(await self._get_json("/v1/marketstatus/now"))
+
+    async def post_json(self, url: str, payload: dict, timeout: float) -> None:
+        """Fire a JSON POST to a non-Polygon URL on the shared connection pool."""
+        await self.http.post(url, json=payload, timeout=timeout)
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+
+_client: AsyncPolygonClient | None = None
+
+
+def get_async_client() -> AsyncPolygonClient:
+    """Process-wide async client, created on first use."""
+    global _client
+    if _client is None:
+        key = os.getenv("POLYGON_API_KEY") or os.getenv("MASSIVE_API_KEY")
+        if not key:
+            raise ValueError("POLYGON_API_KEY not found in environment")
+        base = os.getenv("MASSIVE_BASE_URL") or os.getenv("POLYGON_BASE_URL") or "https://api.polygon.io"
+        _client = AsyncPolygonClient(key, base, AsyncRateLimiter(POLYGON_REQUESTS_PER_SEC))
+    return _client
+
+
+async def close_async_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,4 +1,10 @@
 import os, math
+import asyncio
+import threading
+import time as _time
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
 import pandas as pd
 from datetime import datetime, time, timedelta
 from zoneinfo import ZoneInfo
@@ -33,43 +39,180 @@ def time_to_expiry_years(date_str: str) -> float:
     mins = minutes_to_close_on(date_str)
     return max(mins / (60 * 24 * 365), 1e-6)
 
+class ChainCache:
+    """Short-TTL LRU cache of chain snapshots keyed by (symbol, expiration, contract_type).
+
+    Concurrent requests for the same key share a single in-flight fetch
+    (single-flight); a failed fetch is handed to every waiter and not cached.
+    """
+
+    def __init__(self, ttl_s: float, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[tuple, tuple[float, list]] = OrderedDict()
+        self._inflight: dict[tuple, Future] = {}
+        self._inflight_async: dict[tuple, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    def _lookup(self, key: tuple):
+        """Return a fresh cached value, or None. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > _time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def _store(self, key: tuple, items) -> None:
+        """Cache a fetched value. Caller holds the lock."""
+        if self.ttl_s > 0:
+            self._entries[key] = (_time.monotonic() + self.ttl_s, items)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_fetch(self, key: tuple, fetch):
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                self.misses += 1
+                pending = self._inflight[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return pending.result()
+
+        try:
+            items = fetch()
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.set_exception(exc)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._store(key, items)
+        pending.set_result(items)
+        return items
+
+    async def get_or_fetch_async(self, key: tuple, fetch):
+        """Async twin of `get_or_fetch`; `fetch` is a coroutine function.
+
+        Shares entries and counters with the sync path. The fetch runs as a
+        task owned by the cache and every caller, the one that started it
+        included, awaits it shielded: a caller that is cancelled (e.g. by its
+        own timeout) detaches and leaves the fetch running for the others.
+        """
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            task = self._inflight_async.get(key)
+            if task is None:
+                self.misses += 1
+                task = self._inflight_async[key] = asyncio.get_running_loop().create_task(
+                    self._fetch_async(key, fetch)
+                )
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            else:
+                self.shared += 1
+        return await asyncio.shield(task)
+
+    async def _fetch_async(self, key: tuple, fetch):
+        try:
+            items = await fetch()
+        except BaseException:
+            with self._lock:
+                self._inflight_async.pop(key, None)
+            raise
+        with self._lock:
+            self._inflight_async.pop(key, None)
+            self._store(key, items)
+        return items
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.shared
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_inflight": self.shared,
+                "hit_rate": round((self.hits + self.shared) / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "ttl_s": self.ttl_s,
+                "max_entries": self.max_entries,
+            }
+
+CHAIN_CACHE = ChainCache(
+    ttl_s=float(os.getenv("CHAIN_CACHE_TTL_S", "5")),
+    max_entries=int(os.getenv("CHAIN_CACHE_MAX_ENTRIES", "256")),
+)
+
+def _chain_params(expiration_date: str, contract_type: str) -> dict:
+    return {
+        "contract_type": contract_type,
+        "expiration_date.gte": expiration_date,
+        "expiration_date.lte": expiration_date,
+    }
+
+def _fetch_chain_snapshot(client, symbol: str, expiration_date: str, contract_type: str):
+    def fetch():
+        items = ChainSnapshot()
+        # Note: client.list_snapshot_options_chain is an iterator handling pagination
+        for o in client.list_snapshot_options_chain(symbol, params=_chain_params(expiration_date, contract_type)):
+            items.append(o)
+        return items
+    return CHAIN_CACHE.get_or_fetch((symbol.upper(), expiration_date, contract_type), fetch)
+
+async def _fetch_chain_snapshot_async(aclient, symbol: str, expiration_date: str, contract_type: str):
+    async def fetch():
+        items = await aclient.list_snapshot_options_chain(symbol, params=_chain_params(expiration_date, contract_type))
+        return ChainSnapshot(items)
+    return await CHAIN_CACHE.get_or_fetch_async((symbol.upper(), expiration_date, contract_type), fetch)
+
 def fetch_chain_snapshot_calls(client, symbol: str, expiration_date: str):
-    items = []
-    # Note: client.list_snapshot_options_chain is an iterator handling pagination
-    for o in client.list_snapshot_options_chain(
-        symbol,
-        params={
-            "contract_type": "call",
-            "expiration_date.gte": expiration_date,
-            "expiration_date.lte": expiration_date,
-        },
-    ):
-        items.append(o)
-    return items
+    return _fetch_chain_snapshot(client, symbol, expiration_date, "call")
 
 def fetch_chain_snapshot_puts(client, symbol: str, expiration_date: str):
-    items = []
-    for o in client.list_snapshot_options_chain(
-        symbol,
-        params={
-            "contract_type": "put",
-            "expiration_date.gte": expiration_date,
-            "expiration_date.lte": expiration_date,
-        },
-    ):
-        items.append(o)
-    return items
+    return _fetch_chain_snapshot(client, symbol, expiration_date, "put")
+
+async def fetch_chain_snapshot_calls_async(aclient, symbol: str, expiration_date: str):
+    return await _fetch_chain_snapshot_async(aclient, symbol, expiration_date, "call")
+
+async def fetch_chain_snapshot_puts_async(aclient, symbol: str, expiration_date: str):
+    return await _fetch_chain_snapshot_async(aclient, symbol, expiration_date, "put")
+
+def _spot_from_chain(*chains) -> float | None:
+    for chain in chains:
+        for o in chain:
+            ua = getattr(o, "underlying_asset", None)
+            if ua and getattr(ua, "price", None) is not None:
+                return ua.price
+    return None
 
 def resolve_spot(chain, client, symbol: str) -> float | None:
     # Try to find underlying price from chain snapshots first
-    for o in chain:
-        ua = getattr(o, "underlying_asset", None)
-        if ua and getattr(ua, "price", None) is not None:
-            return ua.price
+    spot = _spot_from_chain(chain)
+    if spot is not None:
+        return spot
     # Fallback to last trade
     lt = client.get_last_trade(symbol)
     return getattr(lt, "price", None)
 
+async def resolve_spot_async(chains, aclient, symbol: str) -> float | None:
+    spot = _spot_from_chain(*chains)
+    if spot is not None:
+        return spot
+    lt = await aclient.get_last_trade(symbol)
+    return getattr(lt, "price", None)
+
 def norm_cdf(x: float) -> float:
     return 0.5 * (1.0 + math.erf(x / math.sqrt(2)))
 
@@ -84,165 +227,306 @@ def pop_estimate(S0: float, breakeven: float, iv: float | None, t_years: float)
     d2 = (math.log(S0 / breakeven) - 0.5 * (iv ** 2) * t_years) / (iv * math.sqrt(t_years))
     return norm_cdf(d2)
 
-def find_best_options_calls(client, params) -> list:
+def erf_array(x: np.ndarray) -> np.ndarray:
+    """Vectorized erf (Abramowitz & Stegun 7.1.26, |error| < 1.5e-7)."""
+    sign = np.sign(x)
+    ax = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * ax)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return sign * (1.0 - poly * np.exp(-ax * ax))
+
+def pop_estimate_array(S0: float, breakeven: np.ndarray, iv: np.ndarray, t_years: float) -> np.ndarray:
+    """Array form of `pop_estimate`; NaN where the scalar version returns None."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        valid = (iv > 0) & (breakeven > 0) & (t_years > 0)
+        d2 = (np.log(S0 / breakeven) - 0.5 * iv ** 2 * t_years) / (iv * math.sqrt(max(t_years, 0.0)))
+        return np.where(valid, 0.5 * (1.0 + erf_array(d2 / math.sqrt(2))), np.nan)
+
+class ChainSnapshot(list):
+    """Chain snapshot items plus their columnar view, built once per snapshot."""
+
+    _columns: dict | None = None
+
+    def columns(self) -> dict:
+        if self._columns is None:
+            self._columns = _build_chain_columns(self)
+        return self._columns
+
+def _build_chain_columns(chain) -> dict:
+    numeric, tickers, expirations = [], [], []
+    for o in chain:
+        d = getattr(o, "details", None)
+        q = getattr(o, "last_quote", None)
+        if not d or not q or d.strike_price is None:
+            continue
+        g = getattr(o, "greeks", None)
+        numeric.append((
+            d.strike_price,
+            q.bid,
+            q.ask,
+            getattr(g, "delta", None) if g else None,
+            getattr(o, "implied_volatility", None),
+            getattr(o, "open_interest", 0) or 0,
+        ))
+        tickers.append(d.ticker)
+        expirations.append(d.expiration_date)
+    # dtype=float turns the None placeholders into NaN in one pass.
+    block = np.array(numeric, dtype=float).reshape(-1, 6).T
+    bid, ask = block[1], block[2]
+    with np.errstate(invalid="ignore"):
+        valid_mid = (bid > 0) & (ask > 0) & (ask >= bid)
+    return {
+        "strike": block[0],
+        "bid": bid,
+        "ask": ask,
+        "mid": np.where(valid_mid, 0.5 * (bid + ask), np.nan),
+        "delta": np.abs(block[3]),
+        "iv": block[4],
+        "oi": block[5].astype(np.int64),
+        "ticker": np.asarray(tickers, dtype=object),
+        "expiration": np.asarray(expirations, dtype=object),
+    }
+
+def chain_columns(chain, sort_by_strike: bool = True) -> dict:
+    """Struct-of-arrays view of the quoted contracts in a chain snapshot.
+
+    Contracts without details or a quote are dropped; missing numbers become
+    NaN (`delta` is the absolute delta). Rows keep the snapshot order unless
+    `sort_by_strike` is set. Cached snapshots reuse their conversion.
+    """
+    cols = chain.columns() if isinstance(chain, ChainSnapshot) else _build_chain_columns(chain)
+    if sort_by_strike:
+        order = np.argsort(cols["strike"], kind="stable")
+        cols = {key: value[order] for key, value in cols.items()}
+    return cols
+
+def find_best_options_calls(client, params, limit: int | None = None) -> list:
     """
     Main logic function adapted from the CLI tool.
-    Returns a list of dictionaries (Opportunities).
+    Returns a list of dictionaries (Opportunities), best first; `limit` caps
+    how many are materialized.
     """
     exp = target_expiration_date(params.expiration_days)
     chain = fetch_chain_snapshot_calls(client, params.symbol, exp)
-    
+
     if not chain:
         return []
 
     spot = resolve_spot(chain, client, params.symbol)
     if spot is None:
         raise ValueError(f"Could not resolve spot price for {params.symbol}")
+    return rank_covered_calls(chain, spot, exp, params, limit)
 
-    lo = spot * (1 + params.min_otm_pct)
-    hi = spot * (1 + params.max_otm_pct) if params.max_otm_pct else float("inf")
-    t_years = time_to_expiry_years(exp)
-
-    results = []
-    for o in chain:
-        d = getattr(o, "details", None)
-        q = getattr(o, "last_quote", None)
-        g = getattr(o, "greeks", None)
-        oi = getattr(o, "open_interest", 0) or 0
-        iv = getattr(o, "implied_volatility", None)
-
-        if not d or not q:
-            continue
-
-        k = d.strike_price
-        if k is None or not (k >= lo and k <= hi):
-            continue
-
-        bid, ask = q.bid, q.ask
-        if bid is None or ask is None or bid < params.min_bid:
-            continue
-
-        m = midpoint(bid, ask)
-        if m is None or m <= 0:
-            continue
+async def find_best_options_calls_async(aclient, params, limit: int | None = None) -> list:
+    """`find_best_options_calls` over the async Polygon client."""
+    exp = target_expiration_date(params.expiration_days)
+    chain = await fetch_chain_snapshot_calls_async(aclient, params.symbol, exp)
 
-        spread = ask - bid
-        if m > 0 and (spread / m) > params.max_spread_to_mid:
-            continue
+    if not chain:
+        return []
 
-        delta_ok = True
-        delta_val = None
-        if g and getattr(g, "delta", None) is not None:
-            delta_val = abs(g.delta)
-            delta_ok = (params.delta_lo <= delta_val <= params.delta_hi)
-        if not delta_ok:
-            continue
+    spot = await resolve_spot_async([chain], aclient, params.symbol)
+    if spot is None:
+        raise ValueError(f"Could not resolve spot price for {params.symbol}")
+    return rank_covered_calls(chain, spot, exp, params, limit)
 
-        breakeven = spot - m
-        max_profit = (k - spot) + m
-        pop = pop_estimate(spot, breakeven, iv, t_years)
+def rank_covered_calls(chain, spot: float, exp: str, params, limit: int | None = None) -> list:
+    """Filter and rank a call chain for covered-call writing (no I/O)."""
+    lo = spot * (1 + params.min_otm_pct)
+    hi = spot * (1 + params.max_otm_pct) if params.max_otm_pct else float("inf")
+    t_years = time_to_expiry_years(exp)
 
-        # Convert to Pydantic-friendly dict
-        results.append({
-            "ticker": d.ticker,
-            "expiration": d.expiration_date,
-            "strike": k,
-            "delta": delta_val,
-            "bid": bid,
-            "ask": ask,
-            "mid": m,
-            "open_interest": oi,
-            "iv": iv,
-            "spot": spot,
-            "premium_yield": m / spot,
-            "breakeven": breakeven,
-            "max_profit": max_profit,
-            "pop_est": pop,
-        })
+    # Snapshot order is kept so ties rank exactly as the stable sort always has.
+    c = chain_columns(chain, sort_by_strike=False)
+    k, bid, ask, m, delta = c["strike"], c["bid"], c["ask"], c["mid"], c["delta"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        keep = (k >= lo) & (k <= hi) & (bid >= params.min_bid) & ~np.isnan(ask) & (m > 0)
+        keep &= ((ask - bid) / m) <= params.max_spread_to_mid
+        # Contracts without greeks pass the delta filter, as before.
+        keep &= np.isnan(delta) | ((delta >= params.delta_lo) & (delta <= params.delta_hi))
+    idx = np.flatnonzero(keep)
+
+    breakeven = spot - m[idx]
+    max_profit = (k[idx] - spot) + m[idx]
+    premium_yield = m[idx] / spot
+    pop = pop_estimate_array(spot, breakeven, c["iv"][idx], t_years)
 
     # Sorting
     metric = params.rank_metric
     if metric == "premium_yield":
-        results.sort(key=lambda r: r["premium_yield"], reverse=True)
+        score = premium_yield
     elif metric == "max_profit":
-        results.sort(key=lambda r: r["max_profit"], reverse=True)
-    elif metric == "pop_est":
-        results.sort(key=lambda r: (r["pop_est"] or 0), reverse=True)
-    
-    return results
-
-def find_best_iron_condors(client, params) -> list:
+        score = max_profit
+    else:
+        score = np.nan_to_num(pop, nan=0.0)
+    order = np.argsort(-score, kind="stable")
+    if limit is not None:
+        order = order[:limit]
+
+    # Convert to Pydantic-friendly dicts, only for the ranked slice
+    rows = idx[order]
+    return [
+        {
+            "ticker": ticker,
+            "expiration": expiration,
+            "strike": strike,
+            "delta": None if dv != dv else dv,
+            "bid": b,
+            "ask": a,
+            "mid": mid,
+            "open_interest": oi,
+            "iv": None if ivv != ivv else ivv,
+            "spot": spot,
+            "premium_yield": py,
+            "breakeven": be,
+            "max_profit": mp,
+            "pop_est": None if pv != pv else pv,
+        }
+        for ticker, expiration, strike, dv, b, a, mid, oi, ivv, py, be, mp, pv in zip(
+            c["ticker"][rows].tolist(), c["expiration"][rows].tolist(), k[rows].tolist(),
+            delta[rows].tolist(), bid[rows].tolist(), ask[rows].tolist(), m[rows].tolist(),
+            c["oi"][rows].tolist(), c["iv"][rows].tolist(), premium_yield[order].tolist(),
+            breakeven[order].tolist(), max_profit[order].tolist(), pop[order].tolist(),
+        )
+    ]
+
+def _match_long_legs(legs: dict, short_strikes: np.ndarray, width: float, side: str):
+    """Index of the long leg `width` further OTM than each short strike.
+
+    Uses the nearest listed strike at or beyond the target (lower for puts,
+    higher for calls) among contracts that can be bought, priced at the mid
+    when there is a two-sided market and at the ask otherwise; -1 when none.
+    """
+    cost = np.where(np.isnan(legs["mid"]), legs["ask"], legs["mid"])
+    with np.errstate(invalid="ignore"):
+        buyable = np.flatnonzero(cost > 0)
+    strikes = legs["strike"][buyable]
+    eps = 1e-6
+    if side == "put":
+        pos = np.searchsorted(strikes, short_strikes - width + eps, side="right") - 1
+        found = pos >= 0
+    else:
+        pos = np.searchsorted(strikes, short_strikes + width - eps, side="left")
+        found = pos < len(strikes)
+    idx = np.full(len(short_strikes), -1)
+    idx[found] = buyable[pos[found]]
+    return idx, cost
+
+def _top_k_desc(score: np.ndarray, k: int) -> np.ndarray:
+    """Flat indices of the k largest finite scores, ties broken by index (stable order)."""
+    flat = score.ravel()
+    finite = np.flatnonzero(np.isfinite(flat))
+    if len(finite) > k:
+        part = finite[np.argpartition(-flat[finite], k - 1)[:k]]
+        # Keep every candidate tied with the cut-off so the stable tie-break is exact.
+        finite = finite[flat[finite] >= flat[part].min()]
+    order = np.lexsort((finite, -flat[finite]))
+    return finite[order][:k]
+
+def find_best_iron_condors(client, params, top_k: int = 20) -> list:
     """
     Finds the best Iron Condor opportunities (Sell OTM Put Spread + Sell OTM Call Spread).
     """
     exp = target_expiration_date(params.expiration_days)
     calls = fetch_chain_snapshot_calls(client, params.symbol, exp)
     puts = fetch_chain_snapshot_puts(client, params.symbol, exp)
-    
+
     if not calls or not puts:
         return []
 
     spot = resolve_spot(calls + puts, client, params.symbol)
     if spot is None:
         raise ValueError(f"Could not resolve spot price for {params.symbol}")
+    return rank_iron_condors(calls, puts, spot, exp, params, top_k)
 
-    # 1. Process Puts for Short Leg (Sell OTM Put)
-    short_puts = []
-    for o in puts:
-        d = getattr(o, "details", None)
-        q = getattr(o, "last_quote", None)
-        g = getattr(o, "greeks", None)
-        if not d or not q or not g: continue
-        k = d.strike_price
-        delta = abs(g.delta) if g.delta else None
-        if k < spot and delta and (params.put_delta_lo <= delta <= params.put_delta_hi):
-            short_puts.append({"strike": k, "bid": q.bid, "ask": q.ask, "ticker": d.ticker, "delta": delta})
-
-    # 2. Process Calls for Short Leg (Sell OTM Call)
-    short_calls = []
-    for o in calls:
-        d = getattr(o, "details", None)
-        q = getattr(o, "last_quote", None)
-        g = getattr(o, "greeks", None)
-        if not d or not q or not g: continue
-        k = d.strike_price
-        delta = abs(g.delta) if g.delta else None
-        if k > spot and delta and (params.call_delta_lo <= delta <= params.call_delta_hi):
-            short_calls.append({"strike": k, "bid": q.bid, "ask": q.ask, "ticker": d.ticker, "delta": delta})
+async def find_best_iron_condors_async(aclient, params, top_k: int = 20) -> list:
+    """`find_best_iron_condors` over the async Polygon client; both chain sides load concurrently."""
+    exp = target_expiration_date(params.expiration_days)
+    calls, puts = await asyncio.gather(
+        fetch_chain_snapshot_calls_async(aclient, params.symbol, exp),
+        fetch_chain_snapshot_puts_async(aclient, params.symbol, exp),
+    )
+
+    if not calls or not puts:
+        return []
+
+    spot = await resolve_spot_async([calls, puts], aclient, params.symbol)
+    if spot is None:
+        raise ValueError(f"Could not resolve spot price for {params.symbol}")
+    return rank_iron_condors(calls, puts, spot, exp, params, top_k)
+
+def rank_iron_condors(calls, puts, spot: float, exp: str, params, top_k: int = 20) -> list:
+    """
+    Score iron condors from both chain sides (no I/O).
+
+    Short legs come from the delta bands; each is paired with a long leg
+    `spread_width` further OTM (nearest listed strike at or beyond it). Every
+    short-put x short-call pair is scored as a broadcast matrix and the top
+    `top_k` by PoP are selected with argpartition.
+    """
+    if params.spread_width <= 0:
+        return []
+
+    put_legs = chain_columns(puts)
+    call_legs = chain_columns(calls)
+
+    # 1. Short legs: OTM, inside the delta band (greeks required), with a two-sided market
+    with np.errstate(invalid="ignore"):
+        sp = np.flatnonzero(
+            (put_legs["strike"] < spot) & (put_legs["delta"] > 0)
+            & (put_legs["delta"] >= params.put_delta_lo) & (put_legs["delta"] <= params.put_delta_hi)
+            & ~np.isnan(put_legs["mid"])
+        )
+        sc = np.flatnonzero(
+            (call_legs["strike"] > spot) & (call_legs["delta"] > 0)
+            & (call_legs["delta"] >= params.call_delta_lo) & (call_legs["delta"] <= params.call_delta_hi)
+            & ~np.isnan(call_legs["mid"])
+        )
+
+    # 2. Long legs at spread_width beyond each short strike
+    lp, put_cost = _match_long_legs(put_legs, put_legs["strike"][sp], params.spread_width, "put")
+    lc, call_cost = _match_long_legs(call_legs, call_legs["strike"][sc], params.spread_width, "call")
+    sp, lp = sp[lp >= 0], lp[lp >= 0]
+    sc, lc = sc[lc >= 0], lc[lc >= 0]
+    if not len(sp) or not len(sc):
+        return []
+
+    put_credit = put_legs["mid"][sp] - put_cost[lp]
+    call_credit = call_legs["mid"][sc] - call_cost[lc]
+    put_width = put_legs["strike"][sp] - put_legs["strike"][lp]
+    call_width = call_legs["strike"][lc] - call_legs["strike"][sc]
+
+    # 3. Score every (short put, short call) pair at once: rows = puts, cols = calls
+    credit = put_credit[:, None] + call_credit[None, :]
+    width = np.maximum(put_width[:, None], call_width[None, :])
+    max_risk = width - credit
+    # Crude PoP: probability price stays between the short strikes, 1 - PutDelta - CallDelta
+    pop = np.maximum(0.0, 1.0 - put_legs["delta"][sp][:, None] - call_legs["delta"][sc][None, :])
+    ok = (credit > 0) & (max_risk > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yield_on_risk = credit / max_risk
+
+    best = _top_k_desc(np.where(ok, pop, -np.inf), top_k)
+    rows, cols = np.unravel_index(best, ok.shape)
 
     results = []
-    # 3. Form Condors (Simple version: Sell Short Legs, Buy Long Legs at fixed width)
-    # Note: A real Iron Condor requires finding the Long Legs too. 
-    # For this high-level screener, we approximate max_profit and PoP using the short legs.
-    for sp in short_puts:
-        for sc in short_calls:
-            mid_put = midpoint(sp["bid"], sp["ask"])
-            mid_call = midpoint(sc["bid"], sc["ask"])
-            if mid_put is None or mid_call is None: continue
-            
-            total_credit = mid_put + mid_call
-            max_risk = params.spread_width - total_credit
-            if max_risk <= 0: continue
-
-            # Estimated PoP for Iron Condor (Prob that price stays between short strikes)
-            # This is a crude estimate using deltas: 1 - PutDelta - CallDelta
-            pop = 1.0 - sp["delta"] - sc["delta"]
-
-            results.append({
-                "symbol": params.symbol,
-                "expiration": exp,
-                "short_put_strike": sp["strike"],
-                "short_call_strike": sc["strike"],
-                "spread_width": params.spread_width,
-                "credit": total_credit,
-                "max_risk": max_risk,
-                "yield_on_risk": total_credit / max_risk,
-                "pop_est": max(0.0, pop),
-                "put_ticker": sp["ticker"],
-                "call_ticker": sc["ticker"],
-                "spot": spot
-            })
-
-    # Sort
-    results.sort(key=lambda r: r["pop_est"], reverse=True)
-    return results[:20]
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        results.append({
+            "symbol": params.symbol,
+            "expiration": exp,
+            "short_put_strike": float(put_legs["strike"][sp[i]]),
+            "short_call_strike": float(call_legs["strike"][sc[j]]),
+            "long_put_strike": float(put_legs["strike"][lp[i]]),
+            "long_call_strike": float(call_legs["strike"][lc[j]]),
+            "spread_width": float(width[i, j]),
+            "credit": float(credit[i, j]),
+            "max_risk": float(max_risk[i, j]),
+            "yield_on_risk": float(yield_on_risk[i, j]),
+            "pop_est": float(pop[i, j]),
+            "put_ticker": put_legs["ticker"][sp[i]],
+            "call_ticker": call_legs["ticker"][sc[j]],
+            "long_put_ticker": put_legs["ticker"][lp[i]],
+            "long_call_ticker": call_legs["ticker"][lc[j]],
+            "spot": spot
+        })
+    return results